@@ -6,6 +6,10 @@ import os
 from flask import Flask
 from dotenv import load_dotenv
 from config import DevelopmentConfig, ProductionConfig
+from logging_config import iniciar_logging_assincrono
+from json_provider import ProvedorJSON, BACKEND as JSON_BACKEND
+from compressao import registrar_compressao
+from assets import registrar_assets
 from views.routes import init_routes  # É aqui que ele puxa as rotas do arquivo acima
 
 # Garante que as variáveis de ambiente sejam carregadas no início
@@ -13,17 +17,12 @@ load_dotenv()
 
 
 def configure_logging(app):
-    """Configura o sistema de logs da aplicação"""
-    log_format = "%(asctime)s - %(levelname)s - %(message)s"
-
-    logging.basicConfig(
-        level=logging.INFO,
-        format=log_format,
-        handlers=[
-            logging.FileHandler("sistema.log", encoding="utf-8"),
-            logging.StreamHandler(),
-        ],
-    )
+    """
+    Configura o sistema de logs da aplicação.
+    Requisições só enfileiram; uma thread de fundo grava sistema.log
+    (JSON lines, rotação por tamanho/tempo) e o console.
+    """
+    iniciar_logging_assincrono(app.config)
 
     # Opcional: silenciar logs do werkzeug se estiver muito poluído
     # logging.getLogger('werkzeug').setLevel(logging.WARNING)
@@ -44,9 +43,18 @@ def create_app(config_name="development"):
 
     configure_logging(app)
 
+    # jsonify/get_json com orjson (ou stdlib) e Decimal/datetime nativos
+    app.json = ProvedorJSON(app)
+    app.logger.info("Serialização JSON: %s", JSON_BACKEND)
+
     # Inicializa as rotas (incluindo a nova de retiradas)
     init_routes(app)
 
+    # Estáticos com hash (python assets.py) e compressão das respostas
+    registrar_assets(app)
+    if app.config["COMPRESSAO_ATIVA"]:
+        registrar_compressao(app)
+
     return app
 
 
@@ -63,6 +71,9 @@ if __name__ == "__main__":
     print("📍 Acesse: http://localhost:5000")
     print("📝 Logs sendo gravados em: sistema.log")
     print("🔒 Variáveis de ambiente (.env) carregadas")
+    print(
+        "🏭 Produção: gunicorn -c gunicorn.conf.py wsgi:app (Windows: python wsgi.py)"
+    )
     print("=" * 80 + "\n")
 
     # Debug mode é controlado pela configuração do ambiente
@@ -0,0 +1,548 @@
+# asgi.py
+# Entrada ASGI: as leituras da API (projetos, células, produtos, árvore) são
+# atendidas no event loop, com as consultas num executor limitado do banco e
+# a renovação do token do Protheus pelo httpx; milhares de requisições
+# esperando o banco custam corrotinas, não threads. As demais rotas (login,
+# ordens, SSE, páginas) seguem no app Flask, via asgiref.
+#
+#   uvicorn asgi:app --host 0.0.0.0 --port 5000
+#   gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker asgi:app
+
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl
+
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+from dotenv import load_dotenv
+from werkzeug.exceptions import HTTPException
+from werkzeug.http import parse_accept_header, parse_cookie, parse_etags
+
+load_dotenv()
+
+import json_provider  # noqa: E402
+from app import create_app  # noqa: E402
+from compressao import COMPRESSAO_BYTES, comprimir, escolher_codificacao  # noqa: E402
+from config import Config  # noqa: E402
+from controllers.auth_controller import sessao_do_token  # noqa: E402
+from models.auth_model import AuthModel  # noqa: E402
+from models.executor_banco import ExecutorBanco, LimiteEsperaError  # noqa: E402
+from models.formato_colunar import para_colunar  # noqa: E402
+from models.http_client_async import (  # noqa: E402
+    fechar_cliente_http_async,
+    get_cliente_http_async,
+)
+from models.metricas import (  # noqa: E402
+    REGISTRO,
+    REQUISICAO_SEGUNDOS,
+    REQUISICOES_EM_ANDAMENTO,
+    REQUISICOES_TOTAL,
+    achatar,
+)
+from models.token_store import get_token_store  # noqa: E402
+
+logger = logging.getLogger("LeiturasAsync")
+
+AMBIENTE = os.getenv("FLASK_ENV", "production")
+
+# Segundos entre as consultas às invalidações gravadas por outros workers
+INTERVALO_INVALIDACOES = 1
+
+
+class ClienteDesconectado(OSError):
+    """O navegador fechou a conexão no meio da resposta"""
+
+
+class _InstanciaWsgi(WsgiToAsgiInstance):
+    """
+    WsgiToAsgiInstance que roda o Flask no executor informado, fecha o
+    iterável da resposta (o asgiref não chama close()) e interrompe streams
+    cujo cliente já desconectou: o uvicorn descarta o envio em silêncio e o
+    gerador do SSE seguiria preso à thread até o SSE_DURACAO_MAX.
+    Usa build_environ, start_response e sync_send, que não são API pública do
+    asgiref e mudam entre versões: a versão fica fixa no requirements.txt.
+    """
+
+    def __init__(self, wsgi_application, executor):
+        super().__init__(wsgi_application)
+        self.executor = executor
+        self.desconectado = False
+
+    async def __call__(self, scope, receive, send):
+        self.receive = receive
+
+        async def enviar(mensagem):
+            if self.desconectado:
+                raise ClienteDesconectado("cliente desconectou")
+            await send(mensagem)
+
+        await super().__call__(scope, receive, enviar)
+
+    async def _vigiar_desconexao(self):
+        # O corpo já foi lido: o próximo evento só pode ser o http.disconnect
+        while (await self.receive())["type"] != "http.disconnect":
+            pass
+        self.desconectado = True
+
+    def _responder(self, body):
+        """Roda o Flask e envia a resposta (numa thread do executor)"""
+        resposta = None
+        try:
+            try:
+                environ = self.build_environ(self.scope, body)
+            except ValueError as e:  # cabeçalhos repetidos além do limite
+                logger.warning("Requisição recusada: %s", e)
+                self._recusar()
+                return
+            resposta = self.wsgi_application(environ, self.start_response)
+            enviados = 0
+            limite = None
+            for dados in resposta:
+                self._iniciar_resposta()
+                limite = self.response_content_length
+                if limite is not None:
+                    dados = dados[: limite - enviados]
+                self.sync_send(
+                    {"type": "http.response.body", "body": dados, "more_body": True}
+                )
+                enviados += len(dados)
+                if enviados == limite:
+                    break
+            self._iniciar_resposta()
+            self.sync_send({"type": "http.response.body"})
+        except ClienteDesconectado:
+            logger.debug("Cliente desconectou no meio da resposta")
+        finally:
+            if hasattr(resposta, "close"):
+                resposta.close()
+
+    def _recusar(self):
+        self.sync_send(
+            {
+                "type": "http.response.start",
+                "status": 400,
+                "headers": [(b"content-type", b"text/plain; charset=utf-8")],
+            }
+        )
+        self.sync_send({"type": "http.response.body", "body": b"Bad Request"})
+
+    def _iniciar_resposta(self):
+        if not self.response_started:
+            self.response_started = True
+            self.sync_send(self.response_start)
+
+    async def run_wsgi_app(self, body):
+        vigia = asyncio.create_task(self._vigiar_desconexao())
+        try:
+            # O padrão do asgiref (thread_sensitive) põe todas as chamadas numa
+            # thread só: um stream SSE aberto travaria as outras rotas do Flask
+            await sync_to_async(
+                self._responder, thread_sensitive=False, executor=self.executor
+            )(body)
+        finally:
+            vigia.cancel()
+
+
+class FlaskEmThreads(WsgiToAsgi):
+    """App Flask como ASGI, com até `threads` requisições simultâneas"""
+
+    def __init__(self, wsgi_application, threads):
+        super().__init__(wsgi_application)
+        self.executor = ThreadPoolExecutor(
+            max_workers=threads, thread_name_prefix="flask-wsgi"
+        )
+
+    async def __call__(self, scope, receive, send):
+        await _InstanciaWsgi(self.wsgi_application, self.executor)(scope, receive, send)
+
+
+class RequisicaoAsync:
+    """O que as rotas de leitura usam do request do Flask"""
+
+    __slots__ = ("cabecalhos", "args", "usuario")
+
+    def __init__(self, scope):
+        self.cabecalhos = {}
+        for nome, valor in scope["headers"]:
+            nome = nome.decode("latin-1").lower()
+            valor = valor.decode("latin-1")
+            anterior = self.cabecalhos.get(nome)
+            self.cabecalhos[nome] = f"{anterior}, {valor}" if anterior else valor
+        self.args = {}
+        for chave, valor in parse_qsl(
+            scope["query_string"].decode("latin-1"), keep_blank_values=True
+        ):
+            self.args.setdefault(chave, valor)  # como request.args.get: o primeiro
+        self.usuario = None
+
+    @property
+    def colunar(self):
+        return self.args.get("format") == "columnar"
+
+
+class PortalAsgi:
+    """
+    App ASGI do portal. Criado vazio no master do gunicorn e iniciado no
+    post_worker_init (como o AppPorWorker do wsgi.py); fora dele, iniciado
+    já na importação.
+    """
+
+    def __init__(self, ambiente):
+        self.ambiente = ambiente
+        self.flask_app = None
+        self._encerrado = False
+        self._aquecimento = None
+        self._invalidacoes = None
+
+    def iniciar(self, flask_app=None):
+        """flask_app: app já criado (benchmarks); padrão: create_app(ambiente)"""
+        self.flask_app = flask_app or create_app(self.ambiente)
+        self.controller = self.flask_app.extensions["projeto_controller"]
+        self.chave_secreta = self.flask_app.config["SECRET_KEY"]
+        self.rotas = self.flask_app.url_map.bind("localhost")
+        self.flask = FlaskEmThreads(self.flask_app, Config.SERVIDOR_THREADS)
+        self.banco = ExecutorBanco(Config.ASYNC_DB_THREADS, Config.ASYNC_MAX_ESPERA)
+        self.auth = AuthModel()
+        # endpoint do Flask -> versão assíncrona (mesma URL, mesma resposta)
+        self.leituras = {
+            "api_projetos": self._projetos,
+            "api_celulas": self._celulas,
+            "api_produtos": self._produtos,
+            "api_arvore": self._arvore,
+        }
+        REGISTRO.coletor(
+            lambda: achatar("portal_async_banco", self.banco.estatisticas()),
+            {"portal_async_banco": "Executor das leituras assíncronas"},
+        )
+        logger.info(
+            "ASGI: leituras com %d threads de banco (até %d aguardando), "
+            "Flask com %d threads",
+            Config.ASYNC_DB_THREADS,
+            Config.ASYNC_MAX_ESPERA,
+            Config.SERVIDOR_THREADS,
+        )
+        return self
+
+    def encerrar(self):
+        """Saída do processo: termina as ordens na fila e os executores"""
+        if self.flask_app is None or self._encerrado:
+            return
+        self._encerrado = True
+        self.controller.encerrar()
+        self.banco.encerrar(aguardar=False)
+        self.flask.executor.shutdown(wait=False)
+
+    # ---------- ASGI ----------
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._ciclo_de_vida(receive, send)
+            return
+        rota = self._rota(scope)
+        if rota is None:
+            await self.flask(scope, receive, send)
+            return
+
+        leitura, regra, valores, req = rota
+        status = 500
+        inicio = time.perf_counter()
+        REQUISICOES_EM_ANDAMENTO.inc()
+        try:
+            status, corpo, cabecalhos = await self._atender(leitura, req, valores)
+            await self._enviar(send, req, status, corpo, cabecalhos)
+        finally:
+            REQUISICOES_EM_ANDAMENTO.dec()
+            # Mesmas séries das rotas do Flask (rótulo = regra da rota)
+            REQUISICAO_SEGUNDOS.observar(
+                time.perf_counter() - inicio, rota=regra, metodo="GET"
+            )
+            REQUISICOES_TOTAL.inc(rota=regra, metodo="GET", status=str(status))
+
+    def _rota(self, scope):
+        """(leitura, regra, valores, req) se a rota é atendida aqui, senão None"""
+        if scope["type"] != "http" or scope["method"] != "GET":
+            return None
+        try:
+            regra, valores = self.rotas.match(
+                scope["path"], method="GET", return_rule=True
+            )
+        except HTTPException:  # 404, 405 e redirects ficam com o Flask
+            return None
+        leitura = self.leituras.get(regra.endpoint)
+        if leitura is None:
+            return None
+        req = RequisicaoAsync(scope)
+        if regra.endpoint == "api_produtos" and (
+            req.args.get("stream") == "1"
+            or "application/x-ndjson" in req.cabecalhos.get("accept", "")
+        ):
+            return None  # NDJSON lê o cursor aos poucos: fica no Flask
+        return leitura, regra.rule, valores, req
+
+    async def _ciclo_de_vida(self, receive, send):
+        while True:
+            mensagem = await receive()
+            if mensagem["type"] == "lifespan.startup":
+                if Config.SERVIDOR_AQUECER:
+                    self._aquecimento = asyncio.create_task(self._aquecer())
+                self._invalidacoes = asyncio.create_task(
+                    self._acompanhar_invalidacoes()
+                )
+                await send({"type": "lifespan.startup.complete"})
+            elif mensagem["type"] == "lifespan.shutdown":
+                self._invalidacoes.cancel()
+                await fechar_cliente_http_async()
+                await asyncio.get_running_loop().run_in_executor(None, self.encerrar)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _acompanhar_invalidacoes(self):
+        """
+        Ordens enviadas por outros workers descartam as árvores em cache.
+        As leituras em cache não olham o SQLite (_ler roda no loop): a
+        consulta fica aqui, numa thread, a cada INTERVALO_INVALIDACOES
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await loop.run_in_executor(None, self.controller.aplicar_invalidacoes)
+            except Exception as e:
+                logger.warning("Falha ao verificar invalidações: %s", e)
+            await asyncio.sleep(INTERVALO_INVALIDACOES)
+
+    async def _aquecer(self):
+        """Lista de projetos no cache antes das primeiras requisições"""
+        try:
+            resultado = await self.banco.executar(self.controller.listar_projetos)
+        except Exception as e:
+            resultado = {"error": str(e)}
+        if resultado.get("success"):
+            logger.info("Aquecimento: %d projetos em cache", len(resultado["data"]))
+        else:
+            logger.warning("Aquecimento falhou: %s", resultado.get("error"))
+
+    # ---------- ATENDIMENTO ----------
+
+    async def _atender(self, leitura, req, valores):
+        """(status, corpo JSON ou None, cabeçalhos)"""
+        falha = await self._autenticar(req)
+        if falha is not None:
+            return falha
+        try:
+            return await leitura(req, **valores)
+        except LimiteEsperaError as e:
+            logger.warning("Leitura recusada para %s: %s", req.usuario, e)
+            return (
+                503,
+                {"success": False, "error": "Servidor ocupado, tente novamente"},
+                {"Retry-After": "1"},
+            )
+        except Exception:
+            logger.exception("Erro na leitura assíncrona")
+            return 500, {"success": False, "error": "Erro interno"}, {}
+
+    async def _autenticar(self, req):
+        """Mesmas regras do token_required; None se a sessão é válida"""
+        token = None
+        autorizacao = req.cabecalhos.get("authorization")
+        if autorizacao:
+            partes = autorizacao.split()
+            token = partes[1] if len(partes) > 1 else None
+        elif "cookie" in req.cabecalhos:
+            token = parse_cookie(req.cabecalhos["cookie"]).get("token")
+
+        if not token:
+            return 401, {"message": "Sessão inválida"}, {}
+        data = sessao_do_token(token, self.chave_secreta)
+        if data is None:
+            return 401, {"message": "Sessão expirada"}, {}
+        req.usuario = data["user"]
+
+        # Como no token_required: renova o token do Protheus perto de expirar
+        await get_token_store().token_atual_async(data.get("sid"), self._renovar_token)
+        return None
+
+    async def _renovar_token(self, refresh_token):
+        cliente = get_cliente_http_async()
+        if cliente is None:  # sem httpx: a chamada síncrona numa thread
+            return await asyncio.get_running_loop().run_in_executor(
+                None, self.auth.renovar_token, refresh_token
+            )
+        return await self.auth.renovar_token_async(refresh_token, cliente)
+
+    async def _ler(self, metodo, *args, **kwargs):
+        """
+        Cache atendido no próprio loop (só a espiada em memória); a falta vai
+        ao executor do banco
+        """
+        resultado = metodo(*args, somente_cache=True, **kwargs)
+        if resultado is None:
+            resultado = await self.banco.executar(metodo, *args, **kwargs)
+        return resultado
+
+    @staticmethod
+    def _condicional(req, versao, montar_corpo):
+        """Como o resposta_condicional das rotas: 304 sem montar o corpo"""
+        if req.colunar:
+            versao += "-c"
+        cabecalhos = {"ETag": f'"{versao}"', "Cache-Control": "private, no-cache"}
+        if parse_etags(req.cabecalhos.get("if-none-match")).contains_weak(versao):
+            return 304, None, cabecalhos
+        return 200, montar_corpo(), cabecalhos
+
+    @staticmethod
+    def _lista(req, linhas):
+        return para_colunar(linhas) if req.colunar else linhas
+
+    # ---------- ROTAS DE LEITURA (mesmas respostas de views/routes.py) ----------
+
+    async def _projetos(self, req):
+        args = req.args
+        if not ("q" in args or "limit" in args or "cursor" in args):
+            logger.info("Usuário %s solicitou lista de projetos", req.usuario)
+            resultado = await self._ler(self.controller.listar_projetos)
+            if resultado["success"]:
+                return self._condicional(
+                    req,
+                    resultado["versao"],
+                    lambda: self._lista(req, resultado["data"]),
+                )
+            logger.error(f"Erro ao listar projetos: {resultado.get('error')}")
+            return 500, resultado, {}
+
+        try:
+            limite = min(max(int(args.get("limit", 50)), 1), 500)
+        except ValueError:
+            return 400, {"success": False, "error": "limit inválido"}, {}
+
+        resultado = await self._ler(
+            self.controller.buscar_projetos,
+            args.get("q", ""),
+            limite,
+            args.get("cursor") or None,
+        )
+        if resultado["success"]:
+            versao = resultado.pop("versao")
+            return self._condicional(
+                req,
+                versao,
+                lambda: dict(resultado, data=self._lista(req, resultado["data"])),
+            )
+        logger.error(f"Erro ao buscar projetos: {resultado.get('error')}")
+        status = resultado.pop("status", 500)
+        return status, resultado, {}
+
+    async def _celulas(self, req, projeto, revisao):
+        logger.info(
+            "Usuário %s solicitou células do projeto %s rev %s",
+            req.usuario,
+            projeto,
+            revisao,
+        )
+        resultado = await self._ler(self.controller.listar_celulas, projeto, revisao)
+        if resultado["success"]:
+            return self._condicional(
+                req, resultado["versao"], lambda: self._lista(req, resultado["data"])
+            )
+        logger.error(f"Erro ao listar células: {resultado.get('error')}")
+        return 500, resultado, {}
+
+    async def _produtos(self, req, projeto, revisao, celula):
+        logger.info(
+            "Usuário %s solicitou produtos - Projeto: %s, Célula: %s",
+            req.usuario,
+            projeto,
+            celula,
+        )
+        resultado = await self._ler(
+            self.controller.listar_produtos, projeto, revisao, celula
+        )
+        if resultado["success"]:
+            versao = resultado.pop("versao")
+            return self._condicional(
+                req,
+                versao,
+                lambda: dict(resultado, data=self._lista(req, resultado["data"])),
+            )
+        logger.error(f"Erro ao listar produtos: {resultado.get('error')}")
+        return 500, resultado, {}
+
+    async def _arvore(self, req, projeto, revisao):
+        logger.info(
+            "Usuário %s solicitou árvore do projeto %s rev %s",
+            req.usuario,
+            projeto,
+            revisao,
+        )
+        resultado = await self._ler(
+            self.controller.carregar_arvore, projeto, revisao, colunar=req.colunar
+        )
+        if resultado["success"]:
+            return self._condicional(
+                req, resultado["versao"], lambda: resultado["data"]
+            )
+        logger.error(f"Erro ao carregar árvore: {resultado.get('error')}")
+        return 500, resultado, {}
+
+    # ---------- RESPOSTA ----------
+
+    async def _enviar(self, send, req, status, corpo, cabecalhos):
+        cabecalhos = dict(cabecalhos)
+        if corpo is None:
+            dados = b""
+        else:
+            dados = json_provider.para_bytes(corpo) + b"\n"
+            cabecalhos["Content-Type"] = "application/json"
+        if Config.COMPRESSAO_ATIVA:
+            cabecalhos["Vary"] = "Accept-Encoding"
+            codificacao = self._codificacao(req, status, dados)
+            if codificacao is not None:
+                dados = await self._comprimir(dados, codificacao)
+                cabecalhos["Content-Encoding"] = codificacao
+                # Como no compressao.py: outros bytes, mesmo conteúdo
+                if "ETag" in cabecalhos:
+                    cabecalhos["ETag"] = "W/" + cabecalhos["ETag"]
+        cabecalhos["Content-Length"] = str(len(dados))
+
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [
+                    (nome.lower().encode("latin-1"), valor.encode("latin-1"))
+                    for nome, valor in cabecalhos.items()
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": dados})
+
+    @staticmethod
+    def _codificacao(req, status, dados):
+        if status in (204, 304) or len(dados) < Config.COMPRESSAO_MIN_BYTES:
+            return None
+        return escolher_codificacao(
+            parse_accept_header(req.cabecalhos.get("accept-encoding"))
+        )
+
+    @staticmethod
+    async def _comprimir(dados, codificacao):
+        # Árvores grandes: a compressão não pode parar o event loop
+        if len(dados) >= Config.ASYNC_COMPRIMIR_FORA_BYTES:
+            comprimido = await asyncio.get_running_loop().run_in_executor(
+                None, comprimir, dados, codificacao
+            )
+        else:
+            comprimido = comprimir(dados, codificacao)
+        COMPRESSAO_BYTES.inc(len(dados), codificacao=codificacao, etapa="original")
+        COMPRESSAO_BYTES.inc(len(comprimido), codificacao=codificacao, etapa="enviado")
+        return comprimido
+
+
+# No gunicorn (PORTAL_PREFORK) o app só nasce no worker; fora dele, já aqui
+if Config.PREFORK:
+    app = PortalAsgi(AMBIENTE)
+else:
+    app = PortalAsgi(AMBIENTE).iniciar()
@@ -0,0 +1,145 @@
+# assets.py
+# Arquivos estáticos com hash no nome, pré-comprimidos (gzip/brotli) no build
+# e servidos com cache imutável de 1 ano. Sem o build, os templates caem
+# no /static normal (desenvolvimento).
+#
+# Build (na pasta projeto_totvs, a cada deploy):
+#   python assets.py
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+
+from flask import request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:  # opcional: sem ele só o .gz
+    brotli = None
+
+PASTA_STATIC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+PASTA_DIST = os.path.join(PASTA_STATIC, "dist")
+MANIFESTO = os.path.join(PASTA_DIST, "manifest.json")
+
+EXTENSOES_COMPRIMIVEIS = {".js", ".css", ".svg", ".json", ".html", ".txt", ".map"}
+CACHE_IMUTAVEL = "public, max-age=31536000, immutable"
+
+
+# ---------- BUILD ----------
+
+
+def _nome_com_hash(relativo, conteudo):
+    base, extensao = os.path.splitext(relativo)
+    return f"{base}.{hashlib.sha256(conteudo).hexdigest()[:12]}{extensao}"
+
+
+def construir(pasta_static=PASTA_STATIC, pasta_dist=PASTA_DIST):
+    """
+    Copia cada arquivo de static/ para static/dist/ com o hash do conteúdo no
+    nome, grava .gz e .br ao lado dos comprimíveis e o manifest.json
+    (nome original -> nome com hash). Retorna o manifesto.
+    """
+    if os.path.isdir(pasta_dist):
+        shutil.rmtree(pasta_dist)
+    manifesto = {}
+    for raiz, pastas, arquivos in os.walk(pasta_static):
+        pastas[:] = sorted(
+            p for p in pastas if os.path.join(raiz, p) != os.path.abspath(pasta_dist)
+        )
+        for arquivo in sorted(arquivos):
+            origem = os.path.join(raiz, arquivo)
+            relativo = os.path.relpath(origem, pasta_static).replace(os.sep, "/")
+            with open(origem, "rb") as f:
+                conteudo = f.read()
+
+            destino_rel = _nome_com_hash(relativo, conteudo)
+            destino = os.path.join(pasta_dist, *destino_rel.split("/"))
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            with open(destino, "wb") as f:
+                f.write(conteudo)
+
+            if os.path.splitext(arquivo)[1].lower() in EXTENSOES_COMPRIMIVEIS:
+                # Nível máximo: comprime uma vez no build, não a cada requisição
+                with open(destino + ".gz", "wb") as f:
+                    f.write(gzip.compress(conteudo, compresslevel=9, mtime=0))
+                if brotli is not None:
+                    with open(destino + ".br", "wb") as f:
+                        f.write(brotli.compress(conteudo, quality=11))
+            manifesto[relativo] = destino_rel
+
+    with open(os.path.join(pasta_dist, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifesto, f, indent=2, sort_keys=True)
+    return manifesto
+
+
+# ---------- APP ----------
+
+
+def carregar_manifesto(caminho=MANIFESTO):
+    try:
+        with open(caminho, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def registrar_assets(app):
+    """Rota /assets e o helper asset_url() dos templates"""
+    manifesto = carregar_manifesto()
+    if manifesto:
+        app.logger.info("Assets: %d arquivos com hash (static/dist)", len(manifesto))
+    else:
+        app.logger.info(
+            "Assets: build não encontrado, usando /static (python assets.py)"
+        )
+
+    @app.template_global()
+    def asset_url(nome):
+        """URL com hash (cache imutável) ou, sem build, a do /static"""
+        gerado = manifesto.get(nome)
+        if gerado is None:
+            return url_for("static", filename=nome)
+        return url_for("assets", arquivo=gerado)
+
+    @app.route("/assets/<path:arquivo>")
+    def assets(arquivo):
+        """Arquivo com hash: versão .br/.gz se o navegador aceitar"""
+        mimetype = mimetypes.guess_type(arquivo)[0] or "application/octet-stream"
+        aceitas = request.accept_encodings
+        codificacao = None
+        for sufixo, nome in ((".br", "br"), (".gz", "gzip")):
+            if aceitas[nome] and os.path.isfile(
+                os.path.join(PASTA_DIST, *(arquivo + sufixo).split("/"))
+            ):
+                codificacao = nome
+                arquivo += sufixo
+                break
+
+        resposta = send_from_directory(PASTA_DIST, arquivo, mimetype=mimetype)
+        if codificacao:
+            resposta.headers["Content-Encoding"] = codificacao
+        resposta.vary.add("Accept-Encoding")
+        resposta.headers["Cache-Control"] = CACHE_IMUTAVEL
+        return resposta
+
+
+def main():
+    manifesto = construir()
+    print(f"{len(manifesto)} arquivo(s) em {os.path.relpath(PASTA_DIST)}:")
+    for original, gerado in manifesto.items():
+        tamanho = os.path.getsize(os.path.join(PASTA_DIST, *gerado.split("/")))
+        linha = f"  {original} -> {gerado} ({tamanho / 1024:.1f} KB"
+        for sufixo in (".gz", ".br"):
+            caminho = os.path.join(PASTA_DIST, *(gerado + sufixo).split("/"))
+            if os.path.isfile(caminho):
+                linha += f", {sufixo[1:]} {os.path.getsize(caminho) / 1024:.1f} KB"
+        print(linha + ")")
+    if brotli is None:
+        print("brotli não instalado: só .gz (pip install brotli)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+# benchmarks/ambiente.py
+# Sobe o app completo sem SQL Server nem Protheus: banco SQLite sintético,
+# servidor falso para /auth e ordem de separação e o Flask numa porta local
+
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+
+PASTA_APP = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PASTA_APP)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from dados_sinteticos import criar_banco  # noqa: E402
+from servidor_falso import ServidorFalso  # noqa: E402
+
+
+def adicionar_argumentos(parser):
+    """Opções comuns aos benchmarks que sobem o ambiente"""
+    grupo = parser.add_argument_group("ambiente")
+    grupo.add_argument("--projetos", type=int, default=50)
+    grupo.add_argument("--celulas", type=int, default=8)
+    grupo.add_argument("--produtos", type=int, default=40, help="por célula")
+    grupo.add_argument("--latencia-auth-ms", type=float, default=50)
+    grupo.add_argument("--latencia-protheus-ms", type=float, default=200)
+    grupo.add_argument("--taxa-erro-protheus", type=float, default=0.0)
+    grupo.add_argument("--pool-max", type=int, default=10)
+    grupo.add_argument(
+        "--sem-cache", action="store_true", help="CACHE_TTL_* = 0 (sempre consulta)"
+    )
+    grupo.add_argument(
+        "--replica", action="store_true", help="REPLICA_ATIVA=true (réplica SQLite)"
+    )
+    grupo.add_argument("--log-level", default="WARNING")
+    return parser
+
+
+class AmbienteBench:
+    """
+    Uso:
+        with AmbienteBench(args) as amb:
+            requests.get(f"{amb.url}/health")
+    Tudo fica numa pasta temporária removida no fim.
+    """
+
+    def __init__(self, args):
+        self.args = args
+        self.pasta = tempfile.TemporaryDirectory(prefix="bench_totvs_")
+        self.caminho_db = os.path.join(self.pasta.name, "protheus.db")
+        self.info = None
+        self.falso = None
+        self.app = None
+        self._servidor = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._servidor.server_port}"
+
+    def __enter__(self):
+        args = self.args
+        self.info = criar_banco(
+            self.caminho_db, args.projetos, args.celulas, args.produtos
+        )
+        self.falso = ServidorFalso(
+            latencia_auth_ms=args.latencia_auth_ms,
+            latencia_protheus_ms=args.latencia_protheus_ms,
+            taxa_erro=args.taxa_erro_protheus,
+        ).iniciar()
+
+        self._configurar_ambiente()
+        self.app = self._criar_app()
+        # Log de acesso do werkzeug (uma linha por requisição) distorce a medição
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+        from werkzeug.serving import make_server
+
+        self._servidor = make_server("127.0.0.1", 0, self.app, threaded=True)
+        threading.Thread(
+            target=self._servidor.serve_forever, name="bench-flask", daemon=True
+        ).start()
+        return self
+
+    def __exit__(self, *exc):
+        if self._servidor is not None:
+            self._servidor.shutdown()
+        if self.falso is not None:
+            self.falso.parar()
+        from logging_config import parar_logging_assincrono
+
+        parar_logging_assincrono()
+        self.pasta.cleanup()
+        return False
+
+    def _configurar_ambiente(self):
+        """Variáveis lidas pelo config.py (precisa vir antes de importá-lo)"""
+        args = self.args
+        pasta = self.pasta.name
+        ambiente = {
+            "FLASK_SECRET_KEY": "bench-" + os.urandom(16).hex(),
+            "AUTH_ENDPOINT_URL": f"{self.falso.url}/auth",
+            "URL_REST_PROTHEUS": f"{self.falso.url}/rest/",
+            "CHAVE_COLETOR": "bench",
+            "ADMIN_USERS": "bench",
+            "METRICAS_TOKEN": "bench-" + os.urandom(8).hex(),
+            "FILA_DB_PATH": os.path.join(pasta, "fila_ordens.db"),
+            "COMPARTILHADO_DB_PATH": os.path.join(pasta, "compartilhado.db"),
+            "LOG_FILE": os.path.join(pasta, "sistema.log"),
+            "LOG_LEVEL": args.log_level,
+            "DB_POOL_MAX": str(args.pool_max),
+        }
+        if args.sem_cache:
+            ambiente["CACHE_TTL_PROJETOS"] = "0"
+            ambiente["CACHE_TTL_ARVORES"] = "0"
+        if getattr(args, "replica", False):
+            ambiente["REPLICA_ATIVA"] = "true"
+            ambiente["REPLICA_DB_PATH"] = os.path.join(pasta, "replica_local.db")
+        os.environ.update(ambiente)
+
+    def _criar_app(self):
+        import models.projeto_model as projeto_model
+        from config import Config
+        from models.connection_pool import ConnectionPool
+
+        # Mesmo pool do app, com o SQLite no lugar do pyodbc/SQL Server
+        caminho = self.caminho_db
+        projeto_model._pool = ConnectionPool(
+            lambda: sqlite3.connect(caminho, check_same_thread=False),
+            tamanho_min=Config.DB_POOL_MIN,
+            tamanho_max=Config.DB_POOL_MAX,
+            tempo_vida_max=Config.DB_POOL_MAX_LIFETIME,
+            timeout_espera=Config.DB_POOL_TIMEOUT,
+            verificar_apos=Config.DB_POOL_HEALTHCHECK_IDLE,
+        )
+
+        from app import create_app
+
+        return create_app("production")
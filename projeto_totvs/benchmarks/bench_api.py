@@ -0,0 +1,306 @@
+# benchmarks/bench_api.py
+# Vazão e latência (p50/p95/p99) de cada rota da API, sem SQL Server nem
+# Protheus: banco SQLite sintético + servidor falso (ver ambiente.py)
+#
+# Uso (na pasta projeto_totvs):
+#   python benchmarks/bench_api.py --requisicoes 200 --concorrencia 8
+#   python benchmarks/bench_api.py --projetos 300 --produtos 120 --sem-cache
+#   python benchmarks/bench_api.py --rotas arvore,produtos --json resultado.json
+
+import argparse
+import json
+import math
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from ambiente import AmbienteBench, adicionar_argumentos
+
+
+def percentil(valores_ordenados, p):
+    """Percentil pelo método nearest-rank"""
+    if not valores_ordenados:
+        return 0.0
+    indice = max(0, math.ceil(p / 100 * len(valores_ordenados)) - 1)
+    return valores_ordenados[indice]
+
+
+class Medidor:
+    """Latências e erros por rota (thread-safe)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tempos = {}
+        self._erros = {}
+        self._duracao = {}
+
+    def registrar(self, rota, segundos, ok):
+        with self._lock:
+            self._tempos.setdefault(rota, []).append(segundos)
+            if not ok:
+                self._erros[rota] = self._erros.get(rota, 0) + 1
+
+    def definir_duracao(self, rota, segundos):
+        with self._lock:
+            self._duracao[rota] = segundos
+
+    def resumo(self):
+        resultado = {}
+        with self._lock:
+            for rota, tempos in self._tempos.items():
+                ordenados = sorted(tempos)
+                duracao = self._duracao.get(rota) or sum(tempos)
+                resultado[rota] = {
+                    "requisicoes": len(tempos),
+                    "erros": self._erros.get(rota, 0),
+                    "req_s": round(len(tempos) / duracao, 1) if duracao else 0.0,
+                    "p50_ms": round(percentil(ordenados, 50) * 1000, 1),
+                    "p95_ms": round(percentil(ordenados, 95) * 1000, 1),
+                    "p99_ms": round(percentil(ordenados, 99) * 1000, 1),
+                    "max_ms": round(ordenados[-1] * 1000, 1),
+                }
+        return resultado
+
+    def imprimir(self):
+        print(
+            f"{'rota':<34} {'req':>6} {'erros':>6} {'req/s':>8} "
+            f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+        )
+        for rota, r in self.resumo().items():
+            print(
+                f"{rota:<34} {r['requisicoes']:>6} {r['erros']:>6} {r['req_s']:>8} "
+                f"{r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8} {r['max_ms']:>8}"
+            )
+
+
+class Cenario:
+    """Gera as requisições de cada rota com projetos/células sorteados"""
+
+    def __init__(self, url, info, token, rnd):
+        self.url = url
+        self.info = info
+        self.token = token
+        self.rnd = rnd
+        self.revisao = info["revisao"]
+        self.jobs = []
+        self._produtos = {}  # (projeto, célula) -> códigos
+
+    def _alvo(self):
+        return self.rnd.choice(self.info["projetos"]), self.rnd.choice(
+            self.info["celulas"]
+        )
+
+    def carregar_produtos(self, sessao):
+        """Lê a árvore de alguns projetos para montar ordens com itens reais"""
+        for projeto in self.info["projetos"][:10]:
+            r = sessao.get(
+                f"{self.url}/api/projeto/{projeto}/{self.revisao}/arvore",
+                headers=self.cabecalhos(),
+            )
+            for celula in r.json().get("celulas", []):
+                self._produtos[(projeto, celula["AFC_XPROD"])] = [
+                    p["AFA_PRODUT"] for p in celula["produtos"]
+                ]
+
+    def cabecalhos(self):
+        return {"Authorization": f"Bearer {self.token}"}
+
+    def ordem(self):
+        (projeto, celula), codigos = self.rnd.choice(list(self._produtos.items()))
+        itens = [
+            {"produto": c, "quantidade": self.rnd.randint(1, 5)}
+            for c in self.rnd.sample(codigos, min(len(codigos), 5))
+        ]
+        return {"projeto": projeto, "celulas": [{"celula": celula, "itens": itens}]}
+
+    def rotas(self):
+        """nome -> função(sessao) que devolve a Response"""
+        u, h, rev = self.url, self.cabecalhos(), self.revisao
+
+        def projetos(s):
+            return s.get(f"{u}/api/projetos", headers=h)
+
+        def projetos_busca(s):
+            termo = self.rnd.choice(self.info["projetos"])[3:7]
+            return s.get(
+                f"{u}/api/projetos", params={"q": termo, "limit": 50}, headers=h
+            )
+
+        def celulas(s):
+            projeto, _ = self._alvo()
+            return s.get(f"{u}/api/celulas/{projeto}/{rev}", headers=h)
+
+        def produtos(s):
+            projeto, celula = self._alvo()
+            return s.get(f"{u}/api/produtos/{projeto}/{rev}/{celula}", headers=h)
+
+        def produtos_stream(s):
+            projeto, celula = self._alvo()
+            return s.get(
+                f"{u}/api/produtos/{projeto}/{rev}/{celula}",
+                params={"stream": 1},
+                headers=h,
+            )
+
+        def arvore(s):
+            projeto, _ = self._alvo()
+            return s.get(f"{u}/api/projeto/{projeto}/{rev}/arvore", headers=h)
+
+        def login(s):
+            return s.post(
+                f"{u}/api/auth/login", json={"username": "bench", "password": "bench"}
+            )
+
+        def requisicao_sync(s):
+            return s.post(
+                f"{u}/api/requisicao", params={"sync": 1}, json=self.ordem(), headers=h
+            )
+
+        def requisicao_fila(s):
+            r = s.post(f"{u}/api/requisicao", json=self.ordem(), headers=h)
+            if r.status_code == 202:
+                self.jobs.append(r.json()["job_id"])
+            return r
+
+        def requisicao_lote(s):
+            ordens = [self.ordem() for _ in range(3)]
+            r = s.post(f"{u}/api/requisicao/lote", json={"ordens": ordens}, headers=h)
+            if r.status_code == 202:
+                self.jobs.extend(j["job_id"] for j in r.json()["jobs"])
+            return r
+
+        def requisicao_status(s):
+            ids = ",".join(self.jobs[-20:]) or "inexistente"
+            return s.get(f"{u}/api/requisicao/status", params={"ids": ids}, headers=h)
+
+        def health(s):
+            return s.get(f"{u}/health")
+
+        def metrics(s):
+            return s.get(
+                f"{u}/metrics",
+                headers={"Authorization": f"Bearer {os.environ['METRICAS_TOKEN']}"},
+            )
+
+        return {
+            "login": login,
+            "projetos": projetos,
+            "projetos_busca": projetos_busca,
+            "celulas": celulas,
+            "produtos": produtos,
+            "produtos_stream": produtos_stream,
+            "arvore": arvore,
+            "requisicao_sync": requisicao_sync,
+            "requisicao_fila": requisicao_fila,
+            "requisicao_lote": requisicao_lote,
+            "requisicao_status": requisicao_status,
+            "health": health,
+            "metrics": metrics,
+        }
+
+
+def executar_rota(nome, funcao, medidor, requisicoes, concorrencia, aquecimento):
+    local = threading.local()
+
+    def sessao():
+        if not hasattr(local, "sessao"):
+            local.sessao = requests.Session()
+        return local.sessao
+
+    def uma(_):
+        s = sessao()
+        inicio = time.perf_counter()
+        try:
+            r = funcao(s)
+            r.content  # inclui o tempo de leitura do corpo
+            ok = r.status_code < 400
+        except requests.RequestException:
+            ok = False
+        return time.perf_counter() - inicio, ok
+
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        list(executor.map(uma, range(aquecimento)))
+        inicio = time.perf_counter()
+        for segundos, ok in executor.map(uma, range(requisicoes)):
+            medidor.registrar(nome, segundos, ok)
+        medidor.definir_duracao(nome, time.perf_counter() - inicio)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark das rotas da API")
+    parser.add_argument("--requisicoes", type=int, default=200, help="por rota")
+    parser.add_argument("--concorrencia", type=int, default=8)
+    parser.add_argument("--aquecimento", type=int, default=10, help="por rota")
+    parser.add_argument("--rotas", help="lista separada por vírgula (padrão: todas)")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--json", help="grava o resultado neste arquivo")
+    adicionar_argumentos(parser)
+    args = parser.parse_args()
+
+    with AmbienteBench(args) as amb:
+        sessao = requests.Session()
+        r = sessao.post(
+            f"{amb.url}/api/auth/login", json={"username": "bench", "password": "x"}
+        )
+        r.raise_for_status()
+
+        cenario = Cenario(
+            amb.url, amb.info, r.json()["token"], random.Random(args.semente)
+        )
+        cenario.carregar_produtos(sessao)
+        rotas = cenario.rotas()
+        if args.rotas:
+            escolhidas = [n.strip() for n in args.rotas.split(",")]
+            rotas = {n: rotas[n] for n in escolhidas if n in rotas}
+
+        linhas = amb.info["linhas"]
+        print("=" * 100)
+        print(
+            f"BENCHMARK DA API - {args.projetos} projetos x {args.celulas} células x "
+            f"{args.produtos} produtos ({linhas['AFA010']} linhas AFA010)"
+        )
+        print(
+            f"{args.requisicoes} requisições por rota, concorrência {args.concorrencia}, "
+            f"Protheus {args.latencia_protheus_ms:.0f} ms, /auth "
+            f"{args.latencia_auth_ms:.0f} ms, cache {'off' if args.sem_cache else 'on'}"
+        )
+        print("=" * 100)
+
+        medidor = Medidor()
+        for nome, funcao in rotas.items():
+            executar_rota(
+                nome,
+                funcao,
+                medidor,
+                args.requisicoes,
+                args.concorrencia,
+                args.aquecimento,
+            )
+        medidor.imprimir()
+
+        saude = sessao.get(
+            f"{amb.url}/api/admin/status", headers=cenario.cabecalhos()
+        ).json()
+        print("\nPool:", json.dumps(saude["pool_conexoes"], ensure_ascii=False))
+        print("Cache:", json.dumps(saude["cache"], ensure_ascii=False))
+        if saude.get("replica_local"):
+            print("Réplica:", json.dumps(saude["replica_local"], ensure_ascii=False))
+        print("Servidor falso:", amb.falso.estatisticas())
+
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"parametros": vars(args), "rotas": medidor.resumo()},
+                    f,
+                    ensure_ascii=False,
+                    indent=2,
+                )
+            print(f"Resultado gravado em {args.json}")
+
+
+if __name__ == "__main__":
+    main()
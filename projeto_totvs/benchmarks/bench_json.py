@@ -0,0 +1,161 @@
+# benchmarks/bench_json.py
+# Compara a serialização das respostas: provider padrão do Flask, json da
+# stdlib com o para_nativo do json_provider e orjson (se instalado), com linhas
+# no formato do get_produtos / get_arvore (SUMs em Decimal, como o pyodbc)
+#
+# Uso (na pasta projeto_totvs):
+#   python benchmarks/bench_json.py --celulas 8 --produtos 250 --repeticoes 50
+
+import argparse
+import decimal
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("FLASK_SECRET_KEY", "bench-json")
+
+from flask import Flask  # noqa: E402
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+
+import json_provider  # noqa: E402
+from models.arvore_projeto import ArvoreProjeto  # noqa: E402
+from models.formato_colunar import para_colunar  # noqa: E402
+
+
+def gerar_linhas(celulas, produtos, semente=42):
+    """Linhas agregadas de um projeto, com Decimal(…, 2 casas) nas quantidades"""
+    rnd = random.Random(semente)
+    linhas = []
+    for c in range(celulas):
+        for p in range(produtos):
+            necessidade = rnd.randint(1, 60)
+            entregue = rnd.randint(0, necessidade)
+            linhas.append(
+                {
+                    "AF8_PROJET": "PMS005125A",
+                    "AF8_REVISA": "0001",
+                    "AFC_XPROD": f"CELROB{c:06d}  ",
+                    "AFA_PRODUT": f"EL{c:03d}{p:05d}.MP     ",
+                    "AFA_XDESCR": f"DESCRICAO DO PRODUTO {c:03d}{p:05d} - ÇÃO",
+                    "AFA_QUANT": decimal.Decimal(necessidade).quantize(
+                        decimal.Decimal("0.01")
+                    ),
+                    "CP_QUANT": decimal.Decimal(entregue).quantize(
+                        decimal.Decimal("0.01")
+                    ),
+                    "CP_XQUPR": decimal.Decimal(entregue).quantize(
+                        decimal.Decimal("0.01")
+                    ),
+                }
+            )
+    return linhas
+
+
+def medir(funcao, repeticoes):
+    """Melhor tempo (ms) entre as repetições, depois de um aquecimento"""
+    funcao()
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos) * 1000, sum(tempos) / len(tempos) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da serialização JSON")
+    parser.add_argument("--celulas", type=int, default=8)
+    parser.add_argument("--produtos", type=int, default=250, help="por célula")
+    parser.add_argument("--repeticoes", type=int, default=50)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    padrao = DefaultJSONProvider(app)
+    provedor = json_provider.ProvedorJSON(app)
+
+    linhas = gerar_linhas(args.celulas, args.produtos)
+    arvore = ArvoreProjeto("PMS005125A", "0001", linhas)
+    celula = next(iter(arvore.celulas()))["AFC_XPROD"]
+    cargas = {
+        "produtos (1 célula)": {
+            "success": True,
+            "data": arvore.produtos(celula),
+            "estatisticas": arvore.estatisticas(celula),
+        },
+        "arvore (projeto)": arvore.para_dict(),
+    }
+
+    variantes = {
+        "flask padrão": lambda obj: padrao.response(obj).get_data(),
+        "stdlib + para_nativo": lambda obj: json_provider.para_bytes_stdlib(obj),
+    }
+    if json_provider.orjson is not None:
+        variantes["orjson"] = lambda obj: json_provider.para_bytes_orjson(obj)
+    variantes[f"ProvedorJSON ({json_provider.BACKEND})"] = lambda obj: (
+        provedor.response(obj).get_data()
+    )
+
+    def arvore_colunar():
+        arvore._colunar = None  # mede a conversão, não a versão memorizada
+        return arvore.para_colunar()
+
+    # ?format=columnar pelo ProvedorJSON: com a conversão e, na árvore, também
+    # já memorizada (o caso das requisições atendidas pelo cache)
+    colunares = {
+        "produtos (1 célula)": {
+            "colunar + ProvedorJSON": lambda: dict(
+                cargas["produtos (1 célula)"],
+                data=para_colunar(arvore.produtos(celula)),
+            ),
+        },
+        "arvore (projeto)": {
+            "colunar + ProvedorJSON": arvore_colunar,
+            "colunar memorizado": arvore.para_colunar,
+        },
+    }
+
+    print("=" * 88)
+    print(
+        f"SERIALIZAÇÃO JSON - {args.celulas} células x {args.produtos} produtos "
+        f"({len(linhas)} linhas), {args.repeticoes} repetições"
+    )
+    print("=" * 88)
+    with app.app_context():
+        for nome_carga, carga in cargas.items():
+            print(f"\n{nome_carga}")
+            print(
+                f"  {'variante':<28} {'min ms':>9} {'média ms':>9} {'KB':>8} {'x':>6}"
+            )
+            base = None
+            for nome, funcao in variantes.items():
+                minimo, media = medir(lambda: funcao(carga), args.repeticoes)
+                tamanho = len(funcao(carga)) / 1024
+                base = base or minimo
+                print(
+                    f"  {nome:<28} {minimo:>9.2f} {media:>9.2f} {tamanho:>8.1f} "
+                    f"{base / minimo:>6.1f}"
+                )
+            for nome, montar in colunares[nome_carga].items():
+                minimo, media = medir(
+                    lambda: provedor.response(montar()).get_data(), args.repeticoes
+                )
+                tamanho = len(provedor.response(montar()).get_data()) / 1024
+                print(
+                    f"  {nome:<28} {minimo:>9.2f} {media:>9.2f} {tamanho:>8.1f} "
+                    f"{base / minimo:>6.1f}"
+                )
+
+    if json_provider.orjson is None:
+        print("\norjson não instalado: pip install orjson para comparar")
+
+    # Quantidades saem como número (o padrão do Flask manda Decimal como texto)
+    amostra = arvore.produtos(celula)[0]
+    with app.app_context():
+        print("\nFlask padrão :", padrao.dumps({"AFA_QUANT": amostra["AFA_QUANT"]}))
+        print("ProvedorJSON :", provedor.dumps({"AFA_QUANT": amostra["AFA_QUANT"]}))
+
+
+if __name__ == "__main__":
+    main()
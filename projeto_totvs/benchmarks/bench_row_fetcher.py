@@ -0,0 +1,130 @@
+# benchmarks/bench_row_fetcher.py
+# Compara pd.read_sql + to_dict("records") com o buscar_linhas (cursor direto)
+#
+# Uso (na pasta projeto_totvs):
+#   python benchmarks/bench_row_fetcher.py --linhas 50000 --repeticoes 5
+
+import argparse
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.row_fetcher import buscar_linhas  # noqa: E402
+
+QUERY = """
+        SELECT AF8_PROJET, AFC_XPROD, AFA_PRODUT, AFA_XDESCR,
+               AFA_QUANT, CP_QUANT, CP_XQUPR
+        FROM PRODUTOS
+        WHERE AF8_PROJET = ?
+        """
+
+
+def criar_banco(qtd_linhas):
+    """Banco SQLite em memória com linhas no formato do get_produtos"""
+    conn = sqlite3.connect(":memory:")
+    conn.execute(
+        "CREATE TABLE PRODUTOS (AF8_PROJET TEXT, AFC_XPROD TEXT, AFA_PRODUT TEXT, "
+        "AFA_XDESCR TEXT, AFA_QUANT REAL, CP_QUANT REAL, CP_XQUPR REAL)"
+    )
+    rnd = random.Random(42)
+    conn.executemany(
+        "INSERT INTO PRODUTOS VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (
+            (
+                "PMS005125A",
+                f"CELROB{i % 40:06d}",
+                f"EL{i:06d}.MP",
+                f"DESCRICAO DO PRODUTO {i:06d}".ljust(40),
+                float(rnd.randint(1, 50)),
+                float(rnd.randint(0, 50)),
+                float(rnd.randint(0, 50)),
+            )
+            for i in range(qtd_linhas)
+        ),
+    )
+    conn.commit()
+    return conn
+
+
+def via_pandas(conn):
+    import pandas as pd
+
+    df = pd.read_sql(QUERY, conn, params=["PMS005125A"])
+    return df.to_dict("records")
+
+
+def via_cursor(conn):
+    return buscar_linhas(conn, QUERY, ["PMS005125A"])
+
+
+def medir(nome, funcao, conn, repeticoes):
+    funcao(conn)  # aquecimento
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        linhas = funcao(conn)
+        tempos.append(time.perf_counter() - inicio)
+
+    tracemalloc.start()
+    funcao(conn)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    tempos.sort()
+    print(
+        f"{nome:<22} linhas={len(linhas):>7}  "
+        f"mediana={tempos[len(tempos) // 2] * 1000:8.1f} ms  "
+        f"melhor={tempos[0] * 1000:8.1f} ms  "
+        f"pico_memória={pico / 1024 / 1024:7.1f} MB"
+    )
+
+
+def tempo_import_pandas():
+    """Custo do 'import pandas' na subida do app (processo novo)"""
+    codigo = (
+        "import time; t = time.perf_counter(); import pandas; "
+        "print(time.perf_counter() - t)"
+    )
+    try:
+        saida = subprocess.run(
+            [sys.executable, "-c", codigo], capture_output=True, text=True, check=True
+        )
+        return float(saida.stdout.strip())
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--linhas", type=int, default=50000)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print(f"BENCHMARK LEITURA DE LINHAS ({args.linhas} linhas)")
+    print("=" * 80)
+
+    conn = criar_banco(args.linhas)
+    medir("buscar_linhas", via_cursor, conn, args.repeticoes)
+
+    try:
+        import pandas  # noqa: F401
+    except ImportError:
+        print("pandas não instalado: comparação com read_sql ignorada")
+        return
+
+    medir("pd.read_sql+to_dict", via_pandas, conn, args.repeticoes)
+
+    importacao = tempo_import_pandas()
+    if importacao is not None:
+        print(f"\nimport pandas (processo novo): {importacao * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
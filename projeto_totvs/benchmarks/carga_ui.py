@@ -0,0 +1,365 @@
+# benchmarks/carga_ui.py
+# Teste de carga que reproduz a navegação do app.js (troca de turno:
+# vários operadores abrindo projetos e enviando carrinhos ao mesmo tempo)
+#
+# Uso (na pasta projeto_totvs):
+#   Local (SQLite sintético + Protheus falso, ver ambiente.py):
+#     python benchmarks/carga_ui.py --local --operadores 30 --duracao 60
+#   Homologação (NÃO envia ordens sem --enviar):
+#     python benchmarks/carga_ui.py --url http://homolog:5000 --usuario u --senha s
+#   Comparando builds:
+#     python benchmarks/carga_ui.py --local --json novo.json --comparar antigo.json
+#
+# Fluxos:
+#   ui     - tela atual: login, "/", /api/projetos?q=&limit=, digitação no
+#            filtro, /api/projeto/<p>/<r>/arvore, /api/requisicao/lote +
+#            consulta dos jobs
+#   legado - telas antigas: /api/projetos, /api/celulas, um /api/produtos por
+#            célula clicada, /api/requisicao por projeto + consulta do job
+
+import argparse
+import json
+import random
+import threading
+import time
+
+import requests
+
+from ambiente import AmbienteBench, adicionar_argumentos
+from bench_api import Medidor
+
+
+class Operador:
+    """Um usuário navegando; cada passo medido vai para o Medidor"""
+
+    def __init__(self, numero, url, args, medidor, rnd):
+        self.numero = numero
+        self.url = url
+        self.args = args
+        self.medidor = medidor
+        self.rnd = rnd
+        self.sessao = requests.Session()
+        self.iteracoes = 0
+        self.ordens = 0
+
+    # ---------- AUXILIARES ----------
+
+    def pensar(self):
+        if self.args.pensar_max > 0:
+            time.sleep(self.rnd.uniform(self.args.pensar_min, self.args.pensar_max))
+
+    def passo(self, nome, metodo, caminho, aceitos=(200,), **kwargs):
+        """Executa e mede uma requisição; devolve o JSON (ou None em erro)"""
+        inicio = time.perf_counter()
+        try:
+            r = self.sessao.request(
+                metodo, f"{self.url}{caminho}", timeout=self.args.timeout, **kwargs
+            )
+            corpo = r.content
+            ok = r.status_code in aceitos
+        except requests.RequestException:
+            self.medidor.registrar(nome, time.perf_counter() - inicio, False)
+            return None
+        self.medidor.registrar(nome, time.perf_counter() - inicio, ok)
+        if not ok:
+            return None
+        if "json" not in r.headers.get("Content-Type", ""):
+            return corpo
+        return r.json()
+
+    def login(self):
+        dados = self.passo(
+            "01_login",
+            "POST",
+            "/api/auth/login",
+            json={"username": self.args.usuario, "password": self.args.senha},
+        )
+        # O token fica no cookie da sessão, como no navegador
+        return bool(dados)
+
+    def montar_carrinho(self, projeto, celulas):
+        """celulas: {célula: [produtos]} -> payload de uma ordem"""
+        itens_por_celula = []
+        for celula, produtos in celulas.items():
+            pendentes = [
+                p
+                for p in produtos
+                if (p.get("AFA_QUANT") or 0) - (p.get("CP_XQUPR") or 0) > 0
+            ] or produtos
+            escolhidos = self.rnd.sample(
+                pendentes, min(len(pendentes), self.args.itens_por_celula)
+            )
+            if escolhidos:
+                itens_por_celula.append(
+                    {
+                        "celula": celula,
+                        "itens": [
+                            {"produto": p["AFA_PRODUT"], "quantidade": 1}
+                            for p in escolhidos
+                        ],
+                    }
+                )
+        if not itens_por_celula:
+            return None
+        return {"projeto": projeto, "celulas": itens_por_celula}
+
+    def deve_enviar(self):
+        return self.args.enviar and self.rnd.random() < self.args.taxa_envio
+
+    # ---------- FLUXOS ----------
+
+    def fluxo_ui(self):
+        self.passo("02_pagina", "GET", "/")
+        self.pensar()
+
+        dados = self.passo(
+            "03_projetos", "GET", "/api/projetos", params={"q": "", "limit": 50}
+        )
+        if not dados or not dados.get("data"):
+            return
+        projeto = self.rnd.choice(dados["data"])
+        self.pensar()
+
+        if self.rnd.random() < self.args.taxa_busca:
+            # Digitação no filtro: com o debounce de 250 ms sai ~1 busca a cada 2 teclas
+            codigo = projeto["AF8_PROJET"].strip()
+            for fim in range(2, min(len(codigo), 8) + 1, 2):
+                self.passo(
+                    "04_busca_projeto",
+                    "GET",
+                    "/api/projetos",
+                    params={"q": codigo[:fim], "limit": 50},
+                )
+            self.pensar()
+
+        arvore = self.passo(
+            "05_arvore",
+            "GET",
+            f"/api/projeto/{projeto['AF8_PROJET']}/{projeto['AF8_REVISA']}/arvore",
+        )
+        if not arvore or not arvore.get("celulas"):
+            return
+
+        # Cliques nas células são locais (a árvore já veio inteira)
+        visitadas = self.rnd.sample(
+            arvore["celulas"], min(len(arvore["celulas"]), self.args.celulas_por_visita)
+        )
+        for _ in visitadas:
+            self.pensar()
+
+        if not self.deve_enviar():
+            return
+        ordem = self.montar_carrinho(
+            projeto["AF8_PROJET"],
+            {c["AFC_XPROD"]: c.get("produtos", []) for c in visitadas},
+        )
+        if ordem:
+            lote = self.passo(
+                "06_enviar_lote",
+                "POST",
+                "/api/requisicao/lote",
+                aceitos=(202,),
+                json={"ordens": [ordem]},
+            )
+            if not lote:
+                return
+            self.ordens += 1
+            for job in lote.get("jobs", []):
+                self.acompanhar_job(job["job_id"])
+
+    def fluxo_legado(self):
+        projetos = self.passo("03_projetos", "GET", "/api/projetos")
+        if not projetos:
+            return
+        projeto = self.rnd.choice(projetos)
+        codigo, revisao = projeto["AF8_PROJET"], projeto["AF8_REVISA"]
+        self.pensar()
+
+        celulas = self.passo("04_celulas", "GET", f"/api/celulas/{codigo}/{revisao}")
+        if not celulas:
+            return
+
+        carrinho = {}
+        for celula in self.rnd.sample(
+            celulas, min(len(celulas), self.args.celulas_por_visita)
+        ):
+            self.pensar()
+            nome = celula["AFC_XPROD"]
+            dados = self.passo(
+                "05_produtos", "GET", f"/api/produtos/{codigo}/{revisao}/{nome}"
+            )
+            if dados:
+                carrinho[nome] = dados.get("data", [])
+
+        if not self.deve_enviar():
+            return
+        ordem = self.montar_carrinho(codigo, carrinho)
+        if not ordem:
+            return
+        job = self.passo(
+            "06_enviar_ordem", "POST", "/api/requisicao", aceitos=(200, 202), json=ordem
+        )
+        if not job:
+            return
+        self.ordens += 1
+        if "job_id" in job:
+            self.acompanhar_job(job["job_id"])
+
+    def acompanhar_job(self, job_id):
+        """Consulta o job até finalizar (como a tela faz)"""
+        limite = time.monotonic() + self.args.timeout
+        while time.monotonic() < limite:
+            time.sleep(0.5)
+            dados = self.passo("07_status_job", "GET", f"/api/requisicao/{job_id}")
+            if not dados or dados.get("status") in ("concluido", "erro"):
+                return
+
+    def executar(self, fim):
+        if not self.login():
+            return
+        fluxo = self.fluxo_legado if self.args.fluxo == "legado" else self.fluxo_ui
+        while time.monotonic() < fim:
+            if self.args.iteracoes and self.iteracoes >= self.args.iteracoes:
+                return
+            fluxo()
+            self.iteracoes += 1
+            self.pensar()
+
+
+def rodar(url, args):
+    medidor = Medidor()
+    rnd = random.Random(args.semente)
+    operadores = [
+        Operador(i, url, args, medidor, random.Random(rnd.random()))
+        for i in range(args.operadores)
+    ]
+
+    inicio = time.monotonic()
+    fim = inicio + args.rampa + args.duracao
+    threads = []
+    for i, operador in enumerate(operadores):
+        # Rampa: operadores chegando ao longo de N segundos
+        atraso = args.rampa * i / max(1, len(operadores))
+        t = threading.Timer(atraso, operador.executar, args=(fim,))
+        t.daemon = True
+        t.start()
+        threads.append(t)
+    for t in threads:
+        t.join()
+    duracao = time.monotonic() - inicio
+
+    for nome in medidor.resumo():
+        medidor.definir_duracao(nome, duracao)
+    return medidor, operadores, duracao
+
+
+def comparar(atual, caminho_base):
+    """Diferença de p50/p95/taxa de erro em relação a uma execução anterior"""
+    with open(caminho_base, encoding="utf-8") as f:
+        base = json.load(f)["passos"]
+    print(f"\nComparação com {caminho_base}:")
+    print(f"{'passo':<22} {'p50 ms':>16} {'p95 ms':>16} {'erros %':>16}")
+    for passo, r in atual.items():
+        b = base.get(passo)
+        if not b:
+            print(f"{passo:<22} (novo)")
+            continue
+
+        def taxa(x):
+            return x["erros"] / x["requisicoes"] * 100 if x["requisicoes"] else 0.0
+
+        def delta(novo, antigo):
+            if not antigo:
+                return f"{novo:>7} (  --  )"
+            return f"{novo:>7} ({(novo - antigo) / antigo * 100:+5.0f}%)"
+
+        print(
+            f"{passo:<22} {delta(r['p50_ms'], b['p50_ms']):>16} "
+            f"{delta(r['p95_ms'], b['p95_ms']):>16} "
+            f"{taxa(r):>7.1f} vs {taxa(b):>4.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carga simulando a navegação do app")
+    alvo = parser.add_mutually_exclusive_group(required=True)
+    alvo.add_argument("--url", help="instância já rodando (ex.: homologação)")
+    alvo.add_argument("--local", action="store_true", help="sobe o ambiente sintético")
+    parser.add_argument("--usuario", default="carga")
+    parser.add_argument("--senha", default="carga")
+    parser.add_argument("--fluxo", choices=("ui", "legado"), default="ui")
+    parser.add_argument("--operadores", type=int, default=20)
+    parser.add_argument("--rampa", type=float, default=10, help="segundos")
+    parser.add_argument(
+        "--duracao", type=float, default=60, help="segundos após a rampa"
+    )
+    parser.add_argument(
+        "--iteracoes", type=int, default=0, help="por operador (0 = sem limite)"
+    )
+    parser.add_argument("--pensar-min", type=float, default=0.5, help="segundos")
+    parser.add_argument("--pensar-max", type=float, default=3.0, help="segundos")
+    parser.add_argument("--celulas-por-visita", type=int, default=3)
+    parser.add_argument("--itens-por-celula", type=int, default=5)
+    parser.add_argument("--taxa-busca", type=float, default=0.5)
+    parser.add_argument("--taxa-envio", type=float, default=0.3)
+    parser.add_argument(
+        "--enviar", action="store_true", help="envia ordens (automático com --local)"
+    )
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--json", help="grava o resultado neste arquivo")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior")
+    adicionar_argumentos(parser)
+    args = parser.parse_args()
+
+    if args.local:
+        args.enviar = True
+        ambiente = AmbienteBench(args)
+        url = ambiente.__enter__().url
+    else:
+        ambiente = None
+        url = args.url.rstrip("/")
+
+    try:
+        print("=" * 100)
+        print(
+            f"CARGA ({args.fluxo}) - {args.operadores} operadores, rampa {args.rampa:.0f}s, "
+            f"duração {args.duracao:.0f}s, pensar {args.pensar_min}-{args.pensar_max}s, "
+            f"envio {'on' if args.enviar else 'off'} -> {url}"
+        )
+        print("=" * 100)
+
+        medidor, operadores, duracao = rodar(url, args)
+        medidor.imprimir()
+
+        resumo = medidor.resumo()
+        total = sum(r["requisicoes"] for r in resumo.values())
+        erros = sum(r["erros"] for r in resumo.values())
+        print(
+            f"\n{sum(o.iteracoes for o in operadores)} navegações, "
+            f"{sum(o.ordens for o in operadores)} ordens, {total} requisições em "
+            f"{duracao:.1f}s ({total / duracao:.1f} req/s), "
+            f"erros {erros / total * 100 if total else 0:.1f}%"
+        )
+        if ambiente is not None:
+            print("Servidor falso:", ambiente.falso.estatisticas())
+
+        if args.comparar:
+            comparar(resumo, args.comparar)
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                parametros = {k: v for k, v in vars(args).items() if k != "senha"}
+                json.dump(
+                    {"parametros": parametros, "duracao_s": duracao, "passos": resumo},
+                    f,
+                    ensure_ascii=False,
+                    indent=2,
+                )
+            print(f"Resultado gravado em {args.json}")
+    finally:
+        if ambiente is not None:
+            ambiente.__exit__(None, None, None)
+
+
+if __name__ == "__main__":
+    main()
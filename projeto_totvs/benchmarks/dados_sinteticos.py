@@ -0,0 +1,193 @@
+# benchmarks/dados_sinteticos.py
+# Banco SQLite com as tabelas do Protheus usadas pelo ProjetoModel
+# (AF8010, AFC010, AF9010, AFA010, SCP010) preenchidas com dados sintéticos
+#
+# Uso (na pasta projeto_totvs):
+#   python benchmarks/dados_sinteticos.py bench.db --projetos 50 --celulas 8 --produtos 40
+
+import argparse
+import os
+import random
+import sqlite3
+import time
+
+REVISAO = "0001"
+ITENS_POR_TAREFA = 10
+
+TABELAS = """
+CREATE TABLE AF8010 (
+    AF8_FILIAL TEXT, AF8_PROJET TEXT, AF8_REVISA TEXT, AF8_XNOMCL TEXT,
+    AF8_XCC TEXT, D_E_L_E_T_ TEXT, R_E_C_N_O_ INTEGER PRIMARY KEY
+);
+CREATE TABLE AFC010 (
+    AFC_FILIAL TEXT, AFC_PROJET TEXT, AFC_REVISA TEXT, AFC_EDT TEXT,
+    AFC_XPROD TEXT, AFC_XPRODU TEXT, D_E_L_E_T_ TEXT, R_E_C_N_O_ INTEGER PRIMARY KEY
+);
+CREATE TABLE AF9010 (
+    AF9_FILIAL TEXT, AF9_PROJET TEXT, AF9_REVISA TEXT, AF9_TAREFA TEXT,
+    AF9_EDTPAI TEXT, D_E_L_E_T_ TEXT, R_E_C_N_O_ INTEGER PRIMARY KEY
+);
+CREATE TABLE AFA010 (
+    AFA_FILIAL TEXT, AFA_PROJET TEXT, AFA_REVISA TEXT, AFA_TAREFA TEXT,
+    AFA_ITEM TEXT, AFA_PRODUT TEXT, AFA_XDESCR TEXT, AFA_QUANT REAL,
+    AFA_XESTRU TEXT, D_E_L_E_T_ TEXT, R_E_C_N_O_ INTEGER PRIMARY KEY
+);
+CREATE TABLE SCP010 (
+    CP_FILIAL TEXT, CP_NUM TEXT, CP_ITEM TEXT, CP_XPROJET TEXT, CP_XPROD TEXT,
+    CP_XTAREFA TEXT, CP_XITTARE TEXT, CP_PRODUTO TEXT, CP_QUANT REAL,
+    CP_XQUPR REAL, CP_PREREQU TEXT, D_E_L_E_T_ TEXT, R_E_C_N_O_ INTEGER PRIMARY KEY
+);
+-- Índices no formato dos índices padrão do Protheus (filial + chave)
+CREATE INDEX AF8010_1 ON AF8010 (AF8_FILIAL, AF8_PROJET, AF8_REVISA);
+CREATE INDEX AFC010_1 ON AFC010 (AFC_FILIAL, AFC_PROJET, AFC_REVISA, AFC_EDT);
+CREATE INDEX AF9010_2 ON AF9010 (AF9_FILIAL, AF9_PROJET, AF9_REVISA, AF9_EDTPAI);
+CREATE INDEX AFA010_1 ON AFA010 (AFA_FILIAL, AFA_PROJET, AFA_REVISA, AFA_TAREFA, AFA_ITEM);
+CREATE INDEX SCP010_X ON SCP010 (CP_FILIAL, CP_XPROJET, CP_XPROD, CP_XTAREFA, CP_XITTARE);
+"""
+
+
+def codigo_projeto(i):
+    return f"PMS{i:06d}A"
+
+
+def codigo_celula(j):
+    return f"CELROB{j:06d}"
+
+
+def criar_banco(
+    caminho, projetos=50, celulas=8, produtos=40, taxa_entregue=0.5, semente=42
+):
+    """
+    Cria (ou recria) o banco com projetos x células x produtos.
+    Cada célula tem uma EDT com AFC_XPROD preenchido, tarefas com até
+    ITENS_POR_TAREFA produtos e pré-requisições (SCP010) para uma parte deles.
+    Inclui também EDTs sem célula e linhas deletadas, que as consultas filtram.
+    Retorna {"projetos": [...], "celulas": [...], "linhas": {...}}.
+    """
+    if os.path.exists(caminho):
+        os.remove(caminho)
+
+    rnd = random.Random(semente)
+    conn = sqlite3.connect(caminho)
+    conn.executescript(TABELAS)
+
+    af8, afc, af9, afa, scp = [], [], [], [], []
+    num_sa = 0
+    for i in range(projetos):
+        projeto = codigo_projeto(i)
+        af8.append(("01", projeto, REVISAO, f"CLIENTE {i:04d} LTDA", " ", " "))
+        # EDT raiz (sem célula) - descartada pelo filtro AFC_XPROD <> ' '
+        afc.append(("01", projeto, REVISAO, "01", " ", " ", " "))
+
+        for j in range(celulas):
+            celula = codigo_celula(j)
+            edt = f"01.{j + 1:02d}"
+            afc.append(("01", projeto, REVISAO, edt, celula, " ", " "))
+
+            for k in range(produtos):
+                tarefa = f"{edt}.{k // ITENS_POR_TAREFA + 1:02d}"
+                if k % ITENS_POR_TAREFA == 0:
+                    af9.append(("01", projeto, REVISAO, tarefa, edt, " "))
+                item = f"{k % ITENS_POR_TAREFA + 1:02d}"
+                produto = f"EL{(j * produtos + k) % 9999:06d}.MP"
+                quant = float(rnd.randint(1, 50))
+                afa.append(
+                    (
+                        "01",
+                        projeto,
+                        REVISAO,
+                        tarefa,
+                        item,
+                        produto,
+                        f"DESCRICAO DO PRODUTO {produto}".ljust(40),
+                        quant,
+                        "S",
+                        # ~2% deletadas: não podem aparecer nas consultas
+                        "*" if rnd.random() < 0.02 else " ",
+                    )
+                )
+                if rnd.random() < taxa_entregue:
+                    num_sa += 1
+                    entregue = float(rnd.randint(0, int(quant)))
+                    scp.append(
+                        (
+                            "01",
+                            f"{num_sa:06d}",
+                            "01",
+                            projeto,
+                            celula,
+                            tarefa,
+                            item,
+                            produto,
+                            entregue,
+                            float(rnd.randint(0, int(entregue))),
+                            "S",
+                            " ",
+                        )
+                    )
+
+    conn.executemany(
+        "INSERT INTO AF8010 (AF8_FILIAL, AF8_PROJET, AF8_REVISA, AF8_XNOMCL, "
+        "AF8_XCC, D_E_L_E_T_) VALUES (?, ?, ?, ?, ?, ?)",
+        af8,
+    )
+    conn.executemany(
+        "INSERT INTO AFC010 (AFC_FILIAL, AFC_PROJET, AFC_REVISA, AFC_EDT, "
+        "AFC_XPROD, AFC_XPRODU, D_E_L_E_T_) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        afc,
+    )
+    conn.executemany(
+        "INSERT INTO AF9010 (AF9_FILIAL, AF9_PROJET, AF9_REVISA, AF9_TAREFA, "
+        "AF9_EDTPAI, D_E_L_E_T_) VALUES (?, ?, ?, ?, ?, ?)",
+        af9,
+    )
+    conn.executemany(
+        "INSERT INTO AFA010 (AFA_FILIAL, AFA_PROJET, AFA_REVISA, AFA_TAREFA, "
+        "AFA_ITEM, AFA_PRODUT, AFA_XDESCR, AFA_QUANT, AFA_XESTRU, D_E_L_E_T_) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        afa,
+    )
+    conn.executemany(
+        "INSERT INTO SCP010 (CP_FILIAL, CP_NUM, CP_ITEM, CP_XPROJET, CP_XPROD, "
+        "CP_XTAREFA, CP_XITTARE, CP_PRODUTO, CP_QUANT, CP_XQUPR, CP_PREREQU, "
+        "D_E_L_E_T_) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        scp,
+    )
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+
+    return {
+        "projetos": [codigo_projeto(i) for i in range(projetos)],
+        "celulas": [codigo_celula(j) for j in range(celulas)],
+        "revisao": REVISAO,
+        "linhas": {
+            "AF8010": len(af8),
+            "AFC010": len(afc),
+            "AF9010": len(af9),
+            "AFA010": len(afa),
+            "SCP010": len(scp),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera o banco SQLite sintético")
+    parser.add_argument("caminho", nargs="?", default="bench.db")
+    parser.add_argument("--projetos", type=int, default=50)
+    parser.add_argument("--celulas", type=int, default=8)
+    parser.add_argument("--produtos", type=int, default=40, help="por célula")
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    info = criar_banco(
+        args.caminho, args.projetos, args.celulas, args.produtos, semente=args.semente
+    )
+    print(f"Banco {args.caminho} criado em {time.perf_counter() - inicio:.1f}s")
+    for tabela, qtd in info["linhas"].items():
+        print(f"  {tabela}: {qtd} linhas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+# benchmarks/servidor_falso.py
+# Servidor local que imita o /auth e o REST do Protheus (ordem de separação
+# e renovação de token), com latência configurável
+#
+# Uso (na pasta projeto_totvs), para rodar o app sem o Protheus:
+#   python benchmarks/servidor_falso.py --porta 8099 --latencia-protheus-ms 300
+#   AUTH_ENDPOINT_URL=http://127.0.0.1:8099/auth
+#   URL_REST_PROTHEUS=http://127.0.0.1:8099/rest/
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, como o Protheus
+    disable_nagle_algorithm = True  # cabeçalho e corpo saem em writes separados
+
+    def log_message(self, formato, *args):
+        pass
+
+    def do_POST(self):
+        servidor = self.server.falso
+        tamanho = int(self.headers.get("Content-Length") or 0)
+        corpo = self.rfile.read(tamanho) if tamanho else b""
+        caminho = self.path.split("?", 1)[0]
+
+        if caminho.endswith("/auth"):
+            servidor.esperar(servidor.latencia_auth)
+            servidor.contar("auth")
+            if not self.headers.get("X-Cliente-Token"):
+                return self._responder(401, {"detail": "X-Cliente-Token ausente"})
+            return self._responder(
+                200,
+                {
+                    "dados_autenticacao": {
+                        "token": uuid.uuid4().hex,
+                        "refresh_token": uuid.uuid4().hex,
+                        "expires_in": servidor.expires_in,
+                    }
+                },
+            )
+
+        if caminho.endswith("/oauth2/v1/token"):
+            servidor.esperar(servidor.latencia_auth)
+            servidor.contar("refresh")
+            return self._responder(
+                200,
+                {
+                    "access_token": uuid.uuid4().hex,
+                    "refresh_token": uuid.uuid4().hex,
+                    "expires_in": servidor.expires_in,
+                },
+            )
+
+        if caminho.rstrip("/").endswith("ordem_separacao_fabrica"):
+            servidor.esperar(servidor.latencia_protheus)
+            servidor.contar("ordem")
+            if servidor.sortear_erro():
+                servidor.contar("ordem_erro")
+                return self._responder(500, {"errorMessage": "Erro simulado"})
+            try:
+                ordem = json.loads(corpo or b"{}")
+            except ValueError:
+                return self._responder(400, {"errorMessage": "JSON inválido"})
+            itens = sum(len(c.get("itens", [])) for c in ordem.get("celulas", []))
+            return self._responder(
+                201,
+                {
+                    "sucesso": True,
+                    "projeto": ordem.get("projeto"),
+                    "itens": itens,
+                    "numero": f"{servidor.proximo_numero():06d}",
+                },
+            )
+
+        self._responder(404, {"errorMessage": f"Rota {caminho} não simulada"})
+
+    def _responder(self, status, dados):
+        corpo = json.dumps(dados).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+
+class ServidorFalso:
+    """
+    - latencia_*_ms: atraso de cada resposta (com jitter de +-jitter_pct%)
+    - taxa_erro: fração das ordens respondidas com 500
+    """
+
+    def __init__(
+        self,
+        porta=0,
+        latencia_auth_ms=50,
+        latencia_protheus_ms=200,
+        jitter_pct=20,
+        taxa_erro=0.0,
+        expires_in=3600,
+    ):
+        self.latencia_auth = latencia_auth_ms / 1000
+        self.latencia_protheus = latencia_protheus_ms / 1000
+        self.jitter = jitter_pct / 100
+        self.taxa_erro = taxa_erro
+        self.expires_in = expires_in
+
+        self._lock = threading.Lock()
+        self._contadores = {}
+        self._numero = 0
+
+        self._http = ThreadingHTTPServer(("127.0.0.1", porta), _Handler)
+        self._http.daemon_threads = True
+        self._http.falso = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, porta = self._http.server_address[:2]
+        return f"http://{host}:{porta}"
+
+    def iniciar(self):
+        self._thread = threading.Thread(
+            target=self._http.serve_forever, name="servidor-falso", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def parar(self):
+        self._http.shutdown()
+        self._http.server_close()
+
+    def esperar(self, base):
+        if base > 0:
+            time.sleep(base * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+    def sortear_erro(self):
+        return self.taxa_erro > 0 and random.random() < self.taxa_erro
+
+    def contar(self, nome):
+        with self._lock:
+            self._contadores[nome] = self._contadores.get(nome, 0) + 1
+
+    def proximo_numero(self):
+        with self._lock:
+            self._numero += 1
+            return self._numero
+
+    def estatisticas(self):
+        with self._lock:
+            return dict(self._contadores)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Protheus e /auth simulados")
+    parser.add_argument("--porta", type=int, default=8099)
+    parser.add_argument("--latencia-auth-ms", type=float, default=50)
+    parser.add_argument("--latencia-protheus-ms", type=float, default=200)
+    parser.add_argument("--taxa-erro", type=float, default=0.0)
+    args = parser.parse_args()
+
+    servidor = ServidorFalso(
+        args.porta,
+        args.latencia_auth_ms,
+        args.latencia_protheus_ms,
+        taxa_erro=args.taxa_erro,
+    ).iniciar()
+    print(f"Servidor falso em {servidor.url} (Ctrl+C para sair)")
+    print(f"  AUTH_ENDPOINT_URL={servidor.url}/auth")
+    print(f"  URL_REST_PROTHEUS={servidor.url}/rest/")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        servidor.parar()
+
+
+if __name__ == "__main__":
+    main()
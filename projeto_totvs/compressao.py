@@ -0,0 +1,88 @@
+# compressao.py
+# Compressão das respostas dinâmicas (JSON/HTML) negociada pelo
+# Accept-Encoding: brotli quando instalado e aceito, senão gzip
+
+import gzip
+
+from flask import request
+
+from config import Config
+from models.metricas import REGISTRO
+
+try:
+    import brotli
+except ImportError:  # opcional: sem ele só gzip
+    brotli = None
+
+TIPOS_COMPRIMIVEIS = {
+    "application/json",
+    "text/html",
+    "text/css",
+    "text/plain",
+    "application/javascript",
+    "text/javascript",
+}
+
+COMPRESSAO_BYTES = REGISTRO.contador(
+    "portal_compressao_bytes_total",
+    "Bytes das respostas antes e depois da compressão",
+    ("codificacao", "etapa"),
+)
+
+
+def escolher_codificacao(aceitas):
+    """'br', 'gzip' ou None conforme o Accept-Encoding e o que está instalado"""
+    if brotli is not None and aceitas["br"]:
+        return "br"
+    if aceitas["gzip"]:
+        return "gzip"
+    return None
+
+
+def comprimir(dados, codificacao):
+    if codificacao == "br":
+        return brotli.compress(dados, quality=Config.COMPRESSAO_NIVEL_BROTLI)
+    # mtime fixo: mesmo corpo, mesmos bytes comprimidos
+    return gzip.compress(dados, compresslevel=Config.COMPRESSAO_NIVEL_GZIP, mtime=0)
+
+
+def registrar_compressao(app):
+    """Comprime no after_request as respostas acima de COMPRESSAO_MIN_BYTES"""
+
+    @app.after_request
+    def _comprimir(response):
+        if response.mimetype not in TIPOS_COMPRIMIVEIS:
+            return response
+        response.vary.add("Accept-Encoding")
+
+        # Streams (NDJSON, SSE) e arquivos (send_file) passam direto: comprimir
+        # exigiria juntar tudo na memória e atrasaria os eventos
+        if (
+            response.is_streamed
+            or response.direct_passthrough
+            or response.status_code < 200
+            or response.status_code in (204, 304)
+            or "Content-Encoding" in response.headers
+        ):
+            return response
+
+        codificacao = escolher_codificacao(request.accept_encodings)
+        if codificacao is None:
+            return response
+
+        dados = response.get_data()
+        if len(dados) < Config.COMPRESSAO_MIN_BYTES:
+            return response
+
+        comprimido = comprimir(dados, codificacao)
+        COMPRESSAO_BYTES.inc(len(dados), codificacao=codificacao, etapa="original")
+        COMPRESSAO_BYTES.inc(len(comprimido), codificacao=codificacao, etapa="enviado")
+
+        response.set_data(comprimido)
+        response.headers["Content-Encoding"] = codificacao
+        # Outros bytes, mesmo conteúdo: o ETag vira fraco (If-None-Match
+        # compara de forma fraca e continua batendo com a versão sem compressão)
+        etag, fraco = response.get_etag()
+        if etag and not fraco:
+            response.set_etag(etag, weak=True)
+        return response
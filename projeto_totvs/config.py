@@ -43,6 +43,60 @@ class Config:
             f"PWD={Config.get_db_password()}"
         )
 
+    # ========== POOL DE CONEXÕES ==========
+    DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", 2))
+    DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", 10))
+    DB_POOL_MAX_LIFETIME = int(os.getenv("DB_POOL_MAX_LIFETIME", 1800))  # segundos
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 10))  # espera por conexão
+    DB_POOL_HEALTHCHECK_IDLE = int(os.getenv("DB_POOL_HEALTHCHECK_IDLE", 30))
+    DB_CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", 15))
+    DB_FETCH_BATCH = int(os.getenv("DB_FETCH_BATCH", 500))  # linhas por fetchmany
+    DB_SLOW_QUERY_MS = int(os.getenv("DB_SLOW_QUERY_MS", 1000))  # loga acima disso
+    DB_PROFILER_TOP_N = int(os.getenv("DB_PROFILER_TOP_N", 20))
+
+    # Usuários com acesso às rotas /api/admin (separados por vírgula)
+    ADMIN_USERS = [
+        u.strip() for u in os.getenv("ADMIN_USERS", "").split(",") if u.strip()
+    ]
+    # /metrics só com "Authorization: Bearer <METRICAS_TOKEN>"; vazio = desligado
+    METRICAS_TOKEN = os.getenv("METRICAS_TOKEN")
+
+    # ========== RÉPLICA LOCAL DAS LEITURAS ==========
+    # Cópia em SQLite dos agregados, sincronizada em segundo plano
+    REPLICA_ATIVA = os.getenv("REPLICA_ATIVA", "false").lower() == "true"
+    REPLICA_DB_PATH = os.getenv("REPLICA_DB_PATH", "replica_local.db")
+    # R_E_C_N_O_ (só inclusões) ou S_T_A_M_P_ (inclusões e alterações)
+    REPLICA_COLUNA_MARCA = os.getenv("REPLICA_COLUNA_MARCA", "R_E_C_N_O_")
+    REPLICA_INTERVALO = int(os.getenv("REPLICA_INTERVALO", 30))  # segundos
+    REPLICA_DEFASAGEM_MAX = int(os.getenv("REPLICA_DEFASAGEM_MAX", 120))
+    REPLICA_RESYNC_COMPLETO = int(os.getenv("REPLICA_RESYNC_COMPLETO", 3600))
+
+    # ========== CACHE DAS LEITURAS ==========
+    # TTL em segundos (0 desativa) e número máximo de entradas por endpoint
+    CACHE_TTL_PROJETOS = int(os.getenv("CACHE_TTL_PROJETOS", 300))
+    CACHE_TTL_ARVORES = int(os.getenv("CACHE_TTL_ARVORES", 60))
+    CACHE_MAX_ARVORES = int(os.getenv("CACHE_MAX_ARVORES", 256))
+
+    # ========== ACOMPANHAMENTO DAS ENTREGAS (SSE) ==========
+    # Uma consulta por projeto/revisão a cada SSE_INTERVALO, para todos os inscritos
+    SSE_INTERVALO = int(os.getenv("SSE_INTERVALO", 10))  # segundos
+    SSE_HEARTBEAT = int(os.getenv("SSE_HEARTBEAT", 15))  # comentário p/ proxies
+    # Cada conexão prende uma thread do servidor: o navegador reconecta sozinho
+    SSE_DURACAO_MAX = int(os.getenv("SSE_DURACAO_MAX", 300))
+    # Limitado também a SERVIDOR_THREADS // 2 (ver ProjetoController)
+    SSE_MAX_ASSINATURAS = int(os.getenv("SSE_MAX_ASSINATURAS", 100))
+
+    # ========== SERIALIZAÇÃO JSON ==========
+    # auto: orjson se instalado, senão json da stdlib; "json" força a stdlib
+    JSON_BACKEND = os.getenv("JSON_BACKEND", "auto").lower()
+
+    # ========== COMPRESSÃO DAS RESPOSTAS ==========
+    # Desative se um proxy na frente (IIS/nginx) já comprime
+    COMPRESSAO_ATIVA = os.getenv("COMPRESSAO_ATIVA", "true").lower() == "true"
+    COMPRESSAO_MIN_BYTES = int(os.getenv("COMPRESSAO_MIN_BYTES", 1024))
+    COMPRESSAO_NIVEL_GZIP = int(os.getenv("COMPRESSAO_NIVEL_GZIP", 6))
+    COMPRESSAO_NIVEL_BROTLI = int(os.getenv("COMPRESSAO_NIVEL_BROTLI", 5))
+
     # ========== CONFIGURAÇÕES DE EMAIL ==========
     EMAIL_ADDRESS = os.getenv("EMAIL_ADDRESS", "senha.portal.mrb@motoman.com.br")
     EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD")
@@ -63,11 +117,31 @@ class Config:
     # URL completa do endpoint de autenticação
     AUTH_ENDPOINT_URL = os.getenv("AUTH_ENDPOINT_URL", "http://172.22.8.25:8000/auth")
 
+    # Renovação do token do Protheus (OAuth2 padrão do REST)
+    AUTH_REFRESH_URL = os.getenv("AUTH_REFRESH_URL")
+    PROTHEUS_TOKEN_TTL = int(os.getenv("PROTHEUS_TOKEN_TTL", 3600))  # se não informado
+    PROTHEUS_TOKEN_MARGEM = int(os.getenv("PROTHEUS_TOKEN_MARGEM", 120))
+    # Após uma renovação recusada, segundos até tentar de novo
+    PROTHEUS_TOKEN_ESPERA_FALHA = int(os.getenv("PROTHEUS_TOKEN_ESPERA_FALHA", 30))
+    # Token lido do banco de sessões fica na memória do worker por N segundos
+    PROTHEUS_TOKEN_MEMORIA_TTL = int(os.getenv("PROTHEUS_TOKEN_MEMORIA_TTL", 30))
+
+    # Cache dos JWT já verificados (segundos; nunca passa da expiração do token)
+    JWT_CACHE_TTL = int(os.getenv("JWT_CACHE_TTL", 300))
+    JWT_CACHE_MAX = int(os.getenv("JWT_CACHE_MAX", 2048))
+
     @staticmethod
     def get_auth_endpoint():
         """Retorna a URL completa para o endpoint de autenticação"""
         return Config.AUTH_ENDPOINT_URL
 
+    @staticmethod
+    def get_auth_refresh_endpoint():
+        """URL de renovação do token (padrão: /api/oauth2/v1/token do REST)"""
+        if Config.AUTH_REFRESH_URL:
+            return Config.AUTH_REFRESH_URL
+        return f"{Config.URL_REST_PROTHEUS.rstrip('/')}/api/oauth2/v1/token"
+
     @staticmethod
     def get_url_ordem_separacao():
         """Retorna a URL completa para o endpoint de ordem de separação"""
@@ -75,13 +149,84 @@ class Config:
         endpoint = Config.ENDPOINT_ORDEM_SEPARACAO
         return f"{base}{endpoint}"
 
+    # ========== FILA DE ORDENS DE SEPARAÇÃO ==========
+    FILA_DB_PATH = os.getenv("FILA_DB_PATH", "fila_ordens.db")
+    FILA_WORKERS = int(os.getenv("FILA_WORKERS", 4))  # envios simultâneos
+    FILA_MAX_PENDENTES = int(os.getenv("FILA_MAX_PENDENTES", 200))
+    FILA_RETENCAO_HORAS = int(os.getenv("FILA_RETENCAO_HORAS", 72))
+
+    # ========== ESTADO COMPARTILHADO ENTRE PROCESSOS ==========
+    # Sessões (tokens do Protheus) e invalidações de cache vistas por todos
+    # os workers do gunicorn
+    COMPARTILHADO_DB_PATH = os.getenv("COMPARTILHADO_DB_PATH", "compartilhado.db")
+
+    # ========== ENVIO EM LOTE ==========
+    LOTE_MAX_ORDENS = int(os.getenv("LOTE_MAX_ORDENS", 50))
+
+    # ========== CLIENTE HTTP (PROTHEUS / AUTH) ==========
+    HTTP_POOL_HOSTS = int(os.getenv("HTTP_POOL_HOSTS", 4))
+    HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", 10))  # conexões por host
+    HTTP_TENTATIVAS = int(os.getenv("HTTP_TENTATIVAS", 3))
+    HTTP_BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", 0.2))
+    HTTP_BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", 2.0))
+    HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 5))
+    HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", 30))
+    # Leitura: o Protheus pode demorar para gerar a ordem; o /auth é rápido
+    PROTHEUS_READ_TIMEOUT = float(os.getenv("PROTHEUS_READ_TIMEOUT", 60))
+    AUTH_READ_TIMEOUT = float(os.getenv("AUTH_READ_TIMEOUT", 10))
+
+    # ========== CIRCUIT BREAKER (PROTHEUS / AUTH) ==========
+    CB_JANELA = int(os.getenv("CB_JANELA", 30))  # segundos observados
+    CB_MIN_CHAMADAS = int(os.getenv("CB_MIN_CHAMADAS", 5))
+    CB_TAXA_FALHA = float(os.getenv("CB_TAXA_FALHA", 0.5))  # 50% de falhas abre
+    CB_TEMPO_ABERTO = int(os.getenv("CB_TEMPO_ABERTO", 15))
+    CB_INTERVALO_SONDA = int(os.getenv("CB_INTERVALO_SONDA", 5))
+
     # ========== TIMEOUTS E LIMITES ==========
     REQUEST_TIMEOUT = 60  # segundos
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB
 
+    # ========== SERVIDOR DE PRODUÇÃO (GUNICORN / WAITRESS) ==========
+    # Ligado pelo gunicorn.conf.py: vários processos dividem os SQLite locais
+    PREFORK = os.getenv("PORTAL_PREFORK", "false").lower() == "true"
+    SERVIDOR_BIND = os.getenv("SERVIDOR_BIND", "0.0.0.0:5000")
+    # Cada worker tem seu pool: conexões no SQL Server = WORKERS x DB_POOL_MAX
+    SERVIDOR_WORKERS = int(os.getenv("SERVIDOR_WORKERS", 2))
+    # Threads por worker (cada stream SSE prende uma enquanto aberta)
+    SERVIDOR_THREADS = int(os.getenv("SERVIDOR_THREADS", 32))
+    # Recicla o worker após N requisições (+ jitter para não reciclarem juntos)
+    SERVIDOR_MAX_REQUESTS = int(os.getenv("SERVIDOR_MAX_REQUESTS", 5000))
+    SERVIDOR_MAX_REQUESTS_JITTER = int(os.getenv("SERVIDOR_MAX_REQUESTS_JITTER", 500))
+    SERVIDOR_TIMEOUT = int(os.getenv("SERVIDOR_TIMEOUT", 90))  # worker travado
+    # Tempo para terminar as requisições (e ordens na fila) no reload/parada
+    SERVIDOR_GRACEFUL_TIMEOUT = int(os.getenv("SERVIDOR_GRACEFUL_TIMEOUT", 60))
+    SERVIDOR_KEEPALIVE = int(os.getenv("SERVIDOR_KEEPALIVE", 5))
+    # Carrega a lista de projetos em cada worker antes de atender
+    SERVIDOR_AQUECER = os.getenv("SERVIDOR_AQUECER", "true").lower() == "true"
+    # /metrics no gunicorn: instantâneo de cada worker, somados no scrape
+    METRICAS_DIR = os.getenv("METRICAS_DIR", "metricas_workers")
+    METRICAS_INTERVALO = int(os.getenv("METRICAS_INTERVALO", 5))  # segundos
+
+    # ========== CAMINHO ASSÍNCRONO (ASGI) ==========
+    # Threads do executor das consultas de leitura (além disso só esperariam o pool)
+    ASYNC_DB_THREADS = int(os.getenv("ASYNC_DB_THREADS", DB_POOL_MAX))
+    # Requisições de leitura aguardando o banco (corrotinas); acima disso 503
+    ASYNC_MAX_ESPERA = int(os.getenv("ASYNC_MAX_ESPERA", 2000))
+    # Respostas acima disso são comprimidas fora do event loop
+    ASYNC_COMPRIMIR_FORA_BYTES = int(os.getenv("ASYNC_COMPRIMIR_FORA_BYTES", 65536))
+
     # ========== LOGGING ==========
-    LOG_FILE = "sistema.log"
-    LOG_LEVEL = "INFO"
+    LOG_FILE = os.getenv("LOG_FILE", "sistema.log")
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMATO = os.getenv("LOG_FORMATO", "json")  # json (uma linha por log) ou texto
+    LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", 10 * 1024 * 1024))
+    LOG_BACKUPS = int(os.getenv("LOG_BACKUPS", 10))
+    LOG_ROTACAO_HORAS = int(os.getenv("LOG_ROTACAO_HORAS", 24))  # 0 = só por tamanho
+    LOG_FILA_MAX = int(os.getenv("LOG_FILA_MAX", 10000))  # cheia = descarta
+    # Amostragem dos logs verbosos (payloads/respostas) por logger
+    LOG_AMOSTRAGEM = os.getenv(
+        "LOG_AMOSTRAGEM", "ProtheusIntegration=1.0,AuthModel=1.0"
+    )
 
 
 class DevelopmentConfig(Config):
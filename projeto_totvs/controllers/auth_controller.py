@@ -1,13 +1,34 @@
 # controllers/auth_controller.py
 import jwt
 import datetime
+import hashlib
+import hmac
 import logging
+import time
+import uuid
 from functools import wraps
 from flask import request, jsonify, current_app, g
+from config import Config
 from models.auth_model import AuthModel
+from models.cache import CacheTTL
+from models.token_store import get_token_store
 
 logger = logging.getLogger("Auth")
 
+# JWT já verificados (chave = hash do token): evita HMAC + parse a cada chamada
+_jwt_verificados = CacheTTL("jwt", Config.JWT_CACHE_TTL, Config.JWT_CACHE_MAX)
+
+
+def _chave_token(token):
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def estatisticas_sessoes():
+    return {
+        "jwt_cache": _jwt_verificados.estatisticas(),
+        "tokens_protheus": get_token_store().estatisticas(),
+    }
+
 
 class AuthController:
     def __init__(self):
@@ -23,9 +44,11 @@ class AuthController:
 
         # 2. Gera JWT e guarda o token do Protheus dentro dele
         try:
+            sid = uuid.uuid4().hex
             token_flask = jwt.encode(
                 {
                     "user": username,
+                    "sid": sid,  # sessão no TokenStore (refresh do Protheus)
                     "protheus_token": resultado["access_token"],  # Token salvo aqui
                     "exp": datetime.datetime.utcnow() + datetime.timedelta(hours=8),
                 },
@@ -33,11 +56,57 @@ class AuthController:
                 algorithm="HS256",
             )
 
+            store = get_token_store()
+            store.limpar_expiradas()
+            store.registrar(
+                sid,
+                username,
+                resultado["access_token"],
+                resultado.get("refresh_token"),
+                resultado.get("expires_in"),
+            )
+
             return {"success": True, "token": token_flask, "user": username}
         except Exception as e:
             logger.error(f"Erro JWT: {e}")
             return {"success": False, "error": "Erro sessão"}
 
+    def logout(self, token):
+        """Descarta a sessão do cache e o token do Protheus guardado no servidor"""
+        if not token:
+            return
+        _jwt_verificados.invalidar(_chave_token(token))
+        try:
+            data = jwt.decode(
+                token, current_app.config["SECRET_KEY"], algorithms=["HS256"]
+            )
+        except jwt.PyJWTError:
+            return
+        get_token_store().remover(data.get("sid"))
+
+
+def _verificar_token(token, chave_secreta=None):
+    """Payload do JWT, do cache ou validando assinatura/expiração"""
+    chave = _chave_token(token)
+    encontrado, data = _jwt_verificados.obter(chave)
+    if encontrado:
+        return data
+
+    if chave_secreta is None:
+        chave_secreta = current_app.config["SECRET_KEY"]
+    data = jwt.decode(token, chave_secreta, algorithms=["HS256"])
+    # Nunca mantém no cache além da expiração do próprio token
+    _jwt_verificados.definir(chave, data, ttl=data["exp"] - time.time())
+    return data
+
+
+def sessao_do_token(token, chave_secreta):
+    """Payload do JWT ou None se inválido/expirado (caminho ASGI, sem Flask)"""
+    try:
+        return _verificar_token(token, chave_secreta)
+    except Exception:
+        return None
+
 
 # Decorator atualizado
 def token_required(f):
@@ -53,15 +122,46 @@ def token_required(f):
             return jsonify({"message": "Sessão inválida"}), 401
 
         try:
-            data = jwt.decode(
-                token, current_app.config["SECRET_KEY"], algorithms=["HS256"]
-            )
+            data = _verificar_token(token)
             g.user = data["user"]
-            # RECUPERA O TOKEN AQUI PARA O PROJETO_CONTROLLER USAR
-            g.protheus_token = data.get("protheus_token")
         except:
             return jsonify({"message": "Sessão expirada"}), 401
 
+        # RECUPERA O TOKEN AQUI PARA O PROJETO_CONTROLLER USAR
+        # (renovado no servidor se estiver perto de expirar)
+        g.protheus_token = get_token_store().token_atual(data.get("sid")) or data.get(
+            "protheus_token"
+        )
+
+        return f(*args, **kwargs)
+
+    return decorated
+
+
+def metricas_required(f):
+    """/metrics: Bearer METRICAS_TOKEN (sem ele configurado a rota não existe)"""
+
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        esperado = Config.METRICAS_TOKEN
+        if not esperado:
+            return jsonify({"success": False, "error": "Rota não encontrada"}), 404
+        partes = request.headers.get("Authorization", "").split()
+        informado = partes[1] if len(partes) == 2 and partes[0] == "Bearer" else ""
+        if not hmac.compare_digest(informado.encode(), esperado.encode()):
+            return jsonify({"message": "Token de métricas inválido"}), 401
+        return f(*args, **kwargs)
+
+    return decorated
+
+
+def admin_required(f):
+    """Usar depois de token_required: só usuários listados em ADMIN_USERS"""
+
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        if g.get("user") not in Config.ADMIN_USERS:
+            return jsonify({"message": "Acesso restrito a administradores"}), 403
         return f(*args, **kwargs)
 
     return decorated
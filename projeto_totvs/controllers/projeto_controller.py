@@ -1,58 +1,387 @@
 # controllers/projeto_controller.py
 from models.projeto_model import ProjetoModel
+from models.cache import CacheTTL
+from models.arvore_projeto import calcular_estatisticas
+from models.indice_projetos import IndiceProjetos, CursorInvalidoError
+from models.fila_ordens import FilaOrdens
+from models.invalidacoes import InvalidacoesCompartilhadas
+from models.progresso_entregas import AcompanhamentoEntregas
+from models.http_client import get_cliente_http, get_circuito
+from models.circuit_breaker import CircuitoAbertoError
 from flask import g
-import requests
 import json
 import logging
+import threading
 from config import Config
+from logging_config import Preguicoso
+import json_provider
 
 logger = logging.getLogger("ProtheusIntegration")
 
 
+def validar_payload_ordem(dados):
+    """Valida a estrutura da ordem; retorna a mensagem de erro ou None"""
+    if not dados:
+        logger.error("Requisição sem dados JSON")
+        return "Dados não fornecidos"
+
+    if not isinstance(dados, dict):
+        logger.error("Payload da ordem não é um objeto JSON")
+        return "Dados inválidos"
+
+    # Validações básicas
+    if "projeto" not in dados:
+        logger.error("Campo 'projeto' ausente no payload")
+        return 'Campo "projeto" é obrigatório'
+
+    if "celulas" not in dados or not isinstance(dados["celulas"], list):
+        logger.error("Campo 'celulas' ausente ou inválido no payload")
+        return 'Campo "celulas" deve ser uma lista'
+
+    if len(dados["celulas"]) == 0:
+        logger.error("Lista de células vazia")
+        return "Pelo menos uma célula deve ser informada"
+
+    # Valida estrutura de cada célula
+    for idx, celula in enumerate(dados["celulas"]):
+        if "celula" not in celula or "itens" not in celula:
+            logger.error(f"Célula {idx} com estrutura inválida")
+            return f"Célula {idx} está com estrutura inválida"
+
+        if not isinstance(celula["itens"], list) or len(celula["itens"]) == 0:
+            logger.error(f"Célula {celula['celula']} sem itens")
+            return f'Célula {celula["celula"]} deve ter pelo menos um item'
+
+    return None
+
+
+def _ms(inicio, fim):
+    return round((fim - inicio) * 1000) if inicio and fim else None
+
+
+def resumir_lote(jobs):
+    """
+    Resultado agregado dos jobs de um lote: sucesso/falha e tempos de cada
+    projeto (espera na fila e envio ao Protheus) e a duração do lote, que só
+    é calculada quando todos terminaram
+    """
+    projetos = []
+    for job in jobs:
+        resultado = job["resultado"] or {}
+        finalizado = job["status"] in ("concluido", "erro")
+        projetos.append(
+            {
+                "projeto": job["projeto"],
+                "job_id": job["job_id"],
+                "status": job["status"],
+                "success": bool(resultado.get("success")) if finalizado else None,
+                "error": resultado.get("error"),
+                "espera_ms": _ms(job["criado_em"], job["iniciado_em"]),
+                "duracao_ms": _ms(job["iniciado_em"], job["concluido_em"]),
+            }
+        )
+
+    finalizados = [p for p in projetos if p["success"] is not None]
+    duracao_ms = None
+    if jobs and len(finalizados) == len(projetos):
+        duracao_ms = _ms(
+            min(j["criado_em"] for j in jobs), max(j["concluido_em"] for j in jobs)
+        )
+    return {
+        "total": len(projetos),
+        "finalizados": len(finalizados),
+        "sucesso": sum(1 for p in finalizados if p["success"]),
+        "falha": sum(1 for p in finalizados if not p["success"]),
+        "duracao_ms": duracao_ms,
+        "projetos": projetos,
+    }
+
+
 class ProjetoController:
     def __init__(self):
         self.model = ProjetoModel()
+        self.http = get_cliente_http()
+        # Abre as conexões mínimas do pool sem travar a subida do app
+        threading.Thread(
+            target=self.model.pool.aquecer, name="aquecer-pool", daemon=True
+        ).start()
+
+        # Cache das leituras (invalidado quando uma ordem é enviada)
+        self.cache_projetos = CacheTTL("projetos", Config.CACHE_TTL_PROJETOS, 1)
+        # Uma árvore por (projeto, revisão) atende células, produtos e totais
+        self.cache_arvores = CacheTTL(
+            "arvores", Config.CACHE_TTL_ARVORES, Config.CACHE_MAX_ARVORES
+        )
+
+        # Ordens enviadas por outros workers também invalidam este cache
+        self.invalidacoes = InvalidacoesCompartilhadas(Config.COMPARTILHADO_DB_PATH)
+
+        # Entregas em tempo real (SSE): uma consulta por projeto para todos.
+        # Cada stream prende uma das SERVIDOR_THREADS (gunicorn, waitress e o
+        # Flask do asgi.py): no máximo metade, para sobrar para as outras rotas
+        max_assinaturas = min(
+            Config.SSE_MAX_ASSINATURAS, max(1, Config.SERVIDOR_THREADS // 2)
+        )
+        self.acompanhamento = AcompanhamentoEntregas(
+            self._arvore_atual,
+            intervalo=Config.SSE_INTERVALO,
+            max_assinaturas=max_assinaturas,
+            verificar_externos=self.aplicar_invalidacoes,
+        )
+
+        # Fila de envio assíncrono das ordens (não prende o worker HTTP)
+        self.fila = FilaOrdens(
+            self.enviar_ordem_separacao,
+            Config.FILA_DB_PATH,
+            workers=Config.FILA_WORKERS,
+            max_pendentes=Config.FILA_MAX_PENDENTES,
+            # Com vários workers quem marca é o master (gunicorn.conf.py)
+            marcar_interrompidas=not Config.PREFORK,
+        )
+        self.fila.limpar_antigos(Config.FILA_RETENCAO_HORAS)
+
+    def encerrar(self):
+        """Saída do worker: termina as ordens já na fila e solta a réplica"""
+        self.fila.encerrar(aguardar=True)
+        if self.model.replica is not None:
+            self.model.replica.parar()
+
+    def estatisticas_pool(self):
+        """Uso do pool de conexões (para dimensionar contra o SQL Server)"""
+        return self.model.pool.estatisticas()
+
+    def estatisticas_http(self):
+        """Chamadas e reaproveitamento de conexões do cliente HTTP"""
+        return self.http.estatisticas()
+
+    def estatisticas_replica(self):
+        """Defasagem e sincronizações da réplica local (None se desativada)"""
+        if self.model.replica is None:
+            return None
+        return self.model.replica.estatisticas()
+
+    def estatisticas_cache(self):
+        """Hits/misses de cada cache de leitura"""
+        return {
+            c.nome: c.estatisticas() for c in (self.cache_projetos, self.cache_arvores)
+        }
+
+    def _consultar(self, cache, chave, consulta, projeto=None):
+        """
+        Executa a consulta com conexão do pool (ou na réplica local, se em
+        dia para o projeto), passando antes pelo cache
+        """
+
+        def carregar():
+            if not self.model.conectar(projeto):
+                return None
+            try:
+                return consulta()
+            finally:
+                self.model.desconectar()
+
+        # Lista vazia pode ser erro engolido pelo model: não vai para o cache
+        return cache.obter_ou_carregar(chave, carregar)
+
+    def invalidar_cache(self, projeto):
+        """Descarta as árvores (todas as revisões) do projeto, em todos os workers"""
+        projeto = str(projeto).strip()
+        self._invalidar_local(projeto)
+        self.invalidacoes.marcar(projeto)
+        if self.model.replica is not None:
+            self.model.replica.marcar_sujo(projeto)
 
-    # --- LEITURAS (MANTIDAS IGUAIS) ---
-    def listar_projetos(self):
-        if not self.model.conectar():
-            return {"success": False, "error": "Erro Banco"}
+    def _invalidar_local(self, projeto):
+        self.cache_arvores.invalidar_se(lambda k: k[0] == projeto)
+        self.acompanhamento.antecipar(projeto)
+
+    def aplicar_invalidacoes(self):
+        """
+        Invalidações gravadas por outros processos desde a última olhada.
+        Consulta o SQLite: o caminho assíncrono chama numa thread, a cada
+        segundo, em vez de a cada leitura
+        """
+        for projeto in self.invalidacoes.novas():
+            self._invalidar_local(projeto)
+
+    def obter_arvore(self, projeto, revisao, somente_cache=False):
+        """
+        ArvoreProjeto do cache ou de uma única consulta ao banco.
+        somente_cache=True nunca vai ao banco: None se não estiver em cache
+        (o caminho assíncrono usa isso para só mandar ao executor o que precisa;
+        nesse caso não olha as invalidações, que tocam o SQLite)
+        """
+        if somente_cache:
+            return self.cache_arvores.espiar(
+                (str(projeto).strip(), str(revisao).strip())
+            )
+        self.aplicar_invalidacoes()
+        return self._consultar(
+            self.cache_arvores,
+            (str(projeto).strip(), str(revisao).strip()),
+            lambda: self.model.get_arvore(projeto, revisao),
+            projeto=str(projeto).strip(),
+        )
+
+    def _arvore_atual(self, projeto, revisao):
+        """Árvore lida do banco (ignora o cache) e já guardada nele"""
+        if not self.model.conectar(projeto):
+            return None
         try:
-            return {"success": True, "data": self.model.get_projetos()}
+            arvore = self.model.get_arvore(projeto, revisao)
         finally:
             self.model.desconectar()
+        if arvore:
+            self.cache_arvores.definir((projeto, revisao), arvore)
+        return arvore
 
-    def listar_celulas(self, projeto, revisao):
-        if not self.model.conectar():
-            return {"success": False, "error": "Erro Banco"}
+    # --- LEITURAS ---
+    def _indice_projetos(self, somente_cache=False):
+        """Índice de busca reconstruído a cada recarga do cache de projetos"""
+        if somente_cache:
+            return self.cache_projetos.espiar("todos")
+        return self._consultar(
+            self.cache_projetos,
+            "todos",
+            lambda: IndiceProjetos(self.model.get_projetos()),
+        )
+
+    # Com somente_cache=True as leituras abaixo retornam None quando
+    # precisariam consultar o banco
+    def listar_projetos(self, somente_cache=False):
+        indice = self._indice_projetos(somente_cache)
+        if indice is None:
+            return None if somente_cache else {"success": False, "error": "Erro Banco"}
+        return {"success": True, "data": indice.todos(), "versao": indice.versao}
+
+    def buscar_projetos(self, termo="", limite=50, cursor=None, somente_cache=False):
+        """Busca por código/nome com paginação keyset (cursor opaco)"""
+        indice = self._indice_projetos(somente_cache)
+        if indice is None:
+            return None if somente_cache else {"success": False, "error": "Erro Banco"}
         try:
-            return {"success": True, "data": self.model.get_celulas(projeto, revisao)}
-        finally:
-            self.model.desconectar()
+            itens, proximo, total = indice.buscar(termo, limite, cursor)
+        except CursorInvalidoError as e:
+            return {"success": False, "error": str(e), "status": 400}
+        return {
+            "success": True,
+            "data": itens,
+            "proximo_cursor": proximo,
+            "total": total,
+            "versao": indice.versao,
+        }
+
+    def listar_celulas(self, projeto, revisao, somente_cache=False):
+        arvore = self.obter_arvore(projeto, revisao, somente_cache)
+        if arvore is None:
+            return None if somente_cache else {"success": False, "error": "Erro Banco"}
+        return {"success": True, "data": arvore.celulas(), "versao": arvore.versao}
+
+    def listar_produtos(self, projeto, revisao, celula, somente_cache=False):
+        arvore = self.obter_arvore(projeto, revisao, somente_cache)
+        if arvore is None:
+            return None if somente_cache else {"success": False, "error": "Erro Banco"}
+        return {
+            "success": True,
+            "data": arvore.produtos(celula),
+            "estatisticas": arvore.estatisticas(celula),
+            "versao": arvore.versao,
+        }
+
+    def stream_produtos(self, projeto, revisao, celula):
+        """
+        Gera os produtos em NDJSON (uma linha JSON por produto) e, ao final,
+        o registro {"estatisticas": {...}} com os totais somados no caminho.
+        Se a árvore já está em cache usa-a; senão lê direto do cursor.
+        """
+        self.aplicar_invalidacoes()
+        encontrado, arvore = self.cache_arvores.obter(
+            (str(projeto).strip(), str(revisao).strip())
+        )
+        if encontrado:
+            linhas = iter(arvore.produtos(celula))
+        else:
+            linhas = self.model.iterar_produtos(projeto, revisao, celula)
 
-    def listar_produtos(self, projeto, revisao, celula):
-        if not self.model.conectar():
-            return {"success": False, "error": "Erro Banco"}
+        total_nec = 0
+        total_ent = 0
         try:
-            dados = self.model.get_produtos(projeto, revisao, celula)
-            total_nec = sum(d["AFA_QUANT"] for d in dados)
-            total_ent = sum(d["CP_XQUPR"] for d in dados)
-            perc = round((total_ent / total_nec * 100)) if total_nec > 0 else 0
+            for linha in linhas:
+                total_nec += linha["AFA_QUANT"]
+                total_ent += linha["CP_XQUPR"]
+                yield json_provider.dumps(linha) + "\n"
+        except Exception as e:
+            logger.exception(f"Erro no streaming de produtos: {e}")
+            yield json.dumps({"error": "Erro Banco"}) + "\n"
+            return
+
+        yield json_provider.dumps(
+            {"estatisticas": calcular_estatisticas(total_nec, total_ent)}
+        ) + "\n"
+
+    def carregar_arvore(self, projeto, revisao, colunar=False, somente_cache=False):
+        """Projeto inteiro em uma resposta (UI troca de célula sem nova chamada)"""
+        arvore = self.obter_arvore(projeto, revisao, somente_cache)
+        if arvore is None:
+            return None if somente_cache else {"success": False, "error": "Erro Banco"}
+        return {
+            "success": True,
+            # Cada formato é montado uma vez por árvore (fica memorizado)
+            "data": arvore.para_colunar() if colunar else arvore.para_dict(),
+            "versao": arvore.versao,
+        }
+
+    # --- ENVIO DE ORDEM (COM LIMPEZA DE ESPAÇOS) ---
+    def enfileirar_ordem(self, payload, usuario, token_protheus):
+        """Grava a ordem na fila e retorna o id do job"""
+        return self.fila.enfileirar(payload, usuario, token_protheus)
+
+    def status_ordens(self, ids, usuario):
+        """Status dos jobs do usuário (ids desconhecidos são omitidos)"""
+        return self.fila.consultar_varios(ids, usuario)
+
+    def enfileirar_lote(self, ordens, usuario, token_protheus):
+        """
+        Enfileira várias ordens (uma por projeto); os workers da fila limitam
+        as chamadas simultâneas ao Protheus.
+        Valida tudo antes: se alguma ordem for inválida nada é enfileirado.
+        Pode levantar FilaCheiaError.
+        """
+        if not isinstance(ordens, list) or not ordens:
+            return {"success": False, "error": 'Campo "ordens" deve ser uma lista'}
+        if len(ordens) > Config.LOTE_MAX_ORDENS:
             return {
-                "success": True,
-                "data": dados,
-                "estatisticas": {
-                    "total_necessidade": total_nec,
-                    "total_entregue": total_ent,
-                    "percentual_geral": perc,
-                },
+                "success": False,
+                "error": f"Máximo de {Config.LOTE_MAX_ORDENS} ordens por lote",
             }
-        finally:
-            self.model.desconectar()
 
-    # --- ENVIO DE ORDEM (COM LIMPEZA DE ESPAÇOS) ---
-    def enviar_ordem_separacao(self, payload):
-        token_protheus = getattr(g, "protheus_token", None)
+        invalidas = []
+        for idx, ordem in enumerate(ordens):
+            erro = validar_payload_ordem(ordem)
+            if erro:
+                projeto = ordem.get("projeto") if isinstance(ordem, dict) else None
+                invalidas.append({"indice": idx, "projeto": projeto, "error": erro})
+        if invalidas:
+            return {
+                "success": False,
+                "error": "Lote com ordens inválidas",
+                "invalidas": invalidas,
+            }
+
+        ids = self.fila.enfileirar_varios(ordens, usuario, token_protheus)
+        return {
+            "success": True,
+            "total": len(ids),
+            "jobs": [
+                {"projeto": str(ordem.get("projeto", "")).strip(), "job_id": job_id}
+                for ordem, job_id in zip(ordens, ids)
+            ],
+        }
+
+    def enviar_ordem_separacao(self, payload, token_protheus=None):
+        # Fora da requisição (worker da fila) o token vem por parâmetro
+        if token_protheus is None:
+            token_protheus = getattr(g, "protheus_token", None)
 
         if not token_protheus:
             return {"success": False, "error": "Sessão expirada. Faça login novamente."}
@@ -87,11 +416,20 @@ class ProjetoController:
             }
 
             # Log para conferir se os espaços sumiram
-            logger.info(f"POST {url_completa}")
-            logger.info(f"Payload Limpo: {json.dumps(payload, ensure_ascii=False)}")
+            logger.info("POST %s", url_completa)
+            logger.info(
+                "Payload Limpo: %s",
+                Preguicoso(json.dumps, payload, ensure_ascii=False),
+                extra={"verboso": True},
+            )
 
-            response = requests.post(
-                url_completa, json=payload, headers=headers, timeout=60, verify=False
+            # POST não idempotente: só repete se a conexão nem chegou a abrir
+            response = self.http.post(
+                url_completa,
+                json=payload,
+                headers=headers,
+                timeout=(Config.HTTP_CONNECT_TIMEOUT, Config.PROTHEUS_READ_TIMEOUT),
+                circuito=get_circuito("protheus", url_completa),
             )
 
             # Tratamento da Resposta
@@ -102,6 +440,8 @@ class ProjetoController:
                 dados_retorno = None
 
             if response.status_code in [200, 201]:
+                # Entregas mudaram: descarta a árvore do projeto
+                self.invalidar_cache(payload.get("projeto", ""))
                 return {
                     "success": True,
                     "mensagem": "Ordem processada com sucesso!",
@@ -141,6 +481,12 @@ class ProjetoController:
                     "error": f"Erro Protheus ({response.status_code}): {msg}",
                 }
 
+        except CircuitoAbertoError as e:
+            logger.error(f"Envio recusado, Protheus fora do ar: {e}")
+            return {
+                "success": False,
+                "error": "Protheus indisponível no momento. Tente novamente em instantes.",
+            }
         except Exception as e:
             logger.exception(f"Erro ao enviar: {e}")
             return {"success": False, "error": f"Erro interno: {str(e)}"}
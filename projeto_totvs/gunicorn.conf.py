@@ -0,0 +1,68 @@
+# gunicorn.conf.py
+# Produção (Linux): master pré-carrega os módulos e faz o fork dos workers
+#
+#   gunicorn -c gunicorn.conf.py wsgi:app
+#
+# Reload sem derrubar conexões:  kill -HUP <pid do master>
+#   (sobe workers novos e os antigos terminam o que estão atendendo; com
+#    preload_app o código novo só entra com restart do serviço ou USR2 + QUIT)
+# Mais/menos workers na hora:    kill -TTIN / -TTOU <pid do master>
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Antes de importar o config: vários processos dividem fila, réplica e log
+os.environ["PORTAL_PREFORK"] = "true"
+
+from config import Config  # noqa: E402
+
+bind = Config.SERVIDOR_BIND
+workers = Config.SERVIDOR_WORKERS
+# Threads por worker: as rotas esperam SQL Server e Protheus (I/O), e o SSE
+# prende uma thread por navegador
+worker_class = "gthread"
+threads = Config.SERVIDOR_THREADS
+
+# Importa Flask, pyodbc, orjson, models... uma vez no master; os workers
+# herdam as páginas já carregadas (o app é criado em cada um, ver wsgi.py)
+preload_app = True
+
+# Reciclagem: limita vazamentos e fragmentação de memória por worker
+max_requests = Config.SERVIDOR_MAX_REQUESTS
+max_requests_jitter = Config.SERVIDOR_MAX_REQUESTS_JITTER
+
+timeout = Config.SERVIDOR_TIMEOUT
+graceful_timeout = Config.SERVIDOR_GRACEFUL_TIMEOUT
+keepalive = Config.SERVIDOR_KEEPALIVE
+
+# Logs do próprio gunicorn no console; os da aplicação seguem no LOG_FILE
+errorlog = "-"
+accesslog = os.getenv("SERVIDOR_ACCESS_LOG") or None
+proc_name = "portal-manufatura"
+
+
+def on_starting(server):
+    """Master, uma vez, antes de qualquer worker"""
+    from models.fila_ordens import marcar_interrompidas
+    from models.metricas_processos import limpar_pasta
+
+    marcar_interrompidas(Config.FILA_DB_PATH)
+    limpar_pasta(Config.METRICAS_DIR)
+    server.log.info(
+        "Portal: %d workers x %d threads, reciclagem a cada ~%d requisições",
+        workers,
+        threads,
+        max_requests,
+    )
+
+
+def post_worker_init(worker):
+    """Worker recém-criado: monta o app (pool, fila, réplica, threads)"""
+    worker.wsgi.iniciar()
+
+
+def worker_exit(server, worker):
+    """Worker saindo (reciclagem, reload, parada): termina as ordens em andamento"""
+    worker.wsgi.encerrar()
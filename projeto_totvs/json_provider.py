@@ -0,0 +1,96 @@
+# json_provider.py
+# Serialização JSON das respostas: orjson quando instalado, json da stdlib
+# como reserva. Decimal (SUMs do pyodbc), datetime e escalares do numpy
+# viram tipos JSON nativos nos dois casos.
+
+import datetime
+import decimal
+import json
+import uuid
+
+from flask.json.provider import DefaultJSONProvider
+
+from config import Config
+
+try:
+    import orjson
+except ImportError:  # opcional: sem ele usa o json da stdlib
+    orjson = None
+
+# JSON_BACKEND=json força a stdlib mesmo com o orjson instalado
+BACKEND = "orjson" if orjson is not None and Config.JSON_BACKEND != "json" else "json"
+
+
+def para_nativo(obj):
+    """Tipos que nenhum dos dois serializa sozinho -> tipo JSON nativo"""
+    if isinstance(obj, decimal.Decimal):
+        # Quantidades inteiras continuam inteiras (10.00 -> 10)
+        if obj.is_finite() and obj == obj.to_integral_value():
+            return int(obj)
+        return float(obj)
+    if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    # numpy (pandas) sem importar o numpy: escalares têm item(), arrays tolist()
+    if hasattr(obj, "dtype"):
+        if hasattr(obj, "tolist"):
+            return obj.tolist()
+        return obj.item()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Objeto do tipo {type(obj).__name__} não é serializável em JSON")
+
+
+def para_bytes_stdlib(obj, indentar=False):
+    if indentar:
+        texto = json.dumps(obj, default=para_nativo, ensure_ascii=False, indent=2)
+    else:
+        texto = json.dumps(
+            obj, default=para_nativo, ensure_ascii=False, separators=(",", ":")
+        )
+    return texto.encode("utf-8")
+
+
+def para_bytes_orjson(obj, indentar=False):
+    opcoes = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+    if indentar:
+        opcoes |= orjson.OPT_INDENT_2
+    return orjson.dumps(obj, default=para_nativo, option=opcoes)
+
+
+if BACKEND == "orjson":
+    para_bytes = para_bytes_orjson
+    loads = orjson.loads
+else:
+    para_bytes = para_bytes_stdlib
+    loads = json.loads
+
+
+def dumps(obj, indentar=False):
+    """JSON em str (NDJSON, SSE) com as mesmas regras das respostas"""
+    return para_bytes(obj, indentar).decode("utf-8")
+
+
+class ProvedorJSON(DefaultJSONProvider):
+    """
+    Provider do Flask (app.json): jsonify, request.get_json e |tojson
+    passam por aqui. Sem ordenação de chaves: o ETag vem das linhas,
+    não do corpo, então a ordem não precisa ser estável.
+    """
+
+    sort_keys = False
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj, indentar=bool(kwargs.get("indent")))
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indentar = (self.compact is None and self._app.debug) or self.compact is False
+        # Bytes direto para a resposta, sem passar por str
+        return self._app.response_class(
+            para_bytes(obj, indentar) + b"\n", mimetype=self.mimetype
+        )
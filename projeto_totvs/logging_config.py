@@ -0,0 +1,194 @@
+# logging_config.py
+# Pipeline de logs assíncrono: as threads das requisições só enfileiram o
+# registro; uma thread de fundo formata e grava (JSON lines + console)
+
+import atexit
+import json
+import logging
+import queue
+import random
+import time
+from logging.handlers import (
+    QueueHandler,
+    QueueListener,
+    RotatingFileHandler,
+    WatchedFileHandler,
+)
+
+_listener = None
+_handler = None
+
+
+class Preguicoso:
+    """
+    Adia trabalho caro até o log ser realmente formatado (na thread de fundo).
+    Ex.: logger.info("Payload: %s", Preguicoso(json.dumps, payload))
+    """
+
+    __slots__ = ("funcao", "args", "kwargs")
+
+    def __init__(self, funcao, *args, **kwargs):
+        self.funcao = funcao
+        self.args = args
+        self.kwargs = kwargs
+
+    def __str__(self):
+        return str(self.funcao(*self.args, **self.kwargs))
+
+
+class FormatterJsonLines(logging.Formatter):
+    """Um objeto JSON por linha (fácil de filtrar com jq/grep)"""
+
+    def format(self, record):
+        dados = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S")
+            + f".{int(record.msecs):03d}",
+            "nivel": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "thread": record.threadName,
+        }
+        if record.exc_info:
+            dados["exc"] = self.formatException(record.exc_info)
+        return json.dumps(dados, ensure_ascii=False, default=str)
+
+
+class RotatingFileHandlerTempo(RotatingFileHandler):
+    """Rotaciona por tamanho (maxBytes) OU a cada `horas` horas"""
+
+    def __init__(self, filename, horas=24, **kwargs):
+        super().__init__(filename, **kwargs)
+        self.intervalo = horas * 3600
+        self.proxima_rotacao = time.time() + self.intervalo if horas else None
+
+    def shouldRollover(self, record):
+        if self.proxima_rotacao and time.time() >= self.proxima_rotacao:
+            return True
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        if self.proxima_rotacao:
+            self.proxima_rotacao = time.time() + self.intervalo
+
+
+class FiltroAmostragem(logging.Filter):
+    """
+    Amostra os logs marcados com extra={"verboso": True} (payloads, respostas)
+    conforme a taxa de cada logger: {"ProtheusIntegration": 0.1} = 10%.
+    Logs sem a marca e de nível WARNING ou acima sempre passam.
+    """
+
+    def __init__(self, taxas):
+        super().__init__()
+        self.taxas = taxas
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or not getattr(record, "verboso", False):
+            return True
+        taxa = self.taxas.get(record.name, 1.0)
+        return taxa >= 1.0 or random.random() < taxa
+
+
+class QueueHandlerSemBloqueio(QueueHandler):
+    """Nunca bloqueia a requisição: com a fila cheia o registro é descartado"""
+
+    def __init__(self, fila):
+        super().__init__(fila)
+        self.descartados = 0
+
+    def prepare(self, record):
+        # Mesmo processo: não formata aqui (a formatação fica para o listener)
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.descartados += 1
+
+
+def parse_amostragem(texto):
+    """'ProtheusIntegration=0.1,AuthModel=0.2' -> dict"""
+    taxas = {}
+    for parte in (texto or "").split(","):
+        if "=" in parte:
+            nome, taxa = parte.split("=", 1)
+            try:
+                taxas[nome.strip()] = float(taxa)
+            except ValueError:
+                continue
+    return taxas
+
+
+def iniciar_logging_assincrono(config):
+    """Troca os handlers do root logger pelo pipeline com fila"""
+    global _listener, _handler
+    parar_logging_assincrono()
+
+    if config.get("PREFORK"):
+        # Vários workers no mesmo arquivo: rotacionar daqui renomearia o arquivo
+        # com os outros ainda gravando nele. Rotação fica com o logrotate; o
+        # handler reabre o arquivo quando ele é trocado.
+        arquivo = WatchedFileHandler(
+            config.get("LOG_FILE", "sistema.log"), encoding="utf-8"
+        )
+    else:
+        arquivo = RotatingFileHandlerTempo(
+            config.get("LOG_FILE", "sistema.log"),
+            horas=config.get("LOG_ROTACAO_HORAS", 24),
+            maxBytes=config.get("LOG_MAX_BYTES", 10 * 1024 * 1024),
+            backupCount=config.get("LOG_BACKUPS", 10),
+            encoding="utf-8",
+        )
+    if config.get("LOG_FORMATO", "json") == "json":
+        arquivo.setFormatter(FormatterJsonLines())
+    else:
+        arquivo.setFormatter(
+            logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+        )
+
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+
+    fila = queue.Queue(config.get("LOG_FILA_MAX", 10000))
+    handler = QueueHandlerSemBloqueio(fila)
+    handler.addFilter(FiltroAmostragem(parse_amostragem(config.get("LOG_AMOSTRAGEM"))))
+
+    raiz = logging.getLogger()
+    for antigo in list(raiz.handlers):
+        raiz.removeHandler(antigo)
+    raiz.addHandler(handler)
+    raiz.setLevel(config.get("LOG_LEVEL", "INFO"))
+
+    _listener = QueueListener(fila, arquivo, console, respect_handler_level=True)
+    _listener.start()
+    _handler = handler
+    return handler
+
+
+def estatisticas_logging():
+    if _handler is None:
+        return {"ativo": False}
+    return {
+        "ativo": _listener is not None,
+        "na_fila": _handler.queue.qsize(),
+        "descartados": _handler.descartados,
+    }
+
+
+def parar_logging_assincrono():
+    """Esvazia a fila e fecha os arquivos (chamado também na saída do processo)"""
+    global _listener, _handler
+    if _handler is not None:
+        # Sem o listener ninguém esvaziaria a fila: o root volta a ficar sem handler
+        logging.getLogger().removeHandler(_handler)
+        _handler = None
+    if _listener is not None:
+        _listener.stop()
+        for h in _listener.handlers:
+            h.close()
+        _listener = None
+
+
+atexit.register(parar_logging_assincrono)
@@ -0,0 +1,138 @@
+# models/arvore_projeto.py
+# Árvore Projeto -> Células -> Produtos montada a partir de UMA consulta
+
+from models.cache import versao_conteudo
+from models.formato_colunar import para_colunar
+
+COLUNAS_VERSAO = (
+    "AFC_XPROD",
+    "AFA_PRODUT",
+    "AFA_XDESCR",
+    "AFA_QUANT",
+    "CP_QUANT",
+    "CP_XQUPR",
+)
+
+
+def calcular_estatisticas(total_nec, total_ent):
+    """Bloco 'estatisticas' devolvido pela API"""
+    perc = round((total_ent / total_nec * 100)) if total_nec > 0 else 0
+    return {
+        "total_necessidade": total_nec,
+        "total_entregue": total_ent,
+        "percentual_geral": perc,
+    }
+
+
+class ArvoreProjeto:
+    """
+    Agrega em memória as linhas de produto de um (projeto, revisão).
+    As células são somadas a partir dos produtos, o que dá o mesmo
+    resultado do GROUP BY por célula sem varrer a SCP010 de novo.
+    """
+
+    def __init__(self, projeto, revisao, linhas):
+        self.projeto = projeto
+        self.revisao = revisao
+        self._celulas = {}  # célula (sem espaços) -> linha agregada
+        self._produtos = {}  # célula (sem espaços) -> [linhas de produto]
+        self._dict = None
+        self._colunar = None
+
+        linhas = list(linhas)
+        # ETag das rotas de leitura do projeto (muda se qualquer total mudar)
+        self.versao = versao_conteudo(linhas, COLUNAS_VERSAO)
+
+        for linha in linhas:
+            chave = str(linha["AFC_XPROD"]).strip()
+            celula = self._celulas.get(chave)
+            if celula is None:
+                celula = self._celulas[chave] = {
+                    "AF8_PROJET": linha["AF8_PROJET"],
+                    "AF8_REVISA": linha["AF8_REVISA"],
+                    "AFC_XPROD": linha["AFC_XPROD"],
+                    "AFA_QUANT": 0,
+                    "CP_QUANT": 0,
+                    "CP_XQUPR": 0,
+                }
+                self._produtos[chave] = []
+
+            celula["AFA_QUANT"] += linha["AFA_QUANT"]
+            celula["CP_QUANT"] += linha["CP_QUANT"]
+            celula["CP_XQUPR"] += linha["CP_XQUPR"]
+
+            self._produtos[chave].append(
+                {
+                    "AF8_PROJET": linha["AF8_PROJET"],
+                    "AFC_XPROD": linha["AFC_XPROD"],
+                    "AFA_PRODUT": linha["AFA_PRODUT"],
+                    "AFA_XDESCR": linha["AFA_XDESCR"],
+                    "AFA_QUANT": linha["AFA_QUANT"],
+                    "CP_QUANT": linha["CP_QUANT"],
+                    "CP_XQUPR": linha["CP_XQUPR"],
+                }
+            )
+
+    def __bool__(self):
+        return bool(self._celulas)
+
+    def celulas(self):
+        """Mesmo formato de ProjetoModel.get_celulas"""
+        return list(self._celulas.values())
+
+    def produtos(self, celula):
+        """Mesmo formato de ProjetoModel.get_produtos"""
+        return self._produtos.get(str(celula).strip(), [])
+
+    def estatisticas(self, celula=None):
+        """Totais de uma célula ou, sem célula, do projeto inteiro"""
+        if celula is not None:
+            linha = self._celulas.get(str(celula).strip())
+            if linha is None:
+                return calcular_estatisticas(0, 0)
+            return calcular_estatisticas(linha["AFA_QUANT"], linha["CP_XQUPR"])
+
+        total_nec = sum(c["AFA_QUANT"] for c in self._celulas.values())
+        total_ent = sum(c["CP_XQUPR"] for c in self._celulas.values())
+        return calcular_estatisticas(total_nec, total_ent)
+
+    def para_dict(self):
+        """Projeto completo (células + produtos + totais) para a API"""
+        if self._dict is None:
+            self._dict = {
+                "projeto": self.projeto,
+                "revisao": self.revisao,
+                "estatisticas": self.estatisticas(),
+                "celulas": [
+                    dict(
+                        celula,
+                        produtos=self._produtos[chave],
+                        estatisticas=self.estatisticas(chave),
+                    )
+                    for chave, celula in self._celulas.items()
+                ],
+            }
+        return self._dict
+
+    def para_colunar(self):
+        """
+        Mesmo conteúdo de para_dict no formato colunar: tabela de células
+        (com as estatísticas) e uma tabela única com os produtos de todas
+        as células (o app.js agrupa de volta por AFC_XPROD)
+        """
+        if self._colunar is None:
+            self._colunar = {
+                "projeto": self.projeto,
+                "revisao": self.revisao,
+                "estatisticas": self.estatisticas(),
+                "celulas": para_colunar(
+                    dict(celula, estatisticas=self.estatisticas(chave))
+                    for chave, celula in self._celulas.items()
+                ),
+                "produtos": para_colunar(
+                    produto
+                    for produtos in self._produtos.values()
+                    for produto in produtos
+                ),
+            }
+        return self._colunar
@@ -2,11 +2,15 @@
 import requests
 import base64
 from config import Config
+from logging_config import Preguicoso
+from models.http_client import get_cliente_http, get_circuito
+from models.circuit_breaker import CircuitoAbertoError
 
 
 class AuthModel:
     def __init__(self):
         self.base_url = Config.URL_REST_PROTHEUS
+        self.http = get_cliente_http()
 
     def autenticar_protheus(self, username, password):
         """
@@ -23,10 +27,12 @@ class AuthModel:
         auth_url = Config.get_auth_endpoint()
         chave_coletor = Config.CHAVE_COLETOR
 
-        logger.info(f"🔐 Tentando autenticar usuário: {username}")
-        logger.info(f"📍 URL de autenticação: {auth_url}")
+        logger.info("🔐 Tentando autenticar usuário: %s", username)
+        logger.info("📍 URL de autenticação: %s", auth_url, extra={"verboso": True})
         logger.info(
-            f"🔑 Chave coletor configurada: {'Sim' if chave_coletor else 'Não'}"
+            "🔑 Chave coletor configurada: %s",
+            "Sim" if chave_coletor else "Não",
+            extra={"verboso": True},
         )
 
         if not auth_url:
@@ -56,13 +62,22 @@ class AuthModel:
             logger.debug(f"Headers: X-Cliente-Token presente")
             logger.debug(f"Data: username={username}, password=[BASE64_REDACTED]")
 
-            # Faz a requisição
-            response = requests.post(
-                url=auth_url, headers=headers, data=data, timeout=10, verify=False
+            # Faz a requisição (login pode ser repetido com segurança)
+            response = self.http.post(
+                auth_url,
+                headers=headers,
+                data=data,
+                timeout=(Config.HTTP_CONNECT_TIMEOUT, Config.AUTH_READ_TIMEOUT),
+                idempotente=True,
+                circuito=get_circuito("auth", auth_url),
             )
 
-            logger.info(f"📥 Status Code: {response.status_code}")
-            logger.info(f"📥 Response: {response.text[:500]}")  # Primeiros 500 chars
+            logger.info("📥 Status Code: %s", response.status_code)
+            logger.info(
+                "📥 Response: %.500s",  # Primeiros 500 chars
+                Preguicoso(getattr, response, "text"),
+                extra={"verboso": True},
+            )
 
             # Processa resposta
             if response.status_code in [200, 201]:
@@ -77,6 +92,7 @@ class AuthModel:
                         "refresh_token": dados["dados_autenticacao"].get(
                             "refresh_token", ""
                         ),
+                        "expires_in": dados["dados_autenticacao"].get("expires_in"),
                         "user_id": username,
                     }
                 else:
@@ -85,18 +101,25 @@ class AuthModel:
                         "success": True,
                         "access_token": dados.get("access_token", ""),
                         "refresh_token": dados.get("refresh_token", ""),
+                        "expires_in": dados.get("expires_in"),
                         "user_id": username,
                     }
             else:
                 logger.error(
                     f"❌ Autenticação falhou - Status: {response.status_code}"
                 )
-                logger.error(f"❌ Resposta: {response.text}")
+                logger.error("❌ Resposta: %s", response.text)
                 return {
                     "success": False,
                     "error": f"Autenticação falhou (Status {response.status_code}): {response.text}",
                 }
 
+        except CircuitoAbertoError as e:
+            logger.error(f"❌ Autenticação recusada sem chamar o serviço: {e}")
+            return {
+                "success": False,
+                "error": "Serviço de autenticação indisponível. Tente novamente em instantes.",
+            }
         except requests.exceptions.Timeout:
             logger.error("❌ Timeout na autenticação")
             return {"success": False, "error": "Timeout na autenticação"}
@@ -106,3 +129,74 @@ class AuthModel:
         except Exception as e:
             logger.exception("❌ Erro inesperado na autenticação")
             return {"success": False, "error": f"Erro inesperado: {str(e)}"}
+
+    def renovar_token(self, refresh_token):
+        """
+        Renova o access token do Protheus com o refresh token
+        (OAuth2 padrão do REST Protheus: grant_type=refresh_token)
+        """
+        import logging
+
+        logger = logging.getLogger("AuthModel")
+        refresh_url = Config.get_auth_refresh_endpoint()
+
+        try:
+            response = self.http.post(
+                refresh_url,
+                params={"grant_type": "refresh_token", "refresh_token": refresh_token},
+                timeout=(Config.HTTP_CONNECT_TIMEOUT, Config.AUTH_READ_TIMEOUT),
+                circuito=get_circuito("protheus", refresh_url),
+            )
+            return self._resultado_renovacao(response)
+
+        except CircuitoAbertoError as e:
+            return {"success": False, "error": str(e)}
+        except Exception as e:
+            logger.error(f"❌ Erro ao renovar token: {str(e)}")
+            return {"success": False, "error": f"Erro ao renovar token: {str(e)}"}
+
+    async def renovar_token_async(self, refresh_token, cliente):
+        """renovar_token pelo ClienteHTTPAsync (caminho ASGI)"""
+        import logging
+
+        logger = logging.getLogger("AuthModel")
+        refresh_url = Config.get_auth_refresh_endpoint()
+
+        try:
+            response = await cliente.post(
+                refresh_url,
+                params={"grant_type": "refresh_token", "refresh_token": refresh_token},
+                timeout=(Config.HTTP_CONNECT_TIMEOUT, Config.AUTH_READ_TIMEOUT),
+                circuito=get_circuito("protheus", refresh_url),
+            )
+            return self._resultado_renovacao(response)
+
+        except CircuitoAbertoError as e:
+            return {"success": False, "error": str(e)}
+        except Exception as e:
+            logger.error(f"❌ Erro ao renovar token: {str(e)}")
+            return {"success": False, "error": f"Erro ao renovar token: {str(e)}"}
+
+    @staticmethod
+    def _resultado_renovacao(response):
+        """Resposta do refresh (requests ou httpx) -> dict do renovar_token"""
+        import logging
+
+        logger = logging.getLogger("AuthModel")
+        if response.status_code in [200, 201]:
+            dados = response.json()
+            if "dados_autenticacao" in dados:
+                dados = dados["dados_autenticacao"]
+                dados.setdefault("access_token", dados.get("token", ""))
+            return {
+                "success": bool(dados.get("access_token")),
+                "access_token": dados.get("access_token", ""),
+                "refresh_token": dados.get("refresh_token", ""),
+                "expires_in": dados.get("expires_in"),
+            }
+
+        logger.warning(f"Renovação de token falhou - Status: {response.status_code}")
+        return {
+            "success": False,
+            "error": f"Renovação falhou (Status {response.status_code})",
+        }
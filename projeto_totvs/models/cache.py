@@ -0,0 +1,145 @@
+# models/cache.py
+# Cache em memória com expiração (TTL) e limite de tamanho (LRU)
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+def versao_conteudo(linhas, colunas):
+    """
+    Hash curto das linhas (só as colunas informadas), usado como ETag forte:
+    calculado uma vez quando a entrada é montada, não a cada resposta
+    """
+    h = hashlib.blake2b(digest_size=12)
+    for linha in linhas:
+        h.update("\x1f".join(str(linha.get(c)) for c in colunas).encode("utf-8"))
+        h.update(b"\n")
+    return h.hexdigest()
+
+
+class CacheTTL:
+    """
+    Cache thread-safe para resultados de consultas.
+    - ttl: segundos de validade de cada entrada (0 = desativado)
+    - tamanho_max: entradas mantidas; a menos usada recentemente sai primeiro
+    """
+
+    def __init__(self, nome, ttl, tamanho_max):
+        self.nome = nome
+        self.ttl = ttl
+        self.tamanho_max = max(1, tamanho_max)
+
+        self._dados = OrderedDict()  # chave -> (expira_em, valor)
+        self._lock = threading.Lock()
+        self._carregando = {}  # chave -> Lock (evita consultas duplicadas)
+
+        self._hits = 0
+        self._misses = 0
+        self._expiradas = 0
+        self._removidas_lru = 0
+        self._invalidadas = 0
+
+    def obter(self, chave):
+        """Retorna (encontrado, valor)"""
+        with self._lock:
+            entrada = self._dados.get(chave)
+            if entrada is not None:
+                expira_em, valor = entrada
+                if time.monotonic() < expira_em:
+                    self._dados.move_to_end(chave)
+                    self._hits += 1
+                    return True, valor
+                del self._dados[chave]
+                self._expiradas += 1
+            self._misses += 1
+            return False, None
+
+    def espiar(self, chave):
+        """
+        Valor se estiver no cache, senão None, sem contar miss (quem espia
+        e não acha carrega depois por obter_ou_carregar, que conta)
+        """
+        with self._lock:
+            entrada = self._dados.get(chave)
+            if entrada is None or time.monotonic() >= entrada[0]:
+                return None
+            self._dados.move_to_end(chave)
+            self._hits += 1
+            return entrada[1]
+
+    def definir(self, chave, valor, ttl=None):
+        """ttl opcional por entrada (ex.: até a expiração de um token)"""
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._dados[chave] = (time.monotonic() + ttl, valor)
+            self._dados.move_to_end(chave)
+            while len(self._dados) > self.tamanho_max:
+                self._dados.popitem(last=False)
+                self._removidas_lru += 1
+
+    def obter_ou_carregar(self, chave, carregar, cachear=bool):
+        """
+        Busca no cache; se ausente, chama carregar() uma única vez por chave
+        (requisições concorrentes aguardam o mesmo carregamento).
+        Só guarda o resultado quando cachear(valor) é verdadeiro.
+        """
+        encontrado, valor = self.obter(chave)
+        if encontrado:
+            return valor
+
+        with self._lock:
+            lock_chave = self._carregando.setdefault(chave, threading.Lock())
+
+        with lock_chave:
+            # Outra thread pode ter carregado enquanto aguardávamos
+            with self._lock:
+                entrada = self._dados.get(chave)
+                if entrada is not None and time.monotonic() < entrada[0]:
+                    self._dados.move_to_end(chave)
+                    return entrada[1]
+            try:
+                valor = carregar()
+                if cachear(valor):
+                    self.definir(chave, valor)
+                return valor
+            finally:
+                with self._lock:
+                    self._carregando.pop(chave, None)
+
+    def invalidar(self, chave):
+        with self._lock:
+            if self._dados.pop(chave, None) is not None:
+                self._invalidadas += 1
+
+    def invalidar_se(self, predicado):
+        """Remove todas as entradas cuja chave satisfaz o predicado"""
+        with self._lock:
+            chaves = [c for c in self._dados if predicado(c)]
+            for chave in chaves:
+                del self._dados[chave]
+            self._invalidadas += len(chaves)
+        return len(chaves)
+
+    def limpar(self):
+        with self._lock:
+            self._invalidadas += len(self._dados)
+            self._dados.clear()
+
+    def estatisticas(self):
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "ttl": self.ttl,
+                "tamanho_max": self.tamanho_max,
+                "entradas": len(self._dados),
+                "hits": self._hits,
+                "misses": self._misses,
+                "taxa_acerto": round(self._hits / total * 100, 1) if total else 0.0,
+                "expiradas": self._expiradas,
+                "removidas_lru": self._removidas_lru,
+                "invalidadas": self._invalidadas,
+            }
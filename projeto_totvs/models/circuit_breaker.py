@@ -0,0 +1,189 @@
+# models/circuit_breaker.py
+# Circuit breaker para as chamadas externas (Protheus REST e /auth)
+
+import logging
+import socket
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+logger = logging.getLogger("CircuitBreaker")
+
+FECHADO = "fechado"
+ABERTO = "aberto"
+SEMI_ABERTO = "semi_aberto"
+
+
+class CircuitoAbertoError(Exception):
+    """Chamada recusada na hora: o serviço externo está fora do ar"""
+
+    def __init__(self, nome, tentar_em):
+        self.nome = nome
+        self.tentar_em = tentar_em
+        super().__init__(
+            f"Serviço '{nome}' indisponível; nova tentativa em {tentar_em:.0f}s"
+        )
+
+
+def sonda_tcp(url, timeout=2.0):
+    """Sonda leve: só verifica se a porta do serviço aceita conexão"""
+    partes = urlsplit(url)
+    porta = partes.port or (443 if partes.scheme == "https" else 80)
+
+    def sondar():
+        with socket.create_connection((partes.hostname, porta), timeout=timeout):
+            return True
+
+    return sondar
+
+
+class CircuitBreaker:
+    """
+    - janela: segundos considerados no cálculo da taxa de falha
+    - min_chamadas: mínimo de chamadas na janela para poder abrir
+    - taxa_falha: fração de falhas (0-1) que abre o circuito
+    - tempo_aberto: segundos recusando chamadas antes de testar de novo
+    - sonda: função testada em segundo plano enquanto aberto; ao responder,
+      o circuito vai para semi-aberto e libera UMA chamada real de teste
+    """
+
+    def __init__(
+        self,
+        nome,
+        janela=30,
+        min_chamadas=5,
+        taxa_falha=0.5,
+        tempo_aberto=15,
+        sonda=None,
+        intervalo_sonda=5,
+    ):
+        self.nome = nome
+        self.janela = janela
+        self.min_chamadas = min_chamadas
+        self.taxa_falha = taxa_falha
+        self.tempo_aberto = tempo_aberto
+        self.sonda = sonda
+        self.intervalo_sonda = intervalo_sonda
+
+        self._lock = threading.Lock()
+        self._estado = FECHADO
+        self._chamadas = deque()  # (instante, sucesso)
+        self._aberto_em = 0.0
+        self._teste_em_andamento = False
+        self._sondando = False
+
+        self._recusadas = 0
+        self._aberturas = 0
+        self._ultima_falha = None
+
+    # ---------- API ----------
+
+    def permitir(self):
+        """Levanta CircuitoAbertoError se a chamada deve falhar na hora"""
+        with self._lock:
+            if self._estado == ABERTO:
+                decorrido = time.monotonic() - self._aberto_em
+                if self.sonda is None and decorrido >= self.tempo_aberto:
+                    self._mudar(SEMI_ABERTO)
+                else:
+                    self._recusadas += 1
+                    raise CircuitoAbertoError(
+                        self.nome, max(self.tempo_aberto - decorrido, 0)
+                    )
+
+            if self._estado == SEMI_ABERTO:
+                if self._teste_em_andamento:
+                    self._recusadas += 1
+                    raise CircuitoAbertoError(self.nome, self.intervalo_sonda)
+                self._teste_em_andamento = True
+
+    def registrar_sucesso(self):
+        with self._lock:
+            if self._estado == SEMI_ABERTO:
+                self._teste_em_andamento = False
+                self._chamadas.clear()
+                self._mudar(FECHADO)
+                return
+            self._adicionar(True)
+
+    def liberar_teste(self):
+        """Chamada sem resposta do serviço (erro local, cancelamento): não conta"""
+        with self._lock:
+            self._teste_em_andamento = False
+
+    def registrar_falha(self, motivo=""):
+        with self._lock:
+            self._ultima_falha = str(motivo)[:200]
+            if self._estado == SEMI_ABERTO:
+                self._teste_em_andamento = False
+                self._abrir()
+                return
+            self._adicionar(False)
+            total = len(self._chamadas)
+            if self._estado == FECHADO and total >= self.min_chamadas:
+                falhas = sum(1 for _, ok in self._chamadas if not ok)
+                if falhas / total >= self.taxa_falha:
+                    self._abrir()
+
+    def estado(self):
+        with self._lock:
+            self._descartar_antigas()
+            total = len(self._chamadas)
+            falhas = sum(1 for _, ok in self._chamadas if not ok)
+            return {
+                "estado": self._estado,
+                "chamadas_janela": total,
+                "falhas_janela": falhas,
+                "taxa_falha": round(falhas / total, 2) if total else 0.0,
+                "recusadas": self._recusadas,
+                "aberturas": self._aberturas,
+                "ultima_falha": self._ultima_falha,
+            }
+
+    # ---------- INTERNOS ----------
+
+    def _adicionar(self, sucesso):
+        self._chamadas.append((time.monotonic(), sucesso))
+        self._descartar_antigas()
+
+    def _descartar_antigas(self):
+        limite = time.monotonic() - self.janela
+        while self._chamadas and self._chamadas[0][0] < limite:
+            self._chamadas.popleft()
+
+    def _abrir(self):
+        self._aberto_em = time.monotonic()
+        self._aberturas += 1
+        self._mudar(ABERTO)
+        if self.sonda is not None and not self._sondando:
+            self._sondando = True
+            threading.Thread(
+                target=self._sondar, name=f"sonda-{self.nome}", daemon=True
+            ).start()
+
+    def _mudar(self, novo):
+        if novo != self._estado:
+            logger.warning(f"Circuito '{self.nome}': {self._estado} -> {novo}")
+            self._estado = novo
+
+    def _sondar(self):
+        """Thread de fundo: testa o serviço até ele voltar a responder"""
+        while True:
+            time.sleep(self.intervalo_sonda)
+            with self._lock:
+                if self._estado != ABERTO:
+                    self._sondando = False
+                    return
+                if time.monotonic() - self._aberto_em < self.tempo_aberto:
+                    continue
+            try:
+                self.sonda()
+            except Exception as e:
+                logger.info(f"Sonda '{self.nome}' ainda falhando: {e}")
+                continue
+            with self._lock:
+                if self._estado == ABERTO:
+                    self._mudar(SEMI_ABERTO)
+                self._sondando = False
+                return
@@ -0,0 +1,276 @@
+# models/connection_pool.py
+# Pool de conexões thread-safe (usado pelo ProjetoModel)
+
+import logging
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger("ConnectionPool")
+
+
+class PoolEsgotadoError(Exception):
+    """Nenhuma conexão ficou livre dentro do tempo de espera"""
+
+
+class _ConexaoPool:
+    """Conexão física + metadados de controle do pool"""
+
+    __slots__ = ("conn", "criada_em", "ultimo_uso")
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.criada_em = time.monotonic()
+        self.ultimo_uso = self.criada_em
+
+
+class ConnectionPool:
+    """
+    Pool limitado de conexões DB-API (pyodbc).
+    - tamanho_min: conexões mantidas abertas após o aquecimento
+    - tamanho_max: limite de conexões simultâneas com o SQL Server
+    - tempo_vida_max: segundos até a conexão ser reciclada (0 = sem limite)
+    - timeout_espera: segundos aguardando uma conexão livre
+    - verificar_apos: segundos ociosa antes de testar a conexão no checkout
+    """
+
+    def __init__(
+        self,
+        fabrica,
+        tamanho_min=1,
+        tamanho_max=10,
+        tempo_vida_max=1800,
+        timeout_espera=10.0,
+        verificar_apos=30,
+        consulta_saude="SELECT 1",
+    ):
+        if tamanho_max < 1:
+            raise ValueError("tamanho_max deve ser pelo menos 1")
+
+        self.fabrica = fabrica
+        self.tamanho_min = max(0, min(tamanho_min, tamanho_max))
+        self.tamanho_max = tamanho_max
+        self.tempo_vida_max = tempo_vida_max
+        self.timeout_espera = timeout_espera
+        self.verificar_apos = verificar_apos
+        self.consulta_saude = consulta_saude
+
+        self._cond = threading.Condition(threading.Lock())
+        self._ociosas = deque()
+        self._em_uso = {}
+        self._total = 0
+        self._aguardando = 0
+        self._fechado = False
+
+        # Contadores para dimensionamento
+        self._criadas = 0
+        self._descartadas = 0
+        self._checkouts = 0
+        self._falhas_saude = 0
+        self._timeouts = 0
+        self._espera_total = 0.0
+        self._espera_max = 0.0
+
+    # ---------- CHECKOUT / DEVOLUÇÃO ----------
+
+    def obter(self, timeout=None):
+        """Retorna uma conexão válida do pool (bloqueia até timeout)"""
+        timeout = self.timeout_espera if timeout is None else timeout
+        inicio = time.monotonic()
+        limite = inicio + timeout
+
+        while True:
+            item, criar = self._reservar(limite)
+
+            if criar:
+                try:
+                    item = _ConexaoPool(self.fabrica())
+                except Exception:
+                    with self._cond:
+                        self._total -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._criadas += 1
+            elif not self._saudavel(item):
+                self._descartar(item)
+                continue
+
+            espera = time.monotonic() - inicio
+            with self._cond:
+                self._em_uso[id(item.conn)] = item
+                self._checkouts += 1
+                self._espera_total += espera
+                self._espera_max = max(self._espera_max, espera)
+            return item.conn
+
+    def devolver(self, conn, descartar=False):
+        """Devolve a conexão ao pool (ou fecha, se inválida/expirada)"""
+        with self._cond:
+            item = self._em_uso.pop(id(conn), None)
+
+        if item is None:
+            logger.warning("Conexão devolvida não pertence ao pool; fechando")
+            self._fechar_conn(conn)
+            return
+
+        if not descartar:
+            try:
+                # Encerra a transação implícita aberta pelos SELECTs
+                conn.rollback()
+            except Exception:
+                descartar = True
+
+        if descartar or self._fechado or self._expirada(item):
+            self._descartar(item)
+            return
+
+        item.ultimo_uso = time.monotonic()
+        with self._cond:
+            self._ociosas.append(item)
+            self._cond.notify()
+
+    def conexao(self):
+        """Context manager: with pool.conexao() as conn: ..."""
+        return _Emprestimo(self)
+
+    # ---------- MANUTENÇÃO ----------
+
+    def aquecer(self):
+        """Abre conexões até atingir tamanho_min"""
+        while True:
+            with self._cond:
+                if self._fechado or self._total >= self.tamanho_min:
+                    return
+                self._total += 1
+            try:
+                item = _ConexaoPool(self.fabrica())
+            except Exception as e:
+                with self._cond:
+                    self._total -= 1
+                    self._cond.notify()
+                logger.error(f"Falha ao aquecer pool de conexões: {e}")
+                return
+            with self._cond:
+                self._criadas += 1
+                self._ociosas.append(item)
+                self._cond.notify()
+
+    def fechar(self):
+        """Fecha conexões ociosas e impede novos checkouts"""
+        with self._cond:
+            self._fechado = True
+            ociosas = list(self._ociosas)
+            self._ociosas.clear()
+            self._total -= len(ociosas)
+            self._cond.notify_all()
+        for item in ociosas:
+            self._fechar_conn(item.conn)
+
+    def estatisticas(self):
+        """Snapshot dos contadores do pool"""
+        with self._cond:
+            checkouts = self._checkouts
+            return {
+                "tamanho_min": self.tamanho_min,
+                "tamanho_max": self.tamanho_max,
+                "abertas": self._total,
+                "em_uso": len(self._em_uso),
+                "ociosas": len(self._ociosas),
+                "aguardando": self._aguardando,
+                "criadas": self._criadas,
+                "descartadas": self._descartadas,
+                "checkouts": checkouts,
+                "falhas_saude": self._falhas_saude,
+                "timeouts": self._timeouts,
+                "espera_media_ms": round(
+                    self._espera_total / checkouts * 1000 if checkouts else 0.0, 2
+                ),
+                "espera_max_ms": round(self._espera_max * 1000, 2),
+            }
+
+    # ---------- INTERNOS ----------
+
+    def _reservar(self, limite):
+        """Pega uma conexão ociosa ou reserva vaga para criar uma nova"""
+        with self._cond:
+            self._aguardando += 1
+            try:
+                while True:
+                    if self._fechado:
+                        raise PoolEsgotadoError("Pool de conexões fechado")
+
+                    while self._ociosas:
+                        # LIFO: reaproveita a conexão mais "quente"
+                        item = self._ociosas.pop()
+                        if self._expirada(item):
+                            self._total -= 1
+                            self._descartadas += 1
+                            self._fechar_conn(item.conn)
+                            continue
+                        return item, False
+
+                    if self._total < self.tamanho_max:
+                        self._total += 1
+                        return None, True
+
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        self._timeouts += 1
+                        raise PoolEsgotadoError(
+                            f"Nenhuma conexão livre em {self.timeout_espera}s "
+                            f"(máx {self.tamanho_max})"
+                        )
+                    self._cond.wait(restante)
+            finally:
+                self._aguardando -= 1
+
+    def _saudavel(self, item):
+        if time.monotonic() - item.ultimo_uso < self.verificar_apos:
+            return True
+        try:
+            cursor = item.conn.cursor()
+            try:
+                cursor.execute(self.consulta_saude)
+                cursor.fetchall()
+            finally:
+                cursor.close()
+            return True
+        except Exception as e:
+            logger.warning(f"Conexão do pool falhou no health check: {e}")
+            with self._cond:
+                self._falhas_saude += 1
+            return False
+
+    def _expirada(self, item):
+        if not self.tempo_vida_max:
+            return False
+        return time.monotonic() - item.criada_em >= self.tempo_vida_max
+
+    def _descartar(self, item):
+        self._fechar_conn(item.conn)
+        with self._cond:
+            self._total -= 1
+            self._descartadas += 1
+            self._cond.notify()
+
+    @staticmethod
+    def _fechar_conn(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+class _Emprestimo:
+    def __init__(self, pool):
+        self.pool = pool
+        self.conn = None
+
+    def __enter__(self):
+        self.conn = self.pool.obter()
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.pool.devolver(self.conn, descartar=exc_type is not None)
+        return False
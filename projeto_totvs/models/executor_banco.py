@@ -0,0 +1,68 @@
+# models/executor_banco.py
+# Executor dedicado às consultas do caminho assíncrono (asgi.py): threads
+# limitadas para o banco e um teto de requisições esperando por elas
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class LimiteEsperaError(Exception):
+    """Requisições demais aguardando o banco (responder 503)"""
+
+
+class ExecutorBanco:
+    """
+    - threads: consultas simultâneas. Mais que o DB_POOL_MAX só faria as
+      threads esperarem conexão do pool
+    - max_espera: requisições aguardando (corrotinas, não threads); acima
+      disso executar() levanta LimiteEsperaError na hora
+    """
+
+    def __init__(self, threads=10, max_espera=2000):
+        self.threads = threads
+        self.max_espera = max_espera
+        self._executor = ThreadPoolExecutor(
+            max_workers=threads, thread_name_prefix="banco-async"
+        )
+
+        self._lock = threading.Lock()
+        self._aguardando = 0
+        self._pico = 0
+        self._executadas = 0
+        self._recusadas = 0
+
+    async def executar(self, funcao, *args, **kwargs):
+        """Roda funcao(*args, **kwargs) numa thread do banco e aguarda"""
+        with self._lock:
+            if self._aguardando >= self.max_espera:
+                self._recusadas += 1
+                raise LimiteEsperaError(
+                    f"{self._aguardando} requisições aguardando o banco"
+                )
+            self._aguardando += 1
+            self._pico = max(self._pico, self._aguardando)
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor, functools.partial(funcao, *args, **kwargs)
+            )
+        finally:
+            with self._lock:
+                self._aguardando -= 1
+                self._executadas += 1
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                "threads": self.threads,
+                "max_espera": self.max_espera,
+                "aguardando": self._aguardando,
+                "pico_aguardando": self._pico,
+                "executadas": self._executadas,
+                "recusadas": self._recusadas,
+            }
+
+    def encerrar(self, aguardar=True):
+        self._executor.shutdown(wait=aguardar)
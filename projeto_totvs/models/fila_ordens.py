@@ -0,0 +1,256 @@
+# models/fila_ordens.py
+# Fila persistente (SQLite local) para envio assíncrono das ordens de separação
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger("FilaOrdens")
+
+PENDENTE = "pendente"
+PROCESSANDO = "processando"
+CONCLUIDO = "concluido"
+ERRO = "erro"
+
+
+class FilaCheiaError(Exception):
+    """Limite de ordens aguardando envio atingido"""
+
+
+def _abrir(caminho_db):
+    """Conexão com a tabela de ordens criada (se ainda não existe)"""
+    db = sqlite3.connect(caminho_db, timeout=30, check_same_thread=False)
+    db.row_factory = sqlite3.Row
+    with db:
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS ordens (
+                id TEXT PRIMARY KEY,
+                usuario TEXT,
+                projeto TEXT,
+                payload TEXT NOT NULL,
+                token TEXT,
+                status TEXT NOT NULL,
+                resultado TEXT,
+                criado_em REAL NOT NULL,
+                iniciado_em REAL,
+                concluido_em REAL
+            )
+            """
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS ix_ordens_status ON ordens (status)")
+    return db
+
+
+def marcar_interrompidas(caminho_db):
+    """
+    Ordens que ficaram no meio do envio viram erro. Com vários processos
+    (gunicorn) roda uma vez só, no master, antes de qualquer worker subir:
+    num worker reciclado marcaria envios ainda em andamento nos outros.
+    """
+    erro = {
+        "success": False,
+        "error": "Envio interrompido por reinício do servidor. "
+        "Confira no Protheus antes de reenviar.",
+    }
+    db = _abrir(caminho_db)
+    try:
+        with db:
+            marcadas = db.execute(
+                "UPDATE ordens SET status = ?, resultado = ?, concluido_em = ? "
+                "WHERE status = ?",
+                (ERRO, json.dumps(erro, ensure_ascii=False), time.time(), PROCESSANDO),
+            ).rowcount
+    finally:
+        db.close()
+    if marcadas:
+        logger.warning(
+            "%d ordem(ns) interrompida(s) no envio marcada(s) como erro", marcadas
+        )
+    return marcadas
+
+
+class FilaOrdens:
+    """
+    Guarda cada ordem no SQLite e processa com um pool limitado de workers.
+    - processar(payload, token) -> dict no formato de enviar_ordem_separacao
+    - O token do Protheus só fica gravado enquanto a ordem está pendente
+    - Ordens interrompidas no meio do envio NÃO são reenviadas (podem já ter
+      chegado ao Protheus); ficam com status de erro para conferência
+    - marcar_interrompidas=False quando vários processos dividem o SQLite
+      (o master do gunicorn faz isso uma vez com marcar_interrompidas())
+    """
+
+    def __init__(
+        self,
+        processar,
+        caminho_db,
+        workers=4,
+        max_pendentes=200,
+        marcar_interrompidas=True,
+    ):
+        self.processar = processar
+        self.caminho_db = caminho_db
+        self.max_pendentes = max_pendentes
+
+        self._lock = threading.Lock()
+        self._db = _abrir(caminho_db)
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="fila-ordens"
+        )
+        self._recuperar(marcar_interrompidas)
+
+    # ---------- API ----------
+
+    def enfileirar(self, payload, usuario, token):
+        """Grava a ordem como pendente e agenda o envio. Retorna o id do job"""
+        return self.enfileirar_varios([payload], usuario, token)[0]
+
+    def enfileirar_varios(self, payloads, usuario, token):
+        """
+        Grava várias ordens numa transação (entram todas ou nenhuma) e agenda
+        o envio. Retorna os ids dos jobs, na ordem dos payloads
+        """
+        ids = [uuid.uuid4().hex for _ in payloads]
+        agora = time.time()
+        with self._lock, self._db:
+            pendentes = self._db.execute(
+                "SELECT COUNT(*) FROM ordens WHERE status IN (?, ?)",
+                (PENDENTE, PROCESSANDO),
+            ).fetchone()[0]
+            if pendentes + len(payloads) > self.max_pendentes:
+                raise FilaCheiaError(
+                    f"Fila de ordens cheia ({pendentes} aguardando envio)"
+                )
+            self._db.executemany(
+                "INSERT INTO ordens (id, usuario, projeto, payload, token, status, "
+                "criado_em) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        job_id,
+                        usuario,
+                        str(payload.get("projeto", "")).strip(),
+                        json.dumps(payload, ensure_ascii=False),
+                        token,
+                        PENDENTE,
+                        agora,
+                    )
+                    for job_id, payload in zip(ids, payloads)
+                ],
+            )
+        for job_id in ids:
+            self._executor.submit(self._executar, job_id)
+        return ids
+
+    def consultar(self, job_id, usuario=None):
+        """Status de um job (None se não existe ou é de outro usuário)"""
+        jobs = self.consultar_varios([job_id], usuario)
+        return jobs[0] if jobs else None
+
+    def consultar_varios(self, ids, usuario=None):
+        ids = list(ids)[:100]
+        if not ids:
+            return []
+        marcadores = ",".join("?" * len(ids))
+        sql = f"SELECT * FROM ordens WHERE id IN ({marcadores})"
+        params = list(ids)
+        if usuario is not None:
+            sql += " AND usuario = ?"
+            params.append(usuario)
+        with self._lock:
+            linhas = self._db.execute(sql, params).fetchall()
+        ordem = {job_id: i for i, job_id in enumerate(ids)}
+        linhas.sort(key=lambda l: ordem[l["id"]])
+        return [self._para_dict(l) for l in linhas]
+
+    def estatisticas(self):
+        with self._lock:
+            linhas = self._db.execute(
+                "SELECT status, COUNT(*) FROM ordens GROUP BY status"
+            ).fetchall()
+        return {status: qtd for status, qtd in linhas}
+
+    def limpar_antigos(self, horas):
+        """Remove jobs finalizados há mais de N horas"""
+        limite = time.time() - horas * 3600
+        with self._lock, self._db:
+            return self._db.execute(
+                "DELETE FROM ordens WHERE status IN (?, ?) AND concluido_em < ?",
+                (CONCLUIDO, ERRO, limite),
+            ).rowcount
+
+    def encerrar(self, aguardar=True):
+        self._executor.shutdown(wait=aguardar)
+
+    # ---------- INTERNOS ----------
+
+    def _executar(self, job_id):
+        with self._lock, self._db:
+            # UPDATE condicional antes de ler: com vários processos agendando a
+            # mesma pendente (worker novo reagenda as de todos), só um a pega
+            tomada = self._db.execute(
+                "UPDATE ordens SET status = ?, iniciado_em = ? "
+                "WHERE id = ? AND status = ?",
+                (PROCESSANDO, time.time(), job_id, PENDENTE),
+            ).rowcount
+            if not tomada:
+                return
+            linha = self._db.execute(
+                "SELECT payload, token FROM ordens WHERE id = ?", (job_id,)
+            ).fetchone()
+            self._db.execute("UPDATE ordens SET token = NULL WHERE id = ?", (job_id,))
+
+        try:
+            resultado = self.processar(json.loads(linha["payload"]), linha["token"])
+        except Exception as e:
+            logger.exception("Erro ao processar ordem %s", job_id)
+            resultado = {"success": False, "error": f"Erro interno: {str(e)}"}
+
+        status = CONCLUIDO if resultado.get("success") else ERRO
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE ordens SET status = ?, resultado = ?, concluido_em = ? "
+                "WHERE id = ?",
+                (
+                    status,
+                    json.dumps(resultado, ensure_ascii=False, default=str),
+                    time.time(),
+                    job_id,
+                ),
+            )
+        logger.info("Ordem %s finalizada: %s", job_id, status)
+
+    def _recuperar(self, interrompidas=True):
+        """Reagenda pendentes (e marca como erro as interrompidas no envio)"""
+        if interrompidas:
+            marcar_interrompidas(self.caminho_db)
+        with self._lock:
+            pendentes = [
+                l[0]
+                for l in self._db.execute(
+                    "SELECT id FROM ordens WHERE status = ? ORDER BY criado_em",
+                    (PENDENTE,),
+                ).fetchall()
+            ]
+        for job_id in pendentes:
+            self._executor.submit(self._executar, job_id)
+        if pendentes:
+            logger.info("%d ordem(ns) pendente(s) reagendada(s)", len(pendentes))
+
+    @staticmethod
+    def _para_dict(linha):
+        return {
+            "job_id": linha["id"],
+            "projeto": linha["projeto"],
+            "status": linha["status"],
+            "resultado": json.loads(linha["resultado"]) if linha["resultado"] else None,
+            "criado_em": linha["criado_em"],
+            "iniciado_em": linha["iniciado_em"],
+            "concluido_em": linha["concluido_em"],
+        }
@@ -0,0 +1,64 @@
+# models/formato_colunar.py
+# Formato colunar das listas da API (?format=columnar): nomes das colunas
+# uma vez só, linhas como arrays, colunas constantes fora das linhas e
+# dicionário para textos repetidos (ex.: descrição do mesmo produto em
+# várias células). O app.js desfaz com decodificarColunar().
+
+import decimal
+
+from json_provider import para_nativo
+
+
+def para_colunar(linhas, colunas=None):
+    """
+    {"colunas": [...], "linhas": [[...], ...], "constantes": {col: valor},
+     "dicionarios": {col: [valores]}, "total": N}
+    Nas colunas com dicionário a linha guarda o índice do valor na lista.
+    """
+    linhas = list(linhas)
+    if colunas is None:
+        colunas = list(linhas[0]) if linhas else []
+
+    constantes = {}
+    variaveis = []
+    for coluna in colunas:
+        # Com uma linha só não há o que economizar
+        primeiro = linhas[0][coluna] if linhas else None
+        if len(linhas) > 1 and all(l[coluna] == primeiro for l in linhas):
+            constantes[coluna] = primeiro
+        else:
+            variaveis.append(coluna)
+
+    valores = [[l[c] for l in linhas] for c in variaveis]
+    for i, coluna_valores in enumerate(valores):
+        # Decimal convertido uma vez aqui (o resultado costuma ficar em cache),
+        # e não a cada resposta pelo default do serializador
+        if any(isinstance(v, decimal.Decimal) for v in coluna_valores):
+            valores[i] = [
+                para_nativo(v) if isinstance(v, decimal.Decimal) else v
+                for v in coluna_valores
+            ]
+    dicionarios = {}
+    for i, coluna in enumerate(variaveis):
+        coluna_valores = valores[i]
+        if not all(isinstance(v, str) for v in coluna_valores):
+            continue
+        indices = {}
+        for v in coluna_valores:
+            indices.setdefault(v, len(indices))
+        # Só compensa se cada texto aparece, em média, pelo menos duas vezes
+        if len(indices) * 2 <= len(coluna_valores):
+            dicionarios[coluna] = list(indices)
+            valores[i] = [indices[v] for v in coluna_valores]
+
+    return {
+        "colunas": variaveis,
+        "linhas": (
+            [list(linha) for linha in zip(*valores)]
+            if variaveis
+            else [[] for _ in linhas]
+        ),
+        "constantes": constantes,
+        "dicionarios": dicionarios,
+        "total": len(linhas),
+    }
@@ -0,0 +1,253 @@
+# models/http_client.py
+# Cliente HTTP compartilhado (requests.Session com pool keep-alive e retry)
+
+import logging
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+from config import Config
+from models.circuit_breaker import CircuitBreaker, CircuitoAbertoError, sonda_tcp
+from models.metricas import UPSTREAM_SEGUNDOS, UPSTREAM_EM_ANDAMENTO
+
+logger = logging.getLogger("HttpClient")
+
+# Status que indicam falha temporária do servidor/proxy
+STATUS_RETENTAVEIS = {502, 503, 504}
+
+
+def _falhou_antes_do_envio(erro):
+    """True se a requisição com certeza não chegou ao servidor"""
+    if isinstance(erro, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(erro, requests.exceptions.ConnectionError):
+        motivo = getattr(erro.args[0], "reason", None) if erro.args else None
+        return isinstance(motivo, NewConnectionError)
+    return False
+
+
+class ClienteHTTP:
+    """
+    Uma Session por processo, reaproveitando conexões TCP por host.
+    - pool_hosts: quantos hosts distintos mantêm pool aberto
+    - pool_max: conexões keep-alive guardadas por host
+    - tentativas: total de tentativas (1 = sem retry)
+    Retry: falhas de conexão (nada foi enviado) sempre; timeout de leitura e
+    502/503/504 só quando a chamada é idempotente (ex.: login).
+    """
+
+    def __init__(
+        self,
+        pool_hosts=4,
+        pool_max=10,
+        tentativas=3,
+        backoff_base=0.2,
+        backoff_max=2.0,
+        verify=False,
+    ):
+        self.tentativas = max(1, tentativas)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.session = requests.Session()
+        self.session.verify = verify
+        self._adapter = HTTPAdapter(
+            pool_connections=pool_hosts, pool_maxsize=pool_max, max_retries=0
+        )
+        self.session.mount("http://", self._adapter)
+        self.session.mount("https://", self._adapter)
+
+        self._lock = threading.Lock()
+        self._por_host = {}  # host -> contadores
+
+    # ---------- API ----------
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def get(self, url, **kwargs):
+        kwargs.setdefault("idempotente", True)
+        return self.request("GET", url, **kwargs)
+
+    def request(
+        self, metodo, url, idempotente=False, timeout=None, circuito=None, **kwargs
+    ):
+        """
+        timeout: (conexão, leitura) em segundos. Padrão: config HTTP_*.
+        circuito: CircuitBreaker do serviço; aberto = CircuitoAbertoError na hora.
+        Exceções do requests são propagadas após esgotar as tentativas.
+        """
+        servico = circuito.nome if circuito is not None else urlsplit(url).netloc
+        status = "erro"
+        inicio = time.perf_counter()
+        UPSTREAM_EM_ANDAMENTO.inc(servico=servico)
+        try:
+            resposta = self._com_circuito(
+                metodo, url, idempotente, timeout, circuito, **kwargs
+            )
+            status = str(resposta.status_code)
+            return resposta
+        except CircuitoAbertoError:
+            status = "circuito_aberto"
+            raise
+        except requests.exceptions.RequestException as e:
+            status = type(e).__name__
+            raise
+        finally:
+            UPSTREAM_EM_ANDAMENTO.dec(servico=servico)
+            UPSTREAM_SEGUNDOS.observar(
+                time.perf_counter() - inicio, servico=servico, status=status
+            )
+
+    def _com_circuito(self, metodo, url, idempotente, timeout, circuito, **kwargs):
+        if circuito is None:
+            return self._com_retry(metodo, url, idempotente, timeout, **kwargs)
+
+        circuito.permitir()
+        try:
+            resposta = self._com_retry(metodo, url, idempotente, timeout, **kwargs)
+        except requests.exceptions.RequestException as e:
+            circuito.registrar_falha(f"{type(e).__name__}: {e}")
+            raise
+        except BaseException:
+            # Erro nosso (não do serviço): só libera o teste do semi-aberto
+            circuito.liberar_teste()
+            raise
+        if resposta.status_code >= 500:
+            circuito.registrar_falha(f"status {resposta.status_code}")
+        else:
+            circuito.registrar_sucesso()
+        return resposta
+
+    def _com_retry(self, metodo, url, idempotente, timeout, **kwargs):
+        if timeout is None:
+            timeout = (Config.HTTP_CONNECT_TIMEOUT, Config.HTTP_READ_TIMEOUT)
+        host = urlsplit(url).netloc
+
+        for tentativa in range(1, self.tentativas + 1):
+            ultima = tentativa == self.tentativas
+            try:
+                resposta = self.session.request(metodo, url, timeout=timeout, **kwargs)
+            except requests.exceptions.RequestException as e:
+                retentar = _falhou_antes_do_envio(e) or (
+                    idempotente
+                    and isinstance(
+                        e,
+                        (
+                            requests.exceptions.ReadTimeout,
+                            requests.exceptions.ConnectionError,
+                        ),
+                    )
+                )
+                self._contar(host, erro=True)
+                if ultima or not retentar:
+                    raise
+                self._aguardar(host, tentativa, f"{type(e).__name__}: {e}")
+                continue
+
+            self._contar(host)
+            if (
+                idempotente
+                and resposta.status_code in STATUS_RETENTAVEIS
+                and not ultima
+            ):
+                resposta.close()
+                self._aguardar(host, tentativa, f"status {resposta.status_code}")
+                continue
+            return resposta
+
+    def estatisticas(self):
+        """Chamadas por host e quanto das conexões TCP está sendo reaproveitado"""
+        with self._lock:
+            hosts = {h: dict(c) for h, c in self._por_host.items()}
+
+        # Contadores do urllib3: conexões abertas x requisições feitas
+        pools = self._adapter.poolmanager.pools
+        for chave in pools.keys():
+            pool = pools.get(chave)
+            if pool is None:
+                continue
+            host = f"{pool.host}:{pool.port}" if pool.port else pool.host
+            dados = hosts.setdefault(host, {})
+            abertas = dados.get("conexoes_abertas", 0) + pool.num_connections
+            enviadas = dados.get("requisicoes_tcp", 0) + pool.num_requests
+            dados["conexoes_abertas"] = abertas
+            dados["requisicoes_tcp"] = enviadas
+            dados["reuso_percentual"] = (
+                round((enviadas - abertas) / enviadas * 100, 1) if enviadas else 0.0
+            )
+        return hosts
+
+    # ---------- INTERNOS ----------
+
+    def _aguardar(self, host, tentativa, motivo):
+        # Backoff exponencial com jitter total (evita rajadas sincronizadas)
+        espera = random.uniform(
+            0, min(self.backoff_max, self.backoff_base * 2 ** (tentativa - 1))
+        )
+        with self._lock:
+            self._por_host.setdefault(host, {}).setdefault("retries", 0)
+            self._por_host[host]["retries"] += 1
+        logger.warning(
+            f"Tentativa {tentativa} para {host} falhou ({motivo}); "
+            f"nova tentativa em {espera:.2f}s"
+        )
+        time.sleep(espera)
+
+    def _contar(self, host, erro=False):
+        with self._lock:
+            dados = self._por_host.setdefault(host, {})
+            chave = "erros" if erro else "respostas"
+            dados[chave] = dados.get(chave, 0) + 1
+
+
+_cliente = None
+_cliente_lock = threading.Lock()
+
+
+def get_cliente_http():
+    """Cliente compartilhado por AuthModel e ProjetoController"""
+    global _cliente
+    if _cliente is None:
+        with _cliente_lock:
+            if _cliente is None:
+                _cliente = ClienteHTTP(
+                    pool_hosts=Config.HTTP_POOL_HOSTS,
+                    pool_max=Config.HTTP_POOL_MAXSIZE,
+                    tentativas=Config.HTTP_TENTATIVAS,
+                    backoff_base=Config.HTTP_BACKOFF_BASE,
+                    backoff_max=Config.HTTP_BACKOFF_MAX,
+                )
+    return _cliente
+
+
+_circuitos = {}
+_circuitos_lock = threading.Lock()
+
+
+def get_circuito(nome, url):
+    """Circuit breaker por serviço externo (ex.: 'protheus', 'auth')"""
+    with _circuitos_lock:
+        circuito = _circuitos.get(nome)
+        if circuito is None:
+            circuito = _circuitos[nome] = CircuitBreaker(
+                nome,
+                janela=Config.CB_JANELA,
+                min_chamadas=Config.CB_MIN_CHAMADAS,
+                taxa_falha=Config.CB_TAXA_FALHA,
+                tempo_aberto=Config.CB_TEMPO_ABERTO,
+                sonda=sonda_tcp(url),
+                intervalo_sonda=Config.CB_INTERVALO_SONDA,
+            )
+        return circuito
+
+
+def estado_circuitos():
+    with _circuitos_lock:
+        circuitos = dict(_circuitos)
+    return {nome: c.estado() for nome, c in circuitos.items()}
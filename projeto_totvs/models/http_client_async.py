@@ -0,0 +1,176 @@
+# models/http_client_async.py
+# Versão assíncrona do ClienteHTTP (httpx.AsyncClient) para o caminho ASGI:
+# mesma política de retry, circuit breakers e métricas do cliente síncrono
+
+import asyncio
+import logging
+import random
+import time
+from urllib.parse import urlsplit
+
+from config import Config
+from models.circuit_breaker import CircuitoAbertoError
+from models.http_client import STATUS_RETENTAVEIS
+from models.metricas import UPSTREAM_SEGUNDOS, UPSTREAM_EM_ANDAMENTO
+
+try:
+    import httpx
+except ImportError:  # opcional: sem ele o asgi.py renova o token no executor
+    httpx = None
+
+logger = logging.getLogger("HttpClientAsync")
+
+
+class ClienteHTTPAsync:
+    """
+    Um AsyncClient por processo (pool keep-alive por host). Esperar o
+    Protheus custa uma corrotina, não uma thread.
+    Retry: falhas de conexão sempre; timeout de leitura e 502/503/504 só
+    quando a chamada é idempotente.
+    """
+
+    def __init__(
+        self,
+        pool_max=10,
+        tentativas=3,
+        backoff_base=0.2,
+        backoff_max=2.0,
+        verify=False,
+    ):
+        self.tentativas = max(1, tentativas)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.cliente = httpx.AsyncClient(
+            verify=verify,
+            limits=httpx.Limits(
+                max_connections=None, max_keepalive_connections=pool_max
+            ),
+        )
+
+    async def post(self, url, **kwargs):
+        return await self.request("POST", url, **kwargs)
+
+    async def get(self, url, **kwargs):
+        kwargs.setdefault("idempotente", True)
+        return await self.request("GET", url, **kwargs)
+
+    async def request(
+        self, metodo, url, idempotente=False, timeout=None, circuito=None, **kwargs
+    ):
+        """
+        timeout: (conexão, leitura) em segundos, como no ClienteHTTP.
+        Exceções do httpx são propagadas após esgotar as tentativas.
+        """
+        servico = circuito.nome if circuito is not None else urlsplit(url).netloc
+        status = "erro"
+        inicio = time.perf_counter()
+        UPSTREAM_EM_ANDAMENTO.inc(servico=servico)
+        try:
+            if circuito is not None:
+                circuito.permitir()
+            try:
+                resposta = await self._com_retry(
+                    metodo, url, idempotente, timeout, **kwargs
+                )
+            except httpx.HTTPError as e:
+                if circuito is not None:
+                    circuito.registrar_falha(f"{type(e).__name__}: {e}")
+                raise
+            except BaseException:
+                # Erro nosso ou cancelamento: só libera o teste do semi-aberto
+                if circuito is not None:
+                    circuito.liberar_teste()
+                raise
+            if circuito is not None:
+                if resposta.status_code >= 500:
+                    circuito.registrar_falha(f"status {resposta.status_code}")
+                else:
+                    circuito.registrar_sucesso()
+            status = str(resposta.status_code)
+            return resposta
+        except CircuitoAbertoError:
+            status = "circuito_aberto"
+            raise
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+            raise
+        finally:
+            UPSTREAM_EM_ANDAMENTO.dec(servico=servico)
+            UPSTREAM_SEGUNDOS.observar(
+                time.perf_counter() - inicio, servico=servico, status=status
+            )
+
+    async def fechar(self):
+        await self.cliente.aclose()
+
+    async def _com_retry(self, metodo, url, idempotente, timeout, **kwargs):
+        if timeout is None:
+            timeout = (Config.HTTP_CONNECT_TIMEOUT, Config.HTTP_READ_TIMEOUT)
+        conexao, leitura = timeout
+        limites = httpx.Timeout(leitura, connect=conexao)
+
+        for tentativa in range(1, self.tentativas + 1):
+            ultima = tentativa == self.tentativas
+            try:
+                resposta = await self.cliente.request(
+                    metodo, url, timeout=limites, **kwargs
+                )
+            except httpx.TransportError as e:
+                # ConnectError/ConnectTimeout: nada chegou ao servidor
+                retentar = isinstance(
+                    e, (httpx.ConnectError, httpx.ConnectTimeout)
+                ) or (
+                    idempotente and isinstance(e, (httpx.ReadTimeout, httpx.ReadError))
+                )
+                if ultima or not retentar:
+                    raise
+                await self._aguardar(url, tentativa, f"{type(e).__name__}: {e}")
+                continue
+
+            if (
+                idempotente
+                and resposta.status_code in STATUS_RETENTAVEIS
+                and not ultima
+            ):
+                await resposta.aclose()
+                await self._aguardar(url, tentativa, f"status {resposta.status_code}")
+                continue
+            return resposta
+
+    async def _aguardar(self, url, tentativa, motivo):
+        espera = random.uniform(
+            0, min(self.backoff_max, self.backoff_base * 2 ** (tentativa - 1))
+        )
+        logger.warning(
+            f"Tentativa {tentativa} para {urlsplit(url).netloc} falhou ({motivo}); "
+            f"nova tentativa em {espera:.2f}s"
+        )
+        await asyncio.sleep(espera)
+
+
+_cliente = None
+
+
+def get_cliente_http_async():
+    """
+    Cliente do event loop do processo (None sem httpx). Criado na primeira
+    chamada, já dentro do loop: o AsyncClient fica preso a ele.
+    """
+    global _cliente
+    if httpx is None:
+        return None
+    if _cliente is None:
+        _cliente = ClienteHTTPAsync(
+            pool_max=Config.HTTP_POOL_MAXSIZE,
+            tentativas=Config.HTTP_TENTATIVAS,
+            backoff_base=Config.HTTP_BACKOFF_BASE,
+            backoff_max=Config.HTTP_BACKOFF_MAX,
+        )
+    return _cliente
+
+
+async def fechar_cliente_http_async():
+    global _cliente
+    if _cliente is not None:
+        cliente, _cliente = _cliente, None
+        await cliente.fechar()
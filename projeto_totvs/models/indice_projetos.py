@@ -0,0 +1,141 @@
+# models/indice_projetos.py
+# Índice em memória para busca de projetos (código e nome do cliente)
+
+import base64
+import bisect
+import heapq
+import json
+
+from models.cache import versao_conteudo
+
+# Ordem do ranking: código começando com o termo, nome começando com o
+# termo e, por último, termo em qualquer posição do código ou do nome
+RANK_PREFIXO_CODIGO = 0
+RANK_PREFIXO_NOME = 1
+RANK_CONTEM = 2
+
+
+class CursorInvalidoError(ValueError):
+    """Cursor de paginação malformado"""
+
+
+def codificar_cursor(rank, projeto, revisao):
+    bruto = json.dumps([rank, projeto, revisao], ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(bruto).decode("ascii").rstrip("=")
+
+
+def decodificar_cursor(cursor):
+    try:
+        preenchido = cursor + "=" * (-len(cursor) % 4)
+        rank, projeto, revisao = json.loads(base64.urlsafe_b64decode(preenchido))
+        return int(rank), str(projeto), str(revisao)
+    except Exception:
+        raise CursorInvalidoError("Cursor de paginação inválido")
+
+
+def _trigramas(texto):
+    return {texto[i : i + 3] for i in range(len(texto) - 2)}
+
+
+class IndiceProjetos:
+    """
+    Montado uma vez a cada recarga do cache de projetos.
+    - Ordenação fixa por (AF8_PROJET, AF8_REVISA) para paginação keyset
+    - Índice de trigramas para buscar substrings sem varrer tudo
+    """
+
+    def __init__(self, projetos):
+        self._projetos = sorted(
+            projetos, key=lambda p: (str(p["AF8_PROJET"]), str(p["AF8_REVISA"]))
+        )
+        # ETag de /api/projetos (muda se algum projeto entrar, sair ou mudar)
+        self.versao = versao_conteudo(
+            self._projetos, ("AF8_PROJET", "AF8_REVISA", "AF8_XNOMCL")
+        )
+        self._chaves = [
+            (str(p["AF8_PROJET"]), str(p["AF8_REVISA"])) for p in self._projetos
+        ]
+        self._codigos = [str(p["AF8_PROJET"]).strip().lower() for p in self._projetos]
+        self._nomes = [
+            str(p.get("AF8_XNOMCL") or "").strip().lower() for p in self._projetos
+        ]
+
+        self._trigramas = {}
+        for i, (codigo, nome) in enumerate(zip(self._codigos, self._nomes)):
+            for tri in _trigramas(codigo) | _trigramas(nome):
+                self._trigramas.setdefault(tri, []).append(i)
+
+    def __len__(self):
+        return len(self._projetos)
+
+    def todos(self):
+        """Lista completa (formato antigo de /api/projetos)"""
+        return self._projetos
+
+    def buscar(self, termo="", limite=50, cursor=None):
+        """
+        Retorna (itens, proximo_cursor, total_encontrado).
+        O cursor é opaco e continua a partir do último item devolvido.
+        """
+        apos = decodificar_cursor(cursor) if cursor else None
+        termo = (termo or "").strip().lower()
+
+        if not termo:
+            # Sem busca: a lista já está na ordem do cursor
+            inicio = bisect.bisect_right(self._chaves, apos[1:]) if apos else 0
+            fim = inicio + limite
+            proximo = None
+            if fim < len(self._projetos):
+                projeto, revisao = self._chaves[fim - 1]
+                proximo = codificar_cursor(RANK_PREFIXO_CODIGO, projeto, revisao)
+            return self._projetos[inicio:fim], proximo, len(self._projetos)
+
+        ordenaveis = []
+        for i in self._candidatos(termo):
+            rank = self._rank(i, termo)
+            if rank is not None:
+                ordenaveis.append((rank, self._chaves[i], i))
+        total = len(ordenaveis)
+
+        if apos is not None:
+            marco = (apos[0], (apos[1], apos[2]))
+            ordenaveis = [o for o in ordenaveis if (o[0], o[1]) > marco]
+
+        pagina = heapq.nsmallest(limite + 1, ordenaveis)
+        proximo = None
+        if len(pagina) > limite:
+            pagina = pagina[:limite]
+            rank, (projeto, revisao), _ = pagina[-1]
+            proximo = codificar_cursor(rank, projeto, revisao)
+
+        return [self._projetos[i] for _, _, i in pagina], proximo, total
+
+    def _candidatos(self, termo):
+        if len(termo) < 3:
+            return range(len(self._projetos))
+
+        listas = []
+        for tri in _trigramas(termo):
+            postagens = self._trigramas.get(tri)
+            if not postagens:
+                return ()
+            listas.append(postagens)
+
+        listas.sort(key=len)
+        comuns = set(listas[0])
+        for postagens in listas[1:]:
+            comuns.intersection_update(postagens)
+            if not comuns:
+                break
+        return comuns
+
+    def _rank(self, i, termo):
+        codigo = self._codigos[i]
+        nome = self._nomes[i]
+        if codigo.startswith(termo):
+            return RANK_PREFIXO_CODIGO
+        if nome.startswith(termo):
+            return RANK_PREFIXO_NOME
+        if termo in codigo or termo in nome:
+            return RANK_CONTEM
+        return None
@@ -0,0 +1,60 @@
+# models/invalidacoes.py
+# Invalidações de cache por projeto vistas por todos os processos (gunicorn)
+
+import sqlite3
+import threading
+import time
+
+
+class InvalidacoesCompartilhadas:
+    """
+    Uma linha por ordem enviada (seq, projeto, instante) no SQLite.
+    - marcar(projeto): chamado por quem enviou a ordem
+    - novas(): projetos marcados por OUTROS processos desde a última
+      chamada. Custa um PRAGMA data_version (o SQLite só muda esse número
+      quando outra conexão grava), então pode rodar a cada leitura do cache
+    """
+
+    def __init__(self, caminho_db, retencao=3600):
+        self.retencao = retencao
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(caminho_db, timeout=30, check_same_thread=False)
+        with self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS invalidacoes ("
+                "seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "projeto TEXT NOT NULL, em REAL NOT NULL)"
+            )
+        self._versao = self._versao_dados()
+        self._ultima_seq = self._db.execute(
+            "SELECT COALESCE(MAX(seq), 0) FROM invalidacoes"
+        ).fetchone()[0]
+
+    def marcar(self, projeto):
+        agora = time.time()
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO invalidacoes (projeto, em) VALUES (?, ?)",
+                (str(projeto).strip(), agora),
+            )
+            self._db.execute(
+                "DELETE FROM invalidacoes WHERE em < ?", (agora - self.retencao,)
+            )
+
+    def novas(self):
+        with self._lock:
+            versao = self._versao_dados()
+            if versao == self._versao:
+                return []
+            self._versao = versao
+            linhas = self._db.execute(
+                "SELECT seq, projeto FROM invalidacoes WHERE seq > ?",
+                (self._ultima_seq,),
+            ).fetchall()
+            if linhas:
+                self._ultima_seq = max(seq for seq, _ in linhas)
+        return sorted({projeto for _, projeto in linhas})
+
+    def _versao_dados(self):
+        return self._db.execute("PRAGMA data_version").fetchone()[0]
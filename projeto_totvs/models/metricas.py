@@ -0,0 +1,338 @@
+# models/metricas.py
+# Métricas em memória expostas em /metrics (formato texto do Prometheus)
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Limites (segundos) dos histogramas de latência
+BUCKETS_PADRAO = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _formatar_rotulos(nomes, valores, extra=None):
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _numero(valor):
+    if valor == float("inf"):
+        return "+Inf"
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return str(valor)
+
+
+class _Metrica:
+    tipo = None
+
+    def __init__(self, nome, ajuda, rotulos=()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._lock = threading.Lock()
+        self._series = {}  # valores dos rótulos (tupla) -> estado
+
+    def _chave(self, rotulos):
+        return tuple(rotulos.get(n, "") for n in self.rotulos)
+
+    def instantaneo(self):
+        """Estado atual serializável em JSON (somado entre processos)"""
+        with self._lock:
+            series = [[list(k), self._copiar(v)] for k, v in self._series.items()]
+        return {
+            "tipo": self.tipo,
+            "ajuda": self.ajuda,
+            "rotulos": list(self.rotulos),
+            "series": series,
+        }
+
+    @staticmethod
+    def _copiar(estado):
+        return estado
+
+
+class Contador(_Metrica):
+    tipo = "counter"
+
+    def inc(self, valor=1, **rotulos):
+        chave = self._chave(rotulos)
+        with self._lock:
+            self._series[chave] = self._series.get(chave, 0) + valor
+
+
+class Gauge(_Metrica):
+    tipo = "gauge"
+
+    def inc(self, valor=1, **rotulos):
+        chave = self._chave(rotulos)
+        with self._lock:
+            self._series[chave] = self._series.get(chave, 0) + valor
+
+    def dec(self, valor=1, **rotulos):
+        self.inc(-valor, **rotulos)
+
+
+class Histograma(_Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nome, ajuda, rotulos=(), buckets=BUCKETS_PADRAO):
+        super().__init__(nome, ajuda, rotulos)
+        self.buckets = tuple(sorted(buckets))
+
+    def observar(self, valor, **rotulos):
+        chave = self._chave(rotulos)
+        i = bisect_left(self.buckets, valor)
+        with self._lock:
+            estado = self._series.get(chave)
+            if estado is None:
+                # [contagem por bucket (+Inf no fim), soma, total]
+                estado = self._series[chave] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            estado[0][i] += 1
+            estado[1] += valor
+            estado[2] += 1
+
+    @contextmanager
+    def medir(self, **rotulos):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(time.perf_counter() - inicio, **rotulos)
+
+    def instantaneo(self):
+        return dict(super().instantaneo(), buckets=list(self.buckets))
+
+    @staticmethod
+    def _copiar(estado):
+        return [list(estado[0]), estado[1], estado[2]]
+
+
+def _linhas_metrica(nome, dados):
+    """Linhas do formato texto de uma métrica (ver _Metrica.instantaneo)"""
+    rotulos = dados["rotulos"]
+    linhas = [f"# HELP {nome} {dados['ajuda']}", f"# TYPE {nome} {dados['tipo']}"]
+    for chave, estado in sorted(dados["series"]):
+        serie = _formatar_rotulos(rotulos, chave)
+        if dados["tipo"] != "histogram":
+            linhas.append(f"{nome}{serie} {_numero(estado)}")
+            continue
+        contagens, soma, total = estado
+        acumulado = 0
+        for limite, qtd in zip(dados["buckets"] + [float("inf")], contagens):
+            acumulado += qtd
+            le = _formatar_rotulos(rotulos, chave, f'le="{_numero(limite)}"')
+            linhas.append(f"{nome}_bucket{le} {acumulado}")
+        linhas.append(f"{nome}_sum{serie} {round(soma, 6)}")
+        linhas.append(f"{nome}_count{serie} {total}")
+    return linhas
+
+
+def somar_metricas(destino, metricas, gauges=True):
+    """
+    Soma em destino (nome -> instantâneo) as métricas de outro processo.
+    gauges=False descarta os gauges (valores de um processo que já saiu)
+    """
+    for nome, dados in metricas.items():
+        if dados["tipo"] == "gauge" and not gauges:
+            continue
+        atual = destino.get(nome)
+        if atual is None:
+            destino[nome] = dict(dados, series=[[k, e] for k, e in dados["series"]])
+            continue
+        series = {tuple(k): e for k, e in atual["series"]}
+        for chave, estado in dados["series"]:
+            chave = tuple(chave)
+            anterior = series.get(chave)
+            if anterior is None:
+                series[chave] = estado
+            elif dados["tipo"] == "histogram":
+                series[chave] = [
+                    [a + b for a, b in zip(anterior[0], estado[0])],
+                    anterior[1] + estado[1],
+                    anterior[2] + estado[2],
+                ]
+            else:
+                series[chave] = anterior + estado
+        atual["series"] = [[list(k), e] for k, e in series.items()]
+    return destino
+
+
+class Registro:
+    """
+    Métricas do processo. Além das métricas com estado, aceita coletores:
+    funções chamadas só no scrape, que devolvem (nome, rótulos, valor)
+    exportados como gauge (ex.: estatísticas do pool e dos caches).
+    """
+
+    def __init__(self):
+        self._metricas = []
+        self._coletores = []  # funções
+        self._ajudas = {}  # prefixo -> descrição (HELP das métricas coletadas)
+        self._lock = threading.Lock()
+
+    def _adicionar(self, metrica):
+        with self._lock:
+            self._metricas.append(metrica)
+        return metrica
+
+    def contador(self, nome, ajuda, rotulos=()):
+        return self._adicionar(Contador(nome, ajuda, rotulos))
+
+    def gauge(self, nome, ajuda, rotulos=()):
+        return self._adicionar(Gauge(nome, ajuda, rotulos))
+
+    def histograma(self, nome, ajuda, rotulos=(), buckets=BUCKETS_PADRAO):
+        return self._adicionar(Histograma(nome, ajuda, rotulos, buckets))
+
+    def coletor(self, funcao, ajudas=None):
+        """
+        ajudas: prefixo -> descrição. Cada métrica coletada ganha o HELP do
+        maior prefixo que casar com o nome (ex.: portal_pool -> portal_pool_livres)
+        """
+        with self._lock:
+            self._coletores.append(funcao)
+            self._ajudas.update(ajudas or {})
+
+    def _ajuda(self, nome):
+        prefixo = max(
+            (p for p in self._ajudas if nome == p or nome.startswith(p + "_")),
+            key=len,
+            default=None,
+        )
+        if prefixo is None:
+            return nome
+        if prefixo == nome:
+            return self._ajudas[prefixo]
+        return f"{self._ajudas[prefixo]} ({nome[len(prefixo) + 1 :]})"
+
+    def instantaneo(self):
+        """Métricas e amostras dos coletores deste processo (JSON)"""
+        with self._lock:
+            metricas = list(self._metricas)
+            coletores = list(self._coletores)
+
+        coletadas = {}
+        falhas = []
+        for funcao in coletores:
+            try:
+                amostras = list(funcao())
+            except Exception as e:
+                nome = getattr(funcao, "__name__", "?")
+                falhas.append(f"coletor {nome} falhou: {e}")
+                continue
+            for nome, rotulos, valor in amostras:
+                coletadas.setdefault(nome, []).append([dict(rotulos), valor])
+        return {
+            "pid": os.getpid(),
+            "metricas": {m.nome: m.instantaneo() for m in metricas},
+            "coletadas": coletadas,
+            "falhas": falhas,
+        }
+
+    def exportar(self, instantaneos=None):
+        """
+        Texto do Prometheus. instantaneos: os de vários processos (ver
+        MetricasProcessos); as métricas com estado são somadas e as
+        coletadas ganham o rótulo worker=<pid>
+        """
+        por_worker = instantaneos is not None
+        if instantaneos is None:
+            instantaneos = [self.instantaneo()]
+
+        metricas = {}
+        for inst in instantaneos:
+            somar_metricas(metricas, inst["metricas"])
+        linhas = [f"# {falha}" for inst in instantaneos for falha in inst["falhas"]]
+        for nome, dados in metricas.items():
+            linhas.extend(_linhas_metrica(nome, dados))
+
+        # O formato exige as amostras de cada métrica juntas, mesmo vindas de
+        # coletores (ou chamadas de achatar) e processos diferentes
+        familias = {}
+        for inst in instantaneos:
+            for nome, amostras in inst["coletadas"].items():
+                for rotulos, valor in amostras:
+                    if por_worker:
+                        rotulos = dict(rotulos, worker=inst["pid"])
+                    serie = _formatar_rotulos(tuple(rotulos), rotulos.values())
+                    familias.setdefault(nome, []).append(
+                        f"{nome}{serie} {_numero(valor)}"
+                    )
+        for nome, amostras in familias.items():
+            linhas.append(f"# HELP {nome} {self._ajuda(nome)}")
+            linhas.append(f"# TYPE {nome} gauge")
+            linhas.extend(amostras)
+        return "\n".join(linhas) + "\n"
+
+
+def achatar(prefixo, dados, **rotulos):
+    """Dict de estatísticas -> amostras (só os valores numéricos)"""
+    for chave, valor in dados.items():
+        if isinstance(valor, bool):
+            valor = int(valor)
+        if isinstance(valor, (int, float)):
+            yield f"{prefixo}_{chave}", rotulos, valor
+
+
+REGISTRO = Registro()
+
+# ---------- MÉTRICAS DA APLICAÇÃO ----------
+
+REQUISICAO_SEGUNDOS = REGISTRO.histograma(
+    "portal_requisicao_segundos",
+    "Latência das requisições HTTP por rota",
+    ("rota", "metodo"),
+)
+REQUISICOES_TOTAL = REGISTRO.contador(
+    "portal_requisicoes_total",
+    "Requisições HTTP por rota e status",
+    ("rota", "metodo", "status"),
+)
+REQUISICOES_EM_ANDAMENTO = REGISTRO.gauge(
+    "portal_requisicoes_em_andamento", "Requisições sendo atendidas agora"
+)
+
+DB_EXECUTE_SEGUNDOS = REGISTRO.histograma(
+    "portal_db_execute_segundos",
+    "Tempo do cursor.execute por consulta do ProjetoModel",
+    ("consulta",),
+)
+DB_FETCH_SEGUNDOS = REGISTRO.histograma(
+    "portal_db_fetch_segundos",
+    "Tempo somado dos fetchmany por consulta do ProjetoModel",
+    ("consulta",),
+)
+DB_LINHAS_TOTAL = REGISTRO.contador(
+    "portal_db_linhas_total", "Linhas lidas por consulta", ("consulta",)
+)
+DB_ERROS_TOTAL = REGISTRO.contador(
+    "portal_db_erros_total", "Consultas que levantaram exceção", ("consulta",)
+)
+
+UPSTREAM_SEGUNDOS = REGISTRO.histograma(
+    "portal_upstream_segundos",
+    "Latência das chamadas ao Protheus e ao /auth (com retries)",
+    ("servico", "status"),
+)
+UPSTREAM_EM_ANDAMENTO = REGISTRO.gauge(
+    "portal_upstream_em_andamento",
+    "Chamadas externas aguardando resposta",
+    ("servico",),
+)
+
+
+def registrar_consulta(medicao):
+    """Chamado ao fim de cada consulta medida (ver row_fetcher.MedicaoConsulta)"""
+    DB_EXECUTE_SEGUNDOS.observar(medicao.execute, consulta=medicao.nome)
+    DB_FETCH_SEGUNDOS.observar(medicao.fetch, consulta=medicao.nome)
+    DB_LINHAS_TOTAL.inc(medicao.linhas, consulta=medicao.nome)
+    if medicao.erro:
+        DB_ERROS_TOTAL.inc(consulta=medicao.nome)
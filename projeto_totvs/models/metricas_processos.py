@@ -0,0 +1,168 @@
+# models/metricas_processos.py
+# /metrics com vários workers (gunicorn): cada processo grava um instantâneo
+# numa pasta comum e quem atende o scrape soma todos
+
+import atexit
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+
+from models.metricas import somar_metricas
+
+try:
+    import fcntl
+except ImportError:  # Windows: um processo só (waitress), não usa esta classe
+    fcntl = None
+
+logger = logging.getLogger("MetricasProcessos")
+
+ARQUIVO_MORTOS = "mortos.json"
+
+
+def limpar_pasta(pasta):
+    """Master do gunicorn, na subida: descarta instantâneos da execução anterior"""
+    os.makedirs(pasta, exist_ok=True)
+    for nome in os.listdir(pasta):
+        if nome.endswith(".json"):
+            os.remove(os.path.join(pasta, nome))
+
+
+class MetricasProcessos:
+    """
+    - pasta: um <pid>.json por worker vivo e o mortos.json com contadores e
+      histogramas dos workers que já saíram (somados para o total não voltar
+      a zero a cada reciclagem)
+    - intervalo: segundos entre gravações; o scrape vê os outros workers com
+      até esse atraso
+    """
+
+    def __init__(self, registro, pasta, intervalo=5):
+        self.registro = registro
+        self.pasta = pasta
+        self.intervalo = intervalo
+        self.pid = os.getpid()
+        self.arquivo = os.path.join(pasta, f"{self.pid}.json")
+
+        self._lock = threading.Lock()  # gravação x encerramento
+        self._parar = threading.Event()
+        self._encerrado = False
+
+    def iniciar(self):
+        os.makedirs(self.pasta, exist_ok=True)
+        self._gravar()
+        threading.Thread(
+            target=self._executar, name="metricas-processos", daemon=True
+        ).start()
+        atexit.register(self.encerrar)
+        return self
+
+    def exportar(self):
+        """Texto do Prometheus somando este processo, os vivos e os mortos"""
+        self._recolher_mortos()
+        # Soma só o que está gravado, inclusive o deste processo: cada arquivo
+        # só cresce, então o total não recua quando o próximo scrape cai num
+        # worker cujo arquivo está mais novo que o dos outros
+        self._gravar()
+        instantaneos = []
+        # Sob a trava: um worker saindo não aparece no mortos.json e no
+        # próprio arquivo ao mesmo tempo
+        with self._travado():
+            for nome in sorted(os.listdir(self.pasta)):
+                if nome.endswith(".json"):
+                    dados = self._ler(os.path.join(self.pasta, nome))
+                    if dados is not None:
+                        instantaneos.append(dados)
+        return self.registro.exportar(instantaneos)
+
+    def encerrar(self):
+        """Saída do worker: soma os contadores no mortos.json"""
+        with self._lock:
+            if self._encerrado:
+                return
+            self._encerrado = True
+            self._parar.set()
+            try:
+                self._incorporar(self.registro.instantaneo(), self.arquivo)
+            except Exception as e:
+                logger.warning(f"Falha ao guardar métricas do worker {self.pid}: {e}")
+
+    # ---------- INTERNOS ----------
+
+    def _executar(self):
+        while not self._parar.wait(self.intervalo):
+            try:
+                self._gravar()
+            except Exception as e:
+                logger.warning(f"Falha ao gravar métricas do worker: {e}")
+
+    def _gravar(self):
+        with self._lock:
+            if not self._encerrado:
+                self._escrever(self.arquivo, self.registro.instantaneo())
+
+    def _recolher_mortos(self):
+        """Worker morto sem encerrar (SIGKILL, timeout): soma no mortos.json"""
+        for nome in os.listdir(self.pasta):
+            pid = nome[: -len(".json")]
+            if not (nome.endswith(".json") and pid.isdigit()):
+                continue
+            if int(pid) != self.pid and not _vivo(int(pid)):
+                self._incorporar(None, os.path.join(self.pasta, nome))
+
+    def _incorporar(self, instantaneo, arquivo):
+        """
+        Soma o instantâneo (ou, se None, o gravado em arquivo) no mortos.json
+        e apaga o arquivo, sob trava: dois workers podem achar o mesmo morto
+        """
+        with self._travado():
+            if instantaneo is None:
+                instantaneo = self._ler(arquivo)
+                if instantaneo is None:  # outro worker já incorporou
+                    return
+            caminho = os.path.join(self.pasta, ARQUIVO_MORTOS)
+            mortos = self._ler(caminho) or {
+                "pid": "mortos",
+                "metricas": {},
+                "coletadas": {},
+                "falhas": [],
+            }
+            somar_metricas(mortos["metricas"], instantaneo["metricas"], gauges=False)
+            self._escrever(caminho, mortos)
+            if os.path.exists(arquivo):
+                os.remove(arquivo)
+
+    @contextmanager
+    def _travado(self):
+        """Trava entre processos da pasta (liberada ao fechar o arquivo)"""
+        with open(os.path.join(self.pasta, ".trava"), "a") as trava:
+            if fcntl is not None:
+                fcntl.flock(trava, fcntl.LOCK_EX)
+            yield
+
+    @staticmethod
+    def _ler(caminho):
+        try:
+            with open(caminho, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _escrever(caminho, dados):
+        # Grava ao lado e troca: quem lê nunca vê o arquivo pela metade
+        temporario = f"{caminho}.{os.getpid()}.tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(dados, f)
+        os.replace(temporario, caminho)
+
+
+def _vivo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
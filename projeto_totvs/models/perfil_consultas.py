@@ -0,0 +1,138 @@
+# models/perfil_consultas.py
+# Profiler das consultas do ProjetoModel: log de consultas lentas e top-N
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger("SlowQuery")
+
+
+def _resumir_params(params, limite=200):
+    texto = repr(list(params)) if params else "[]"
+    return texto if len(texto) <= limite else texto[: limite - 3] + "..."
+
+
+class PerfilConsultas:
+    """
+    Recebe a MedicaoConsulta de cada statement (ver row_fetcher).
+    - limite_lento_ms: acima disso a consulta é logada como lenta
+    - top_n: quantas das consultas mais demoradas ficam guardadas
+    Mantém também agregados por nome de consulta desde o último reset.
+    """
+
+    def __init__(self, limite_lento_ms=1000, top_n=20):
+        self.limite_lento = limite_lento_ms / 1000
+        self.top_n = max(1, top_n)
+
+        self._lock = threading.Lock()
+        self._seq = itertools.count()  # desempate no heap
+        self._top = []  # min-heap (duracao, seq, registro)
+        self._lentas = deque(maxlen=self.top_n)  # mais recentes acima do limite
+        self._por_consulta = {}
+        self._desde = time.time()
+
+    def registrar(self, medicao):
+        duracao = medicao.execute + medicao.fetch
+        registro = {
+            "consulta": medicao.nome,
+            "params": _resumir_params(medicao.params),
+            "execute_ms": round(medicao.execute * 1000, 2),
+            "fetch_ms": round(medicao.fetch * 1000, 2),
+            "total_ms": round(duracao * 1000, 2),
+            "linhas": medicao.linhas,
+            "erro": medicao.erro,
+            "quando": time.time(),
+        }
+        lenta = duracao >= self.limite_lento
+
+        with self._lock:
+            agregado = self._por_consulta.setdefault(
+                medicao.nome,
+                {
+                    "chamadas": 0,
+                    "erros": 0,
+                    "lentas": 0,
+                    "linhas": 0,
+                    "execute_total_ms": 0.0,
+                    "fetch_total_ms": 0.0,
+                    "max_ms": 0.0,
+                },
+            )
+            agregado["chamadas"] += 1
+            agregado["erros"] += bool(medicao.erro)
+            agregado["lentas"] += lenta
+            agregado["linhas"] += medicao.linhas
+            agregado["execute_total_ms"] += registro["execute_ms"]
+            agregado["fetch_total_ms"] += registro["fetch_ms"]
+            agregado["max_ms"] = max(agregado["max_ms"], registro["total_ms"])
+
+            item = (duracao, next(self._seq), registro)
+            if len(self._top) < self.top_n:
+                heapq.heappush(self._top, item)
+            elif duracao > self._top[0][0]:
+                heapq.heapreplace(self._top, item)
+            if lenta:
+                self._lentas.append(registro)
+
+        if lenta:
+            logger.warning(
+                "Consulta lenta %s: %.0f ms (execute %.0f ms, fetch %.0f ms, "
+                "%d linhas) params=%s",
+                medicao.nome,
+                registro["total_ms"],
+                registro["execute_ms"],
+                registro["fetch_ms"],
+                medicao.linhas,
+                registro["params"],
+            )
+
+    def relatorio(self):
+        with self._lock:
+            top = [r for _, _, r in sorted(self._top, reverse=True)]
+            lentas = list(reversed(self._lentas))
+            consultas = {}
+            for nome, a in self._por_consulta.items():
+                dados = dict(a)
+                dados["media_ms"] = round(
+                    (a["execute_total_ms"] + a["fetch_total_ms"]) / a["chamadas"], 2
+                )
+                dados["execute_total_ms"] = round(a["execute_total_ms"], 2)
+                dados["fetch_total_ms"] = round(a["fetch_total_ms"], 2)
+                consultas[nome] = dados
+            return {
+                "limite_lento_ms": round(self.limite_lento * 1000),
+                "desde": self._desde,
+                "consultas": consultas,
+                "mais_demoradas": top,
+                "lentas_recentes": lentas,
+            }
+
+    def limpar(self):
+        with self._lock:
+            self._top.clear()
+            self._lentas.clear()
+            self._por_consulta.clear()
+            self._desde = time.time()
+
+
+_perfil = None
+_perfil_lock = threading.Lock()
+
+
+def get_perfil():
+    global _perfil
+    if _perfil is None:
+        with _perfil_lock:
+            if _perfil is None:
+                # Import tardio: row_fetcher (e o benchmark) não dependem do .env
+                from config import Config
+
+                _perfil = PerfilConsultas(
+                    limite_lento_ms=Config.DB_SLOW_QUERY_MS,
+                    top_n=Config.DB_PROFILER_TOP_N,
+                )
+    return _perfil
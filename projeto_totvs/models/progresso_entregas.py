@@ -0,0 +1,258 @@
+# models/progresso_entregas.py
+# Acompanhamento das entregas (CP_XQUPR) por projeto/revisão para o SSE:
+# uma única consulta por intervalo atende todos os navegadores inscritos
+
+import logging
+import queue
+import threading
+import time
+
+import json_provider
+
+logger = logging.getLogger("ProgressoEntregas")
+
+CAMPOS_TOTAIS = ("AFA_QUANT", "CP_QUANT", "CP_XQUPR")
+
+
+class LimiteAssinaturasError(Exception):
+    """Número máximo de navegadores acompanhando atingido"""
+
+
+def formatar_sse(evento, dados):
+    """Mensagem no formato text/event-stream"""
+    corpo = json_provider.dumps(dados)
+    return f"event: {evento}\ndata: {corpo}\n\n"
+
+
+def _foto(arvore):
+    """Totais atuais: célula -> linha e (célula, produto) -> linha"""
+    celulas = {}
+    produtos = {}
+    for celula in arvore.celulas():
+        chave = str(celula["AFC_XPROD"]).strip()
+        celulas[chave] = celula
+        for produto in arvore.produtos(chave):
+            produtos[(chave, str(produto["AFA_PRODUT"]).strip())] = produto
+    return celulas, produtos
+
+
+def _mudou(antes, depois):
+    return any(antes[c] != depois[c] for c in CAMPOS_TOTAIS)
+
+
+class Assinatura:
+    """Fila de eventos de um navegador inscrito em (projeto, revisão)"""
+
+    def __init__(self, chave, tamanho_fila):
+        self.chave = chave
+        self._fila = queue.Queue(maxsize=tamanho_fila)
+
+    def publicar(self, evento, dados):
+        """False se o navegador não está consumindo (fila cheia)"""
+        try:
+            self._fila.put_nowait((evento, dados))
+            return True
+        except queue.Full:
+            return False
+
+    def descartar_pendentes(self):
+        while True:
+            try:
+                self._fila.get_nowait()
+            except queue.Empty:
+                return
+
+    def proximo(self, timeout):
+        """(evento, dados) ou None se nada chegou no intervalo"""
+        try:
+            return self._fila.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class AcompanhamentoEntregas:
+    """
+    - carregar(projeto, revisao) -> ArvoreProjeto atual (ou None em erro)
+    - intervalo: segundos entre consultas de cada (projeto, revisão) assistido
+    - max_assinaturas: conexões SSE simultâneas (cada uma prende uma thread)
+    - verificar_externos: chamada a cada segundo; pode chamar antecipar()
+      (ex.: ordens enviadas por outro worker do gunicorn)
+
+    Cada ciclo compara com a foto anterior e publica só as células e
+    produtos cujos totais mudaram. Célula/produto novo ou removido publica
+    "recarregar" (o navegador busca a árvore de novo).
+    """
+
+    def __init__(
+        self,
+        carregar,
+        intervalo=10,
+        max_assinaturas=200,
+        tamanho_fila=50,
+        verificar_externos=None,
+    ):
+        self.carregar = carregar
+        self.verificar_externos = verificar_externos
+        self.intervalo = intervalo
+        self.max_assinaturas = max_assinaturas
+        self.tamanho_fila = tamanho_fila
+
+        self._lock = threading.Lock()
+        self._assinaturas = {}  # (projeto, revisão) -> set(Assinatura)
+        self._fotos = {}  # (projeto, revisão) -> (células, produtos)
+        self._acordar = threading.Event()
+        self._antecipados = set()
+        self._thread = None
+
+        self._ciclos = 0
+        self._consultas = 0
+        self._falhas = 0
+        self._eventos = 0
+        self._atrasadas = 0
+
+    # ---------- ASSINATURAS ----------
+
+    def assinar(self, projeto, revisao):
+        chave = (str(projeto).strip(), str(revisao).strip())
+        with self._lock:
+            total = sum(len(a) for a in self._assinaturas.values())
+            if total >= self.max_assinaturas:
+                raise LimiteAssinaturasError(
+                    f"Máximo de {self.max_assinaturas} acompanhamentos simultâneos"
+                )
+            assinatura = Assinatura(chave, self.tamanho_fila)
+            self._assinaturas.setdefault(chave, set()).add(assinatura)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._executar, name="progresso-entregas", daemon=True
+                )
+                self._thread.start()
+        return assinatura
+
+    def cancelar(self, assinatura):
+        with self._lock:
+            assinaturas = self._assinaturas.get(assinatura.chave)
+            if assinaturas is None:
+                return
+            assinaturas.discard(assinatura)
+            if not assinaturas:
+                # Ninguém mais assiste: para de consultar e esquece a foto
+                del self._assinaturas[assinatura.chave]
+                self._fotos.pop(assinatura.chave, None)
+
+    def antecipar(self, projeto):
+        """Consulta o projeto já no próximo instante (ex.: ordem enviada)"""
+        projeto = str(projeto).strip()
+        with self._lock:
+            if not any(c[0] == projeto for c in self._assinaturas):
+                return
+            self._antecipados.add(projeto)
+        self._acordar.set()
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                "assinaturas": sum(len(a) for a in self._assinaturas.values()),
+                "projetos_assistidos": len(self._assinaturas),
+                "max_assinaturas": self.max_assinaturas,
+                "intervalo_s": self.intervalo,
+                "ciclos": self._ciclos,
+                "consultas": self._consultas,
+                "falhas": self._falhas,
+                "eventos": self._eventos,
+                "atrasadas": self._atrasadas,
+            }
+
+    # ---------- CICLO ----------
+
+    def _executar(self):
+        proximo = {}  # chave -> time.monotonic() da próxima consulta
+        while True:
+            if self.verificar_externos is not None:
+                try:
+                    self.verificar_externos()
+                except Exception as e:
+                    logger.warning(f"Falha ao verificar alterações externas: {e}")
+            agora = time.monotonic()
+            with self._lock:
+                chaves = list(self._assinaturas)
+                antecipados, self._antecipados = self._antecipados, set()
+            for chave in chaves:
+                if chave[0] in antecipados or proximo.get(chave, 0) <= agora:
+                    self._verificar(chave)
+                    proximo[chave] = time.monotonic() + self.intervalo
+            for chave in set(proximo) - set(chaves):
+                del proximo[chave]
+
+            with self._lock:
+                self._ciclos += 1
+            espera = min(proximo.values(), default=agora + self.intervalo)
+            if self.verificar_externos is not None:
+                espera = min(espera, time.monotonic() + 1)
+            self._acordar.wait(max(0.1, espera - time.monotonic()))
+            self._acordar.clear()
+
+    def _verificar(self, chave):
+        try:
+            arvore = self.carregar(*chave)
+        except Exception:
+            arvore = None
+            logger.exception("Erro ao consultar entregas de %s rev %s", *chave)
+        with self._lock:
+            self._consultas += 1
+            if arvore is None:
+                self._falhas += 1
+                return
+            if chave not in self._assinaturas:
+                return  # último navegador saiu durante a consulta
+            anterior = self._fotos.get(chave)
+            atual = self._fotos[chave] = _foto(arvore)
+            if anterior is None:
+                return  # primeira foto: o navegador acabou de ler a árvore
+
+            evento = self._diferenca(chave, arvore, anterior, atual)
+            if evento is None:
+                return
+            for assinatura in self._assinaturas[chave]:
+                if not assinatura.publicar(*evento):
+                    # Não acompanhou os eventos: troca o histórico por um recarregar
+                    self._atrasadas += 1
+                    assinatura.descartar_pendentes()
+                    assinatura.publicar("recarregar", {"projeto": chave[0]})
+                self._eventos += 1
+
+    @staticmethod
+    def _diferenca(chave, arvore, anterior, atual):
+        """(evento, dados) com o que mudou, ou None"""
+        celulas_antes, produtos_antes = anterior
+        celulas, produtos = atual
+        if celulas.keys() != celulas_antes.keys() or (
+            produtos.keys() != produtos_antes.keys()
+        ):
+            return "recarregar", {"projeto": chave[0], "revisao": chave[1]}
+
+        celulas_mudaram = [c for c in celulas if _mudou(celulas_antes[c], celulas[c])]
+        if not celulas_mudaram:
+            return None
+        return "progresso", {
+            "projeto": chave[0],
+            "revisao": chave[1],
+            "estatisticas": arvore.estatisticas(),
+            "celulas": [
+                dict(
+                    {c: celulas[celula][c] for c in CAMPOS_TOTAIS},
+                    AFC_XPROD=celulas[celula]["AFC_XPROD"],
+                    estatisticas=arvore.estatisticas(celula),
+                )
+                for celula in celulas_mudaram
+            ],
+            "produtos": [
+                dict(
+                    {c: produtos[k][c] for c in CAMPOS_TOTAIS},
+                    AFC_XPROD=produtos[k]["AFC_XPROD"],
+                    AFA_PRODUT=produtos[k]["AFA_PRODUT"],
+                )
+                for k in produtos
+                if k[0] in celulas_mudaram and _mudou(produtos_antes[k], produtos[k])
+            ],
+        }
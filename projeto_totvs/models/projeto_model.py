@@ -1,27 +1,131 @@
 # models/projeto_model.py
 # Model - SEM ORDER BY nas queries
 
-import pyodbc
-import pandas as pd
+import logging
+import threading
 from config import Config
+from models.connection_pool import ConnectionPool
+from models.row_fetcher import buscar_linhas, iterar_linhas, MedicaoConsulta
+from models.arvore_projeto import ArvoreProjeto
+from models.replica_local import get_replica
+
+logger = logging.getLogger("ProjetoModel")
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Pool compartilhado por todos os ProjetoModel do processo"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # Import aqui: o benchmark troca o pool sem precisar do driver ODBC
+                import pyodbc
+
+                conn_string = Config.get_connection_string()
+                _pool = ConnectionPool(
+                    lambda: pyodbc.connect(
+                        conn_string, timeout=Config.DB_CONNECT_TIMEOUT
+                    ),
+                    tamanho_min=Config.DB_POOL_MIN,
+                    tamanho_max=Config.DB_POOL_MAX,
+                    tempo_vida_max=Config.DB_POOL_MAX_LIFETIME,
+                    timeout_espera=Config.DB_POOL_TIMEOUT,
+                    verificar_apos=Config.DB_POOL_HEALTHCHECK_IDLE,
+                )
+    return _pool
 
 
 class ProjetoModel:
-    def __init__(self):
-        self.conn_string = Config.get_connection_string()
-        self.conn = None
+    # Usada por get_produtos e pelo modo streaming (iterar_produtos)
+    QUERY_PRODUTOS = """
+                SELECT AF8_PROJET, \
+                       AFC_XPROD, \
+                       AFA_PRODUT, \
+                       AFA_XDESCR,
+                       SUM(AFA_QUANT)             AS AFA_QUANT,
+                       SUM(COALESCE(CP_QUANT, 0)) AS CP_QUANT,
+                       SUM(COALESCE(CP_XQUPR, 0)) AS CP_XQUPR
+                FROM AF8010 AF8
+                         JOIN AFC010 AFC ON AFC.D_E_L_E_T_ = ' '
+                    AND AFC_FILIAL = '01'
+                    AND AFC_PROJET = AF8_PROJET
+                    AND AFC_REVISA = AF8_REVISA
+                    AND AFC_XPROD <> ' '
+                    AND AFC_XPRODU = ' '
+                         JOIN AF9010 AF9 ON AF9.D_E_L_E_T_ = ' '
+                    AND AF9_FILIAL = '01'
+                    AND AF9_PROJET = AFC_PROJET
+                    AND AF9_REVISA = AFC_REVISA
+                    AND AF9_EDTPAI = AFC_EDT
+                         JOIN AFA010 AFA ON AFA.D_E_L_E_T_ = ' '
+                    AND AFA_FILIAL = '01'
+                    AND AFA_PROJET = AF9_PROJET
+                    AND AFA_REVISA = AF9_REVISA
+                    AND AFA_TAREFA = AF9_TAREFA
+                    AND AFA_ITEM >= ' '
+                    AND AFA_PRODUT >= ' '
+                    AND AFA_XESTRU = 'S'
+                         LEFT JOIN SCP010 SCP ON SCP.D_E_L_E_T_ = ' '
+                    AND CP_FILIAL = '01'
+                    AND CP_NUM >= ' '
+                    AND CP_ITEM >= ' '
+                    AND CP_XPROJET = AFA_PROJET
+                    AND CP_XPROD = AFC_XPROD
+                    AND CP_XTAREFA = AFA_TAREFA
+                    AND CP_XITTARE = AFA_ITEM
+                    AND CP_PRODUTO = AFA_PRODUT
+                    AND CP_PREREQU = 'S'
+                WHERE AF8.D_E_L_E_T_ = ' '
+                  AND AF8_FILIAL = '01'
+                  AND AF8_PROJET = ?
+                  AND AF8_REVISA = ?
+                  AND AFC_XPROD = ?
+                  AND AF8_XCC = ' '
+                GROUP BY AF8_PROJET, AFC_XPROD, AFA_PRODUT, AFA_XDESCR \
+                """
+
+    def __init__(self, pool=None, replica=None):
+        self.pool = pool or get_pool()
+        # Réplica local (opcional): atende as leituras enquanto estiver em dia
+        self.replica = replica if replica is not None else get_replica(self.pool)
+        self.tamanho_lote = Config.DB_FETCH_BATCH
+        # Cada thread (requisição) usa a sua própria conexão emprestada
+        self._local = threading.local()
 
-    def conectar(self):
+    @property
+    def conn(self):
+        return getattr(self._local, "conn", None)
+
+    @property
+    def _replica_ativa(self):
+        """Réplica escolhida no conectar() desta thread (None = SQL Server)"""
+        return getattr(self._local, "replica", None)
+
+    def conectar(self, projeto=None):
+        """
+        Com a réplica em dia (e o projeto sem alteração pendente) as leituras
+        vão para ela e nenhuma conexão do SQL Server é emprestada.
+        """
+        if self.replica is not None and self.replica.atualizada(projeto):
+            self._local.replica = self.replica
+            return True
+        self._local.replica = None
         try:
-            self.conn = pyodbc.connect(self.conn_string)
+            self._local.conn = self.pool.obter()
             return True
         except Exception as e:
-            print(f"Erro ao conectar: {e}")
+            logger.error(f"Erro ao conectar: {e}")
             return False
 
     def desconectar(self):
-        if self.conn:
-            self.conn.close()
+        self._local.replica = None
+        conn = self.conn
+        if conn:
+            self._local.conn = None
+            self.pool.devolver(conn)
 
     def get_projetos(self):
         """Lista projetos SEM ORDER BY"""
@@ -40,10 +144,14 @@ class ProjetoModel:
                   AND AF8_REVISA >= ' '
                   AND AF8_XCC = ' ' \
                 """
+        if self._replica_ativa is not None:
+            return self._replica_ativa.projetos()
         try:
-            df = pd.read_sql(query, self.conn)
-            return df.to_dict("records")
-        except:
+            return buscar_linhas(
+                self.conn, query, tamanho_lote=self.tamanho_lote, nome="get_projetos"
+            )
+        except Exception:
+            logger.exception("Erro em get_projetos")
             return []
 
     def get_celulas(self, projeto, revisao):
@@ -92,16 +200,70 @@ class ProjetoModel:
                   AND AF8_XCC = ' '
                 GROUP BY AF8_PROJET, AF8_REVISA, AFC_XPROD \
                 """
+        if self._replica_ativa is not None:
+            return self._replica_ativa.celulas(projeto, revisao)
         try:
-            df = pd.read_sql(query, self.conn, params=[projeto, revisao])
-            return df.to_dict("records")
-        except:
+            return buscar_linhas(
+                self.conn,
+                query,
+                [projeto, revisao],
+                tamanho_lote=self.tamanho_lote,
+                nome="get_celulas",
+            )
+        except Exception:
+            logger.exception("Erro em get_celulas (%s rev %s)", projeto, revisao)
             return []
 
     def get_produtos(self, projeto, revisao, celula):
         """Lista produtos SEM ORDER BY"""
+        if self._replica_ativa is not None:
+            return self._replica_ativa.produtos(projeto, revisao, celula)
+        query = self.QUERY_PRODUTOS
+        try:
+            return buscar_linhas(
+                self.conn,
+                query,
+                [projeto, revisao, celula],
+                tamanho_lote=self.tamanho_lote,
+                nome="get_produtos",
+            )
+        except Exception:
+            logger.exception(
+                "Erro em get_produtos (%s rev %s, célula %s)", projeto, revisao, celula
+            )
+            return []
+
+    def iterar_produtos(self, projeto, revisao, celula):
+        """
+        Gera os produtos direto do cursor (modo streaming).
+        A conexão fica emprestada até o gerador terminar ou ser fechado.
+        """
+        if self.replica is not None and self.replica.atualizada(projeto):
+            yield from self.replica.produtos(projeto, revisao, celula)
+            return
+        medicao = MedicaoConsulta("iterar_produtos")
+        with self.pool.conexao() as conn:
+            cursor = conn.cursor()
+            try:
+                medicao.executar(
+                    cursor, self.QUERY_PRODUTOS, [projeto, revisao, celula]
+                )
+                yield from iterar_linhas(cursor, self.tamanho_lote, medicao)
+            except Exception:
+                medicao.erro = True
+                raise
+            finally:
+                cursor.close()
+                medicao.registrar()
+
+    def get_arvore(self, projeto, revisao):
+        """
+        Agregação por produto de TODAS as células do projeto (uma consulta).
+        Células e estatísticas são somadas em memória pela ArvoreProjeto.
+        """
         query = """
                 SELECT AF8_PROJET, \
+                       AF8_REVISA, \
                        AFC_XPROD, \
                        AFA_PRODUT, \
                        AFA_XDESCR,
@@ -142,12 +304,22 @@ class ProjetoModel:
                   AND AF8_FILIAL = '01'
                   AND AF8_PROJET = ?
                   AND AF8_REVISA = ?
-                  AND AFC_XPROD = ?
                   AND AF8_XCC = ' '
-                GROUP BY AF8_PROJET, AFC_XPROD, AFA_PRODUT, AFA_XDESCR \
+                GROUP BY AF8_PROJET, AF8_REVISA, AFC_XPROD, AFA_PRODUT, AFA_XDESCR \
                 """
+        if self._replica_ativa is not None:
+            return ArvoreProjeto(
+                projeto, revisao, self._replica_ativa.arvore(projeto, revisao)
+            )
         try:
-            df = pd.read_sql(query, self.conn, params=[projeto, revisao, celula])
-            return df.to_dict("records")
-        except:
-            return []
+            linhas = buscar_linhas(
+                self.conn,
+                query,
+                [projeto, revisao],
+                tamanho_lote=self.tamanho_lote,
+                nome="get_arvore",
+            )
+        except Exception:
+            logger.exception("Erro em get_arvore (%s rev %s)", projeto, revisao)
+            linhas = []
+        return ArvoreProjeto(projeto, revisao, linhas)
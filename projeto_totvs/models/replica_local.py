@@ -0,0 +1,536 @@
+# models/replica_local.py
+# Réplica local (SQLite) dos agregados de projeto/célula/produto, atualizada
+# em segundo plano para tirar as leituras do SQL Server do Protheus
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from config import Config
+from models.row_fetcher import iterar_linhas
+
+try:
+    import fcntl
+except ImportError:  # Windows: um processo só (waitress), sempre líder
+    fcntl = None
+
+logger = logging.getLogger("ReplicaLocal")
+
+# Mesma agregação do ProjetoModel.get_arvore, sem o filtro de revisão
+QUERY_AGREGADO = """
+                SELECT AF8_PROJET, \
+                       AF8_REVISA, \
+                       AFC_XPROD, \
+                       AFA_PRODUT, \
+                       AFA_XDESCR,
+                       SUM(AFA_QUANT)             AS AFA_QUANT,
+                       SUM(COALESCE(CP_QUANT, 0)) AS CP_QUANT,
+                       SUM(COALESCE(CP_XQUPR, 0)) AS CP_XQUPR
+                FROM AF8010 AF8
+                         JOIN AFC010 AFC ON AFC.D_E_L_E_T_ = ' '
+                    AND AFC_FILIAL = '01'
+                    AND AFC_PROJET = AF8_PROJET
+                    AND AFC_REVISA = AF8_REVISA
+                    AND AFC_XPROD <> ' '
+                    AND AFC_XPRODU = ' '
+                         JOIN AF9010 AF9 ON AF9.D_E_L_E_T_ = ' '
+                    AND AF9_FILIAL = '01'
+                    AND AF9_PROJET = AFC_PROJET
+                    AND AF9_REVISA = AFC_REVISA
+                    AND AF9_EDTPAI = AFC_EDT
+                         JOIN AFA010 AFA ON AFA.D_E_L_E_T_ = ' '
+                    AND AFA_FILIAL = '01'
+                    AND AFA_PROJET = AF9_PROJET
+                    AND AFA_REVISA = AF9_REVISA
+                    AND AFA_TAREFA = AF9_TAREFA
+                    AND AFA_ITEM >= ' '
+                    AND AFA_PRODUT >= ' '
+                    AND AFA_XESTRU = 'S'
+                         LEFT JOIN SCP010 SCP ON SCP.D_E_L_E_T_ = ' '
+                    AND CP_FILIAL = '01'
+                    AND CP_NUM >= ' '
+                    AND CP_ITEM >= ' '
+                    AND CP_XPROJET = AFA_PROJET
+                    AND CP_XPROD = AFC_XPROD
+                    AND CP_XTAREFA = AFA_TAREFA
+                    AND CP_XITTARE = AFA_ITEM
+                    AND CP_PRODUTO = AFA_PRODUT
+                    AND CP_PREREQU = 'S'
+                WHERE AF8.D_E_L_E_T_ = ' '
+                  AND AF8_FILIAL = '01'
+                  AND AF8_XCC = ' '
+                  {filtro}
+                GROUP BY AF8_PROJET, AF8_REVISA, AFC_XPROD, AFA_PRODUT, AFA_XDESCR \
+                """
+
+# Mesma consulta do ProjetoModel.get_projetos
+QUERY_PROJETOS = """
+                SELECT DISTINCT AF8_PROJET, AF8_REVISA, AF8_XNOMCL
+                FROM AF8010 AF8
+                         JOIN AFC010 AFC ON AFC.D_E_L_E_T_ = ' '
+                    AND AFC_FILIAL = '01'
+                    AND AFC_PROJET = AF8_PROJET
+                    AND AFC_REVISA = AF8_REVISA
+                    AND AFC_XPROD <> ' '
+                    AND AFC_XPRODU = ' '
+                WHERE AF8.D_E_L_E_T_ = ' '
+                  AND AF8_FILIAL = '01'
+                  AND AF8_PROJET >= ' '
+                  AND AF8_REVISA >= ' '
+                  AND AF8_XCC = ' ' \
+                """
+
+# Tabelas vigiadas: (tabela, coluna do projeto, coluna da filial)
+TABELAS_VIGIADAS = (
+    ("AF8010", "AF8_PROJET", "AF8_FILIAL"),
+    ("AFC010", "AFC_PROJET", "AFC_FILIAL"),
+    ("AFA010", "AFA_PROJET", "AFA_FILIAL"),
+    ("SCP010", "CP_XPROJET", "CP_FILIAL"),
+)
+
+COLUNAS_AGREGADO = (
+    "AF8_PROJET",
+    "AF8_REVISA",
+    "AFC_XPROD",
+    "AFA_PRODUT",
+    "AFA_XDESCR",
+    "AFA_QUANT",
+    "CP_QUANT",
+    "CP_XQUPR",
+)
+
+
+def _marca_para_texto(valor):
+    """High-water mark gravável no SQLite (int ou datetime do S_T_A_M_P_)"""
+    if hasattr(valor, "isoformat"):
+        return valor.isoformat(sep=" ", timespec="milliseconds")
+    return valor
+
+
+class ReplicaLocal:
+    """
+    - pool: ConnectionPool do SQL Server (origem)
+    - coluna_marca: coluna crescente usada para achar linhas novas/alteradas
+      (R_E_C_N_O_ pega inclusões; S_T_A_M_P_ pega também alterações)
+    - intervalo: segundos entre as sincronizações incrementais
+    - defasagem_max: idade máxima (s) para a réplica atender leituras; acima
+      disso (ou com o projeto marcado como sujo) o model lê do SQL Server
+    - resync_completo: segundos entre recargas completas (pega exclusões e
+      alterações que a coluna de marca não mostra)
+
+    Com vários processos (workers do gunicorn) o arquivo é compartilhado: só
+    o que segura o lock <caminho_db>.lider sincroniza; a hora da última sync
+    e os projetos sujos ficam no próprio SQLite, visíveis a todos.
+    """
+
+    def __init__(
+        self,
+        pool,
+        caminho_db,
+        coluna_marca="R_E_C_N_O_",
+        intervalo=30,
+        defasagem_max=120,
+        resync_completo=3600,
+        tamanho_lote=500,
+    ):
+        self.pool = pool
+        self.caminho_db = caminho_db
+        self.coluna_marca = coluna_marca
+        self.intervalo = intervalo
+        self.defasagem_max = defasagem_max
+        self.resync_completo = resync_completo
+        self.tamanho_lote = tamanho_lote
+
+        self._lock = threading.Lock()
+        self._local = threading.local()  # conexão de leitura por thread
+        self._ultima_sync = 0.0  # cópia local do estado compartilhado
+        self._lida_em = 0.0  # time.monotonic() da última leitura do estado
+        self._lider = None  # arquivo com o lock de líder (None = não é)
+        self._parar = threading.Event()
+        self._thread = None
+
+        self._sincronizacoes = 0
+        self._falhas = 0
+        self._projetos_atualizados = 0
+        self._ultima_duracao = 0.0
+        self._ultimo_erro = None
+
+        self._criar_tabelas()
+
+    # ---------- LEITURAS (usadas pelo ProjetoModel) ----------
+
+    def atualizada(self, projeto=None):
+        """True se pode atender leituras (do projeto, quando informado)"""
+        if time.time() - self._ultima_sync_compartilhada() > self.defasagem_max:
+            return False
+        if projeto is not None:
+            return not self._ler(
+                "SELECT 1 FROM sujos WHERE projeto = ?", (str(projeto).strip(),)
+            )
+        return True
+
+    def projetos(self):
+        return self._ler(
+            "SELECT AF8_PROJET, AF8_REVISA, AF8_XNOMCL FROM projetos ORDER BY chave_projeto"
+        )
+
+    def celulas(self, projeto, revisao):
+        return self._ler(
+            "SELECT AF8_PROJET, AF8_REVISA, AFC_XPROD, SUM(AFA_QUANT) AS AFA_QUANT, "
+            "SUM(CP_QUANT) AS CP_QUANT, SUM(CP_XQUPR) AS CP_XQUPR FROM agregados "
+            "WHERE chave_projeto = ? AND chave_revisao = ? "
+            "GROUP BY AF8_PROJET, AF8_REVISA, AFC_XPROD",
+            (str(projeto).strip(), str(revisao).strip()),
+        )
+
+    def produtos(self, projeto, revisao, celula):
+        return self._ler(
+            "SELECT AF8_PROJET, AFC_XPROD, AFA_PRODUT, AFA_XDESCR, AFA_QUANT, "
+            "CP_QUANT, CP_XQUPR FROM agregados "
+            "WHERE chave_projeto = ? AND chave_revisao = ? AND chave_celula = ?",
+            (str(projeto).strip(), str(revisao).strip(), str(celula).strip()),
+        )
+
+    def arvore(self, projeto, revisao):
+        """Linhas no formato do ProjetoModel.get_arvore"""
+        return self._ler(
+            f"SELECT {', '.join(COLUNAS_AGREGADO)} FROM agregados "
+            "WHERE chave_projeto = ? AND chave_revisao = ?",
+            (str(projeto).strip(), str(revisao).strip()),
+        )
+
+    def marcar_sujo(self, projeto):
+        """Projeto alterado pelo próprio app: lê do SQL Server até o próximo ciclo"""
+        with self._transacao() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sujos (projeto, desde) VALUES (?, ?)",
+                (str(projeto).strip(), time.time()),
+            )
+
+    # ---------- CICLO DE SINCRONIZAÇÃO ----------
+
+    def iniciar(self):
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._executar, name="replica-local", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def parar(self):
+        self._parar.set()
+        lider, self._lider = self._lider, None
+        if hasattr(lider, "close"):
+            lider.close()  # fechar o arquivo solta o lock
+
+    def sincronizar(self):
+        """Um ciclo: completo se vencido (ou primeira vez), senão incremental"""
+        inicio = time.time()
+        try:
+            ultimo_completo = self._estado("ultimo_completo")
+            if inicio - ultimo_completo >= self.resync_completo or not self._marcas():
+                self._sincronizar_completo(inicio)
+            else:
+                self._sincronizar_incremental()
+        except Exception as e:
+            with self._lock:
+                self._falhas += 1
+                self._ultimo_erro = f"{type(e).__name__}: {e}"[:200]
+            logger.exception("Falha ao sincronizar a réplica local")
+            return False
+
+        with self._transacao() as conn:
+            self._gravar_estado(conn, "ultima_sync", inicio)
+        with self._lock:
+            self._ultima_sync = inicio
+            self._lida_em = time.monotonic()
+            self._sincronizacoes += 1
+            self._ultima_duracao = time.time() - inicio
+        return True
+
+    def estatisticas(self):
+        ultima_sync = self._ultima_sync_compartilhada()
+        sujos = self._ler("SELECT COUNT(*) AS n FROM sujos")[0]["n"]
+        with self._lock:
+            defasagem = time.time() - ultima_sync if ultima_sync else None
+            dados = {
+                "atualizada": self.atualizada(),
+                "lider": self._lider is not None,
+                "defasagem_s": round(defasagem, 1) if defasagem is not None else None,
+                "defasagem_max_s": self.defasagem_max,
+                "coluna_marca": self.coluna_marca,
+                "sincronizacoes": self._sincronizacoes,
+                "falhas": self._falhas,
+                "projetos_atualizados": self._projetos_atualizados,
+                "ultima_duracao_ms": round(self._ultima_duracao * 1000, 1),
+                "projetos_sujos": sujos,
+                "ultimo_erro": self._ultimo_erro,
+            }
+        dados["linhas"] = self._ler("SELECT COUNT(*) AS n FROM agregados")[0]["n"]
+        return dados
+
+    # ---------- INTERNOS ----------
+
+    def _executar(self):
+        # Quem não é líder continua tentando: assume se o líder sair
+        # (worker reciclado ou derrubado)
+        while not self._parar.is_set():
+            if self._lider is not None or self._assumir_lideranca():
+                self.sincronizar()
+            self._parar.wait(self.intervalo)
+
+    def _assumir_lideranca(self):
+        if fcntl is None:
+            self._lider = True
+            return True
+        arquivo = open(self.caminho_db + ".lider", "a")
+        try:
+            fcntl.flock(arquivo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            arquivo.close()
+            return False
+        self._lider = arquivo
+        logger.info("Réplica local: processo %d assumiu a sincronização", os.getpid())
+        return True
+
+    def _ultima_sync_compartilhada(self):
+        """Hora da última sync (de qualquer processo), relida a cada 1s no máximo"""
+        if time.monotonic() - self._lida_em >= 1:
+            valor = self._estado("ultima_sync")
+            with self._lock:
+                self._ultima_sync = valor
+                self._lida_em = time.monotonic()
+        return self._ultima_sync
+
+    def _estado(self, chave):
+        linhas = self._ler("SELECT valor FROM estado WHERE chave = ?", (chave,))
+        return linhas[0]["valor"] if linhas else 0.0
+
+    @staticmethod
+    def _gravar_estado(conn, chave, valor):
+        conn.execute(
+            "INSERT OR REPLACE INTO estado (chave, valor) VALUES (?, ?)", (chave, valor)
+        )
+
+    def _conectar(self):
+        conn = sqlite3.connect(self.caminho_db, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @contextmanager
+    def _transacao(self):
+        """Conexão de escrita: commit no fim, rollback em erro, sempre fechada"""
+        conn = self._conectar()
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _ler(self, sql, params=()):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._conectar()
+        return [dict(linha) for linha in conn.execute(sql, params).fetchall()]
+
+    def _criar_tabelas(self):
+        with self._transacao() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS agregados (
+                    chave_projeto TEXT, chave_revisao TEXT, chave_celula TEXT,
+                    AF8_PROJET TEXT, AF8_REVISA TEXT, AFC_XPROD TEXT,
+                    AFA_PRODUT TEXT, AFA_XDESCR TEXT,
+                    AFA_QUANT REAL, CP_QUANT REAL, CP_XQUPR REAL
+                );
+                CREATE INDEX IF NOT EXISTS ix_agregados
+                    ON agregados (chave_projeto, chave_revisao, chave_celula);
+                CREATE TABLE IF NOT EXISTS projetos (
+                    chave_projeto TEXT, AF8_PROJET TEXT, AF8_REVISA TEXT,
+                    AF8_XNOMCL TEXT
+                );
+                CREATE TABLE IF NOT EXISTS marcas (
+                    tabela TEXT PRIMARY KEY, coluna TEXT, valor
+                );
+                CREATE TABLE IF NOT EXISTS sujos (
+                    projeto TEXT PRIMARY KEY, desde REAL
+                );
+                CREATE TABLE IF NOT EXISTS estado (
+                    chave TEXT PRIMARY KEY, valor REAL
+                );
+                """
+            )
+
+    def _marcas(self):
+        with self._transacao() as conn:
+            linhas = conn.execute(
+                "SELECT tabela, valor FROM marcas WHERE coluna = ?",
+                (self.coluna_marca,),
+            ).fetchall()
+        return {t: v for t, v in linhas}
+
+    def _gravar_marcas(self, conn, marcas):
+        conn.executemany(
+            "INSERT OR REPLACE INTO marcas (tabela, coluna, valor) VALUES (?, ?, ?)",
+            [
+                (tabela, self.coluna_marca, _marca_para_texto(valor))
+                for tabela, valor in marcas.items()
+                if valor is not None
+            ],
+        )
+
+    def _linhas_origem(self, origem, query, params=()):
+        cursor = origem.cursor()
+        try:
+            if params:
+                cursor.execute(query, params)
+            else:
+                cursor.execute(query)
+            yield from iterar_linhas(cursor, self.tamanho_lote)
+        finally:
+            cursor.close()
+
+    def _marcas_atuais(self, origem):
+        marcas = {}
+        for tabela, _, filial in TABELAS_VIGIADAS:
+            linhas = list(
+                self._linhas_origem(
+                    origem,
+                    f"SELECT MAX({self.coluna_marca}) AS MARCA FROM {tabela} "
+                    f"WHERE {filial} = '01'",
+                )
+            )
+            marcas[tabela] = linhas[0]["MARCA"] if linhas else None
+        return marcas
+
+    def _inserir_agregados(self, destino, linhas):
+        destino.executemany(
+            "INSERT INTO agregados VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                (
+                    str(l["AF8_PROJET"]).strip(),
+                    str(l["AF8_REVISA"]).strip(),
+                    str(l["AFC_XPROD"]).strip(),
+                    *(l[c] for c in COLUNAS_AGREGADO),
+                )
+                for l in linhas
+            ),
+        )
+
+    def _recarregar_projetos(self, origem, destino):
+        destino.execute("DELETE FROM projetos")
+        destino.executemany(
+            "INSERT INTO projetos VALUES (?, ?, ?, ?)",
+            (
+                (
+                    str(l["AF8_PROJET"]).strip(),
+                    l["AF8_PROJET"],
+                    l["AF8_REVISA"],
+                    l["AF8_XNOMCL"],
+                )
+                for l in self._linhas_origem(origem, QUERY_PROJETOS)
+            ),
+        )
+
+    def _sincronizar_completo(self, inicio):
+        comeco = time.perf_counter()
+        with self.pool.conexao() as origem:
+            # Marcas lidas ANTES da cópia: o que mudar durante ela vem no próximo ciclo
+            marcas = self._marcas_atuais(origem)
+            with self._transacao() as destino:
+                destino.execute("DELETE FROM agregados")
+                self._inserir_agregados(
+                    destino,
+                    self._linhas_origem(origem, QUERY_AGREGADO.format(filtro="")),
+                )
+                self._recarregar_projetos(origem, destino)
+                self._gravar_marcas(destino, marcas)
+                # Marcados durante a cópia continuam sujos
+                destino.execute("DELETE FROM sujos WHERE desde <= ?", (inicio,))
+                self._gravar_estado(destino, "ultimo_completo", inicio)
+        logger.info(
+            "Réplica local recarregada por completo em %.1fs",
+            time.perf_counter() - comeco,
+        )
+
+    def _sincronizar_incremental(self):
+        anteriores = self._marcas()
+        sujos = {
+            l["projeto"]: l["desde"]
+            for l in self._ler("SELECT projeto, desde FROM sujos")
+        }
+
+        with self.pool.conexao() as origem:
+            marcas = self._marcas_atuais(origem)
+            alterados = set(sujos)
+            estrutura_mudou = False
+            for tabela, coluna_projeto, filial in TABELAS_VIGIADAS:
+                anterior = anteriores.get(tabela)
+                if anterior is None or marcas[tabela] is None:
+                    continue
+                if _marca_para_texto(marcas[tabela]) == anterior:
+                    continue
+                for linha in self._linhas_origem(
+                    origem,
+                    f"SELECT DISTINCT {coluna_projeto} AS PROJETO FROM {tabela} "
+                    f"WHERE {filial} = '01' AND {self.coluna_marca} > ?",
+                    [anterior],
+                ):
+                    alterados.add(str(linha["PROJETO"]).strip())
+                if tabela in ("AF8010", "AFC010"):
+                    estrutura_mudou = True
+
+            with self._transacao() as destino:
+                for projeto in sorted(alterados):
+                    linhas = list(
+                        self._linhas_origem(
+                            origem,
+                            QUERY_AGREGADO.format(filtro="AND AF8_PROJET = ?"),
+                            [projeto],
+                        )
+                    )
+                    destino.execute(
+                        "DELETE FROM agregados WHERE chave_projeto = ?", (projeto,)
+                    )
+                    self._inserir_agregados(destino, linhas)
+                if estrutura_mudou:
+                    self._recarregar_projetos(origem, destino)
+                self._gravar_marcas(destino, marcas)
+                # Só os lidos acima: remarcado durante o ciclo continua sujo
+                destino.executemany(
+                    "DELETE FROM sujos WHERE projeto = ? AND desde <= ?",
+                    list(sujos.items()),
+                )
+
+        with self._lock:
+            self._projetos_atualizados += len(alterados)
+        if alterados:
+            logger.info("Réplica local: %d projeto(s) atualizado(s)", len(alterados))
+
+
+_replica = None
+_replica_lock = threading.Lock()
+
+
+def get_replica(pool):
+    """Réplica compartilhada do processo (None se REPLICA_ATIVA=false)"""
+    global _replica
+    if _replica is None:
+        if not Config.REPLICA_ATIVA:
+            return None
+        with _replica_lock:
+            if _replica is None:
+                _replica = ReplicaLocal(
+                    pool,
+                    Config.REPLICA_DB_PATH,
+                    coluna_marca=Config.REPLICA_COLUNA_MARCA,
+                    intervalo=Config.REPLICA_INTERVALO,
+                    defasagem_max=Config.REPLICA_DEFASAGEM_MAX,
+                    resync_completo=Config.REPLICA_RESYNC_COMPLETO,
+                    tamanho_lote=Config.DB_FETCH_BATCH,
+                ).iniciar()
+    return _replica
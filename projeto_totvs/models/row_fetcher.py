@@ -0,0 +1,118 @@
+# models/row_fetcher.py
+# Leitura de linhas direto do cursor (sem montar DataFrame)
+
+import time
+from decimal import Decimal
+
+from models.metricas import registrar_consulta
+from models.perfil_consultas import get_perfil
+
+TAMANHO_LOTE_PADRAO = 500
+
+
+class MedicaoConsulta:
+    """Tempos de uma consulta: execute, fetch (só os fetchmany) e linhas lidas"""
+
+    __slots__ = ("nome", "params", "execute", "fetch", "linhas", "erro")
+
+    def __init__(self, nome):
+        self.nome = nome
+        self.params = None
+        self.execute = 0.0
+        self.fetch = 0.0
+        self.linhas = 0
+        self.erro = False
+
+    def executar(self, cursor, query, params=None):
+        self.params = params
+        inicio = time.perf_counter()
+        try:
+            if params:
+                cursor.execute(query, params)
+            else:
+                cursor.execute(query)
+        finally:
+            self.execute = time.perf_counter() - inicio
+
+    def registrar(self):
+        registrar_consulta(self)
+        get_perfil().registrar(self)
+
+
+def _colunas_decimais(description):
+    """
+    Índices das colunas que podem vir como Decimal (SUM no SQL Server).
+    pyodbc informa o tipo Python em description[i][1]; drivers que não
+    informam (None) são verificados valor a valor.
+    """
+    return [
+        i for i, col in enumerate(description) if col[1] is None or col[1] is Decimal
+    ]
+
+
+def iterar_linhas(cursor, tamanho_lote=TAMANHO_LOTE_PADRAO, medicao=None):
+    """
+    Gera um dict por linha de um cursor já executado, buscando em lotes
+    com fetchmany. Decimal vira float, como fazia o pd.read_sql.
+    Com medicao, acumula o tempo dos fetchmany e a quantidade de linhas.
+    """
+    if cursor.description is None:
+        return
+
+    colunas = [col[0] for col in cursor.description]
+    decimais = _colunas_decimais(cursor.description)
+
+    while True:
+        if medicao is None:
+            lote = cursor.fetchmany(tamanho_lote)
+        else:
+            inicio = time.perf_counter()
+            lote = cursor.fetchmany(tamanho_lote)
+            medicao.fetch += time.perf_counter() - inicio
+            medicao.linhas += len(lote)
+        if not lote:
+            break
+        for linha in lote:
+            if decimais:
+                linha = list(linha)
+                for i in decimais:
+                    if isinstance(linha[i], Decimal):
+                        linha[i] = float(linha[i])
+            yield dict(zip(colunas, linha))
+
+
+def buscar_linhas(
+    conn, query, params=None, tamanho_lote=TAMANHO_LOTE_PADRAO, nome=None
+):
+    """
+    Executa a query e devolve a lista de dicts (substitui read_sql + to_dict).
+    Com nome, os tempos de execute/fetch vão para as métricas da consulta.
+    """
+    cursor = conn.cursor()
+    if nome is None:
+        try:
+            if params:
+                cursor.execute(query, params)
+            else:
+                cursor.execute(query)
+            return list(iterar_linhas(cursor, tamanho_lote))
+        finally:
+            cursor.close()
+
+    medicao = MedicaoConsulta(nome)
+    try:
+        medicao.executar(cursor, query, params)
+        return list(iterar_linhas(cursor, tamanho_lote, medicao))
+    except Exception:
+        medicao.erro = True
+        raise
+    finally:
+        cursor.close()
+        medicao.registrar()
+
+
+def para_dataframe(linhas):
+    """Converte as linhas em DataFrame; pandas só é importado aqui"""
+    import pandas as pd
+
+    return pd.DataFrame.from_records(linhas)
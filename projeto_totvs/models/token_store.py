@@ -0,0 +1,324 @@
+# models/token_store.py
+# Guarda no servidor os tokens do Protheus de cada sessão e renova antes de expirar
+
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+from config import Config
+
+logger = logging.getLogger("TokenStore")
+
+# Tempo máximo que um processo segura a renovação de uma sessão
+RESERVA_RENOVACAO = 60
+
+
+def _abrir(caminho_db):
+    """Conexão com a tabela de sessões criada (se ainda não existe)"""
+    db = sqlite3.connect(caminho_db, timeout=30, check_same_thread=False)
+    db.row_factory = sqlite3.Row
+    with db:
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS sessoes (
+                sid TEXT PRIMARY KEY,
+                usuario TEXT,
+                access_token TEXT,
+                refresh_token TEXT,
+                expira_em REAL NOT NULL,
+                falhou_em REAL,
+                renovando_ate REAL
+            )
+            """
+        )
+    return db
+
+
+class TokenStore:
+    """
+    sid (id da sessão no JWT) -> access/refresh token do Protheus.
+    - renovar(refresh_token) -> dict no formato de AuthModel.renovar_token
+    - margem: segundos antes da expiração em que o token já é renovado
+    - espera_falha: após uma renovação recusada (refresh revogado, Protheus
+      fora) a sessão segue com o token atual e só tenta de novo depois disso
+    - ttl_memoria: segundos que o token lido fica no dict do processo
+    Fica no SQLite (caminho_db): vale para todos os workers do gunicorn e
+    sobrevive à reciclagem. Só um processo renova cada sessão por vez; os
+    outros seguem com o token atual. O SQLite coordena a renovação; no
+    caminho de cada requisição o token vem do dict do processo enquanto está
+    longe de expirar e foi lido há menos de ttl_memoria (o logout ou a
+    renovação feitos em outro worker aparecem depois disso). No processo, as
+    chamadas síncronas e assíncronas da mesma sessão aguardam uma única
+    renovação. Quem não achar a sessão usa o protheus_token gravado no
+    próprio JWT.
+    """
+
+    def __init__(
+        self,
+        renovar,
+        caminho_db,
+        margem=120,
+        ttl_padrao=3600,
+        espera_falha=30,
+        ttl_memoria=30,
+    ):
+        self.renovar = renovar
+        self.margem = margem
+        self.ttl_padrao = ttl_padrao
+        self.espera_falha = espera_falha
+        self.ttl_memoria = ttl_memoria
+
+        self._lock = threading.Lock()
+        self._db = _abrir(caminho_db)
+        # Trava própria (sem I/O dentro): o event loop também a usa
+        self._lock_renovacoes = threading.Lock()
+        self._renovacoes = {}  # sid -> Future da renovação em andamento
+        self._memoria = {}  # sid -> (access_token, expira_em, lido_em)
+
+        self._renovados = 0
+        self._falhas_renovacao = 0
+
+    def registrar(self, sid, usuario, access_token, refresh_token, expires_in=None):
+        agora = time.time()
+        expira_em = agora + (expires_in or self.ttl_padrao)
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO sessoes (sid, usuario, access_token, "
+                "refresh_token, expira_em) VALUES (?, ?, ?, ?, ?)",
+                (
+                    sid,
+                    usuario,
+                    access_token,
+                    refresh_token,
+                    expira_em,
+                ),
+            )
+            self._memoria[sid] = (access_token, expira_em, agora)
+
+    def remover(self, sid):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM sessoes WHERE sid = ?", (sid,))
+            self._memoria.pop(sid, None)
+
+    def token_atual(self, sid):
+        """Access token válido da sessão (renova se estiver perto de expirar)"""
+        if not sid:
+            return None
+        token = self._da_memoria(sid)
+        if token is not None:
+            return token
+        sessao = self._sessao(sid)
+        if sessao is None:
+            return None
+        if self._dispensa_renovacao(sessao):
+            return sessao["access_token"]
+
+        # Uma renovação por sessão; as demais requisições aguardam o resultado
+        futuro, dono = self._iniciar_renovacao(sid)
+        if not dono:
+            futuro.result()
+            return self._token_salvo(sid)
+        try:
+            sessao, token = self._sessao_a_renovar(sid)
+            if sessao is None:
+                return token
+            resultado = self.renovar(sessao["refresh_token"])
+            return self._aplicar_renovacao(sid, sessao, resultado)
+        finally:
+            self._concluir_renovacao(sid, futuro)
+
+    async def token_atual_async(self, sid, renovar_async):
+        """
+        token_atual para o event loop: a renovação (renovar_async, corrotina
+        no formato de AuthModel.renovar_token) espera sem prender thread.
+        Só a leitura da memória roda no loop; o SQLite (e a trava que as
+        threads do Flask seguram ao gravar) vai para uma thread
+        """
+        if not sid:
+            return None
+        token = self._da_memoria(sid)
+        if token is not None:
+            return token
+        sessao = await asyncio.to_thread(self._sessao, sid)
+        if sessao is None:
+            return None
+        if self._dispensa_renovacao(sessao):
+            return sessao["access_token"]
+
+        futuro, dono = self._iniciar_renovacao(sid)
+        if not dono:
+            # shield: cancelar esta espera não cancela o futuro dos outros
+            await asyncio.shield(asyncio.wrap_future(futuro))
+            return await asyncio.to_thread(self._token_salvo, sid)
+        try:
+            sessao, token = await asyncio.to_thread(self._sessao_a_renovar, sid)
+            if sessao is None:
+                return token
+            resultado = await renovar_async(sessao["refresh_token"])
+            return await asyncio.to_thread(
+                self._aplicar_renovacao, sid, sessao, resultado
+            )
+        finally:
+            self._concluir_renovacao(sid, futuro)
+
+    def _iniciar_renovacao(self, sid):
+        """
+        (futuro, dono) da renovação da sessão neste processo: dono=True se
+        esta chamada renova; senão aguarda o futuro de quem já está renovando
+        """
+        with self._lock_renovacoes:
+            futuro = self._renovacoes.get(sid)
+            if futuro is not None:
+                return futuro, False
+            futuro = self._renovacoes[sid] = Future()
+            return futuro, True
+
+    def _concluir_renovacao(self, sid, futuro):
+        with self._lock_renovacoes:
+            self._renovacoes.pop(sid, None)
+        futuro.set_result(None)
+
+    def _sessao_a_renovar(self, sid):
+        """
+        Relê a sessão já com a renovação em mãos: (sessao, None) se ainda
+        precisa renovar, senão (None, token a usar)
+        """
+        sessao = self._sessao(sid)
+        if sessao is None:
+            return None, None
+        if self._dispensa_renovacao(sessao) or not self._reservar(sessao):
+            return None, sessao["access_token"]
+        return sessao, None
+
+    def _token_salvo(self, sid):
+        """Token gravado pela renovação de outra chamada (o anterior, se falhou)"""
+        sessao = self._sessao(sid)
+        return sessao["access_token"] if sessao is not None else None
+
+    def _da_memoria(self, sid):
+        """Token guardado no processo, se lido há pouco e longe da margem"""
+        guardado = self._memoria.get(sid)
+        if guardado is None:
+            return None
+        token, expira_em, lido_em = guardado
+        agora = time.time()
+        if expira_em - agora <= self.margem or agora - lido_em >= self.ttl_memoria:
+            return None
+        return token
+
+    def _sessao(self, sid):
+        with self._lock:
+            linha = self._db.execute(
+                "SELECT * FROM sessoes WHERE sid = ?", (sid,)
+            ).fetchone()
+            if linha is None:
+                self._memoria.pop(sid, None)
+                return None
+            lido_em = time.time()
+            self._memoria[sid] = (linha["access_token"], linha["expira_em"], lido_em)
+        return dict(linha)
+
+    def _dispensa_renovacao(self, sessao):
+        """Token longe de expirar ou renovação recusada há pouco"""
+        agora = time.time()
+        if sessao["expira_em"] - agora > self.margem:
+            return True
+        falhou_em = sessao["falhou_em"]
+        return falhou_em is not None and agora - falhou_em < self.espera_falha
+
+    def _reservar(self, sessao):
+        """
+        Marca a sessão como em renovação por este processo. False se não há
+        refresh token, outro processo já está renovando ou já trocou o token
+        """
+        if not sessao["refresh_token"]:
+            return False
+        agora = time.time()
+        with self._lock, self._db:
+            return bool(
+                self._db.execute(
+                    "UPDATE sessoes SET renovando_ate = ? WHERE sid = ? "
+                    "AND refresh_token = ? "
+                    "AND (renovando_ate IS NULL OR renovando_ate < ?)",
+                    (
+                        agora + RESERVA_RENOVACAO,
+                        sessao["sid"],
+                        sessao["refresh_token"],
+                        agora,
+                    ),
+                ).rowcount
+            )
+
+    def _aplicar_renovacao(self, sid, sessao, resultado):
+        """Grava o token renovado (ou a falha) e retorna o token a usar"""
+        if not resultado.get("success"):
+            logger.warning(
+                f"Falha ao renovar token de {sessao['usuario']}: "
+                f"{resultado.get('error')}"
+            )
+            with self._lock, self._db:
+                self._falhas_renovacao += 1
+                self._db.execute(
+                    "UPDATE sessoes SET falhou_em = ?, renovando_ate = NULL "
+                    "WHERE sid = ?",
+                    (time.time(), sid),
+                )
+            return sessao["access_token"]
+
+        self.registrar(
+            sid,
+            sessao["usuario"],
+            resultado["access_token"],
+            resultado.get("refresh_token") or sessao["refresh_token"],
+            resultado.get("expires_in"),
+        )
+        with self._lock:
+            self._renovados += 1
+        logger.info(f"Token Protheus renovado para {sessao['usuario']}")
+        return resultado["access_token"]
+
+    def limpar_expiradas(self, tolerancia=8 * 3600):
+        """Remove sessões cujo token expirou há mais que a tolerância"""
+        limite = time.time() - tolerancia
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM sessoes WHERE expira_em < ?", (limite,))
+            for sid, (_, expira_em, _) in list(self._memoria.items()):
+                if expira_em < limite:
+                    del self._memoria[sid]
+
+    def estatisticas(self):
+        with self._lock:
+            sessoes = self._db.execute("SELECT COUNT(*) FROM sessoes").fetchone()[0]
+            return {
+                "sessoes": sessoes,
+                "renovados": self._renovados,
+                "falhas_renovacao": self._falhas_renovacao,
+            }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_token_store():
+    """Store compartilhado pelo login e pelo decorator token_required"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                from models.auth_model import AuthModel
+
+                modelo = AuthModel()
+                _store = TokenStore(
+                    modelo.renovar_token,
+                    Config.COMPARTILHADO_DB_PATH,
+                    margem=Config.PROTHEUS_TOKEN_MARGEM,
+                    ttl_padrao=Config.PROTHEUS_TOKEN_TTL,
+                    espera_falha=Config.PROTHEUS_TOKEN_ESPERA_FALHA,
+                    ttl_memoria=Config.PROTHEUS_TOKEN_MEMORIA_TTL,
+                )
+    return _store
@@ -6,6 +6,8 @@ let celulaSelecionada = null;
 let carrinho = []; // { codigo, descricao, quantidade, celula, projeto }
 let produtosData = [];
 let projetosData = [];
+let celulasProjeto = {}; // AFC_XPROD -> { produtos, estatisticas } (árvore carregada)
+let progressoFonte = null; // EventSource das entregas do projeto selecionado
 
 // --- INICIALIZAÇÃO ---
 window.addEventListener('DOMContentLoaded', () => {
@@ -25,24 +27,102 @@ function atualizarData() {
     if (el) el.textContent = new Date().toLocaleDateString('pt-BR');
 }
 
+// --- GET CONDICIONAL (ETag) ---
+
+// url -> { etag, dados }: com If-None-Match o servidor responde 304 sem corpo
+const respostasCondicionais = new Map();
+const MAX_RESPOSTAS_CONDICIONAIS = 50;
+
+async function fetchCondicional(url) {
+    const anterior = respostasCondicionais.get(url);
+    const res = await fetch(url, {
+        cache: 'no-store', // quem guarda é o Map acima, não o cache HTTP do navegador
+        headers: anterior ? { 'If-None-Match': anterior.etag } : {}
+    });
+
+    if (res.status === 304 && anterior) {
+        // Reinsere para manter o Map em ordem de uso (o mais antigo sai primeiro)
+        respostasCondicionais.delete(url);
+        respostasCondicionais.set(url, anterior);
+        return anterior.dados;
+    }
+
+    const dados = await res.json();
+    const etag = res.headers.get('ETag');
+    if (res.ok && etag) {
+        respostasCondicionais.delete(url);
+        respostasCondicionais.set(url, { etag, dados });
+        if (respostasCondicionais.size > MAX_RESPOSTAS_CONDICIONAIS) {
+            respostasCondicionais.delete(respostasCondicionais.keys().next().value);
+        }
+    }
+    return dados;
+}
+
+// --- FORMATO COLUNAR (?format=columnar) ---
+
+// { colunas, linhas, constantes, dicionarios } -> lista de objetos
+function decodificarColunar(tabela) {
+    const { colunas, linhas, constantes, dicionarios } = tabela;
+    return linhas.map(linha => {
+        const obj = { ...constantes };
+        colunas.forEach((coluna, i) => {
+            const dicionario = dicionarios[coluna];
+            obj[coluna] = dicionario ? dicionario[linha[i]] : linha[i];
+        });
+        return obj;
+    });
+}
+
+// Árvore colunar: produtos numa tabela única, reagrupados por célula
+function decodificarArvore(dados) {
+    if (dados.error) return dados;
+    const produtosPorCelula = {};
+    decodificarColunar(dados.produtos).forEach(p => {
+        (produtosPorCelula[p.AFC_XPROD] = produtosPorCelula[p.AFC_XPROD] || []).push(p);
+    });
+    return {
+        projeto: dados.projeto,
+        revisao: dados.revisao,
+        estatisticas: dados.estatisticas,
+        celulas: decodificarColunar(dados.celulas).map(c => ({ ...c, produtos: produtosPorCelula[c.AFC_XPROD] || [] }))
+    };
+}
+
 // --- NAVEGAÇÃO E CARREGAMENTO ---
 
+const PROJETOS_POR_PAGINA = 50;
+let buscaProjetos = { termo: '', cursor: null };
+let filtroProjetosTimer = null;
+
 async function carregarProjetos() {
     const lista = document.getElementById('projetosList');
     lista.innerHTML = '<li class="loading">Carregando projetos...</li>';
+    await buscarProjetos('', null);
+}
+
+// Busca no servidor (q + limit + cursor): o catálogo inteiro não vem para o navegador
+async function buscarProjetos(termo, cursor) {
+    const lista = document.getElementById('projetosList');
+    const params = new URLSearchParams({ q: termo, limit: PROJETOS_POR_PAGINA, format: 'columnar' });
+    if (cursor) params.set('cursor', cursor);
 
     try {
-        const res = await fetch('/api/projetos');
-        const dados = await res.json();
+        const dados = await fetchCondicional(`/api/projetos?${params}`);
 
         if (dados.error) throw new Error(dados.error);
-        if (dados.length === 0) {
+        if (termo !== document.getElementById('filterProjeto').value.trim()) return; // resposta antiga
+
+        const pagina = decodificarColunar(dados.data);
+        projetosData = cursor ? projetosData.concat(pagina) : pagina;
+        buscaProjetos = { termo, cursor: dados.proximo_cursor };
+
+        if (projetosData.length === 0) {
             lista.innerHTML = '<li class="selection-item disabled">Nenhum projeto encontrado</li>';
             return;
         }
 
-        projetosData = dados;
-        renderizarProjetos(dados);
+        renderizarProjetos(projetosData);
 
     } catch (e) {
         lista.innerHTML = '<li class="selection-item disabled">Erro ao carregar projetos</li>';
@@ -57,16 +137,22 @@ function renderizarProjetos(dados) {
             <div class="selection-item-main">${p.AF8_PROJET}</div>
             <div class="selection-item-sub">${p.AF8_XNOMCL || ''} (Rev: ${p.AF8_REVISA})</div>
         </li>
-    `).join('');
+    `).join('') + (buscaProjetos.cursor ? `
+        <li class="selection-item" onclick="carregarMaisProjetos()">
+            <div class="selection-item-sub" style="text-align:center;">Carregar mais...</div>
+        </li>
+    ` : '');
+}
+
+function carregarMaisProjetos() {
+    buscarProjetos(buscaProjetos.termo, buscaProjetos.cursor);
 }
 
 function filtrarProjetos() {
-    const termo = document.getElementById('filterProjeto').value.toLowerCase();
-    const filtrados = projetosData.filter(p =>
-        p.AF8_PROJET.toLowerCase().includes(termo) ||
-        (p.AF8_XNOMCL && p.AF8_XNOMCL.toLowerCase().includes(termo))
-    );
-    renderizarProjetos(filtrados);
+    clearTimeout(filtroProjetosTimer);
+    filtroProjetosTimer = setTimeout(() => {
+        buscarProjetos(document.getElementById('filterProjeto').value.trim(), null);
+    }, 250);
 }
 
 async function selecionarProjeto(id, rev, event) {
@@ -79,21 +165,33 @@ async function selecionarProjeto(id, rev, event) {
     document.getElementById('mainTitle').textContent = `Projeto: ${id}`;
     document.getElementById('mainContent').innerHTML = '<div class="empty-state">Selecione uma célula para visualizar os produtos</div>';
 
-    // Carregar Células
+    await carregarArvore(id, rev);
+    acompanharEntregas(id, rev);
+}
+
+// Carregar Células (árvore completa: células + produtos em uma chamada)
+async function carregarArvore(id, rev) {
     const lista = document.getElementById('celulasList');
     lista.innerHTML = '<li class="loading">Carregando células...</li>';
+    celulasProjeto = {};
 
     try {
-        const res = await fetch(`/api/celulas/${id}/${rev}`);
-        const dados = await res.json();
+        const arvore = decodificarArvore(await fetchCondicional(`/api/projeto/${id}/${rev}/arvore?format=columnar`));
 
-        if (dados.length === 0) {
+        if (arvore.error) throw new Error(arvore.error);
+
+        const celulas = arvore.celulas || [];
+        if (celulas.length === 0) {
             lista.innerHTML = '<li class="selection-item disabled">Sem células disponíveis</li>';
             return;
         }
 
-        lista.innerHTML = dados.map(c => `
-            <li class="selection-item" onclick="selecionarCelula('${c.AFC_XPROD}', event)">
+        celulas.forEach(c => {
+            celulasProjeto[c.AFC_XPROD] = { produtos: c.produtos || [], estatisticas: c.estatisticas || {} };
+        });
+
+        lista.innerHTML = celulas.map(c => `
+            <li class="selection-item${c.AFC_XPROD === celulaSelecionada ? ' selected' : ''}" data-celula="${c.AFC_XPROD}" onclick="selecionarCelula('${c.AFC_XPROD}', event)">
                 <div class="selection-item-main">${c.AFC_XPROD}</div>
                 <div class="selection-item-sub">Necessidade: ${c.AFA_QUANT || 0} | Entregue: ${c.CP_XQUPR || 0}</div>
             </li>
@@ -105,26 +203,76 @@ async function selecionarProjeto(id, rev, event) {
     }
 }
 
-async function selecionarCelula(celula, event) {
+// --- ENTREGAS EM TEMPO REAL (SSE) ---
+
+// O servidor consulta uma vez por intervalo para todos e envia só o que mudou
+function acompanharEntregas(id, rev) {
+    if (progressoFonte) progressoFonte.close();
+    progressoFonte = null;
+    if (!window.EventSource) return;
+
+    const fonte = new EventSource(`/api/projeto/${id}/${rev}/progresso`);
+    progressoFonte = fonte;
+
+    fonte.addEventListener('progresso', (e) => aplicarProgresso(JSON.parse(e.data)));
+    fonte.addEventListener('recarregar', async () => {
+        if (progressoFonte !== fonte) return;
+        await carregarArvore(id, rev);
+        if (celulaSelecionada && celulasProjeto[celulaSelecionada]) {
+            produtosData = celulasProjeto[celulaSelecionada].produtos;
+            renderPainelProdutos(celulasProjeto[celulaSelecionada].estatisticas);
+        }
+    });
+}
+
+function aplicarProgresso(dados) {
+    if (!projetoSelecionado || dados.projeto !== projetoSelecionado.id.trim()) return;
+
+    // Chaves da árvore podem vir com espaços do Protheus
+    const porChave = {};
+    Object.keys(celulasProjeto).forEach(k => { porChave[k.trim()] = k; });
+
+    (dados.celulas || []).forEach(c => {
+        const chave = porChave[String(c.AFC_XPROD).trim()];
+        if (!chave) return;
+        celulasProjeto[chave].estatisticas = c.estatisticas;
+        const item = document.querySelector(`#celulasList [data-celula="${chave}"] .selection-item-sub`);
+        if (item) item.textContent = `Necessidade: ${c.AFA_QUANT || 0} | Entregue: ${c.CP_XQUPR || 0}`;
+    });
+
+    (dados.produtos || []).forEach(p => {
+        const chave = porChave[String(p.AFC_XPROD).trim()];
+        if (!chave) return;
+        const produto = celulasProjeto[chave].produtos.find(
+            x => String(x.AFA_PRODUT).trim() === String(p.AFA_PRODUT).trim());
+        if (produto) Object.assign(produto, { AFA_QUANT: p.AFA_QUANT, CP_QUANT: p.CP_QUANT, CP_XQUPR: p.CP_XQUPR });
+    });
+
+    // Painel aberto numa célula que mudou: redesenha mantendo os filtros digitados
+    const atual = celulaSelecionada && (dados.celulas || []).some(c => String(c.AFC_XPROD).trim() === celulaSelecionada.trim());
+    if (atual && document.getElementById('produtosBody')) {
+        const filtros = ['productFilterCode', 'productFilterDesc'].map(i => document.getElementById(i).value);
+        const pendentes = document.getElementById('productFilterPending').checked;
+        renderPainelProdutos(celulasProjeto[celulaSelecionada].estatisticas);
+        document.getElementById('productFilterCode').value = filtros[0];
+        document.getElementById('productFilterDesc').value = filtros[1];
+        document.getElementById('productFilterPending').checked = pendentes;
+        aplicarFiltros();
+    }
+}
+
+function selecionarCelula(celula, event) {
     celulaSelecionada = celula;
 
     document.querySelectorAll('#celulasList .selection-item').forEach(el => el.classList.remove('selected'));
     event.currentTarget.classList.add('selected');
 
     document.getElementById('mainTitle').textContent = `Projeto: ${projetoSelecionado.id} | Célula: ${celula}`;
-    document.getElementById('mainContent').innerHTML = '<div class="loading">Carregando produtos...</div>';
-
-    try {
-        const res = await fetch(`/api/produtos/${projetoSelecionado.id}/${projetoSelecionado.rev}/${celula}`);
-        const json = await res.json();
 
-        produtosData = json.data || [];
-        renderPainelProdutos(json.estatisticas || {});
-
-    } catch(e) {
-        document.getElementById('mainContent').innerHTML = `<div class="error-message">Erro ao carregar produtos: ${e.message}</div>`;
-        console.error('Erro ao carregar produtos:', e);
-    }
+    // Produtos já vieram na árvore do projeto: nenhuma chamada ao servidor
+    const dados = celulasProjeto[celula] || { produtos: [], estatisticas: {} };
+    produtosData = dados.produtos;
+    renderPainelProdutos(dados.estatisticas);
 }
 
 // --- RENDERIZAÇÃO DA TABELA DE PRODUTOS ---
@@ -431,28 +579,33 @@ async function sendRequest() {
     if (btnClear) btnClear.disabled = true;
 
     try {
-        // Monta payload dinâmico para cada projeto
-        const requests = Object.keys(grupos).map(projeto => {
-            const payload = {
-                projeto: projeto,
-                celulas: Object.keys(grupos[projeto]).map(celula => ({
-                    celula: celula,
-                    itens: grupos[projeto][celula]
-                }))
-            };
-
-            console.log('📤 Enviando payload:', payload);
-
-            return fetch('/api/requisicao', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify(payload)
-            });
+        // Monta payload dinâmico para cada projeto e envia tudo em um único lote
+        const ordens = Object.keys(grupos).map(projeto => ({
+            projeto: projeto,
+            celulas: Object.keys(grupos[projeto]).map(celula => ({
+                celula: celula,
+                itens: grupos[projeto][celula]
+            }))
+        }));
+
+        console.log('📤 Enviando lote:', ordens);
+
+        const res = await fetch('/api/requisicao/lote', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ ordens })
         });
+        const lote = await res.json();
 
-        // Aguarda todas as requisições
-        const responses = await Promise.all(requests);
-        const results = await Promise.all(responses.map(r => r.json()));
+        console.log('📥 Ordens enfileiradas:', lote);
+
+        if (!lote.jobs) {
+            const detalhes = (lote.invalidas || []).map(i => `${i.projeto || i.indice}: ${i.error}`).join('\n');
+            throw new Error(lote.error + (detalhes ? `\n\n${detalhes}` : ''));
+        }
+
+        if (btnSend) btnSend.textContent = '⏳ Aguardando Protheus...';
+        const results = await aguardarJobs(lote.jobs);
 
         console.log('📥 Respostas recebidas:', results);
 
@@ -494,6 +647,31 @@ async function sendRequest() {
     }
 }
 
+// Consulta o status dos jobs até todos finalizarem no Protheus
+async function aguardarJobs(jobs, intervaloMs = 1500, limiteMs = 180000) {
+    const results = jobs.map(j => j.job_id ? null : j); // erro de validação já é final
+    const inicio = Date.now();
+
+    while (results.some(r => r === null)) {
+        if (Date.now() - inicio > limiteMs) {
+            return results.map(r => r || { success: false, error: 'Tempo esgotado aguardando o Protheus. Verifique a ordem antes de reenviar.' });
+        }
+        await new Promise(resolve => setTimeout(resolve, intervaloMs));
+
+        const ids = jobs.filter((j, i) => results[i] === null).map(j => j.job_id);
+        const res = await fetch(`/api/requisicao/status?ids=${ids.join(',')}`);
+        const dados = await res.json();
+
+        (dados.jobs || []).forEach(job => {
+            if (job.status !== 'concluido' && job.status !== 'erro') return;
+            const idx = jobs.findIndex(j => j.job_id === job.job_id);
+            results[idx] = job.resultado || { success: false, error: 'Sem retorno do Protheus' };
+        });
+    }
+
+    return results;
+}
+
 // --- MODAL DE RETORNO DO PROTHEUS ---
 
 function mostrarModalRetorno(resultados) {
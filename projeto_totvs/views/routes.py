@@ -1,15 +1,81 @@
 # views/routes.py
 import logging
-from flask import render_template, jsonify, request, redirect, make_response, g
-from controllers.projeto_controller import ProjetoController
-from controllers.auth_controller import AuthController, token_required
+import time
+from flask import (
+    render_template,
+    jsonify,
+    request,
+    redirect,
+    make_response,
+    g,
+    Response,
+    stream_with_context,
+)
+from controllers.projeto_controller import (
+    ProjetoController,
+    resumir_lote,
+    validar_payload_ordem,
+)
+from models.fila_ordens import FilaCheiaError
+from models.formato_colunar import para_colunar
+from models.progresso_entregas import LimiteAssinaturasError, formatar_sse
+from models.http_client import estado_circuitos
+from models.metricas import (
+    REGISTRO,
+    REQUISICAO_SEGUNDOS,
+    REQUISICOES_TOTAL,
+    REQUISICOES_EM_ANDAMENTO,
+    achatar,
+)
+from models.metricas_processos import MetricasProcessos
+from logging_config import estatisticas_logging
+from config import Config
+from controllers.auth_controller import (
+    AuthController,
+    token_required,
+    admin_required,
+    metricas_required,
+    estatisticas_sessoes,
+)
+from models.perfil_consultas import get_perfil
 
 logger = logging.getLogger("Routes")
 
 
+def resposta_condicional(versao, montar_corpo):
+    """
+    GET condicional: 304 se o navegador já tem esta versão (If-None-Match),
+    sem serializar o corpo; senão o JSON com ETag forte
+    """
+    if formato_colunar():
+        versao += "-c"  # outra representação, outro validador
+    # Comparação fraca (RFC 7232): vale também o ETag da resposta comprimida
+    if request.if_none_match.contains_weak(versao):
+        resposta = make_response("", 304)
+    else:
+        resposta = jsonify(montar_corpo())
+    resposta.set_etag(versao)
+    # Pode guardar, mas sempre revalida (o conteúdo muda a cada entrega)
+    resposta.headers["Cache-Control"] = "private, no-cache"
+    return resposta
+
+
+def formato_colunar():
+    """?format=columnar: listas no formato colunar (models/formato_colunar.py)"""
+    return request.args.get("format") == "columnar"
+
+
+def lista_no_formato(linhas):
+    """Lista de linhas como veio ou, se pedido, no formato colunar"""
+    return para_colunar(linhas) if formato_colunar() else linhas
+
+
 def init_routes(app):
     projeto_controller = ProjetoController()
     auth_controller = AuthController()
+    # Acesso de fora das rotas (aquecimento e saída do worker no wsgi.py)
+    app.extensions["projeto_controller"] = projeto_controller
+    exportar_metricas = registrar_metricas(app, projeto_controller)
 
     # ========== ROTAS DE AUTENTICAÇÃO ==========
 
@@ -60,6 +126,7 @@ def init_routes(app):
     @app.route("/logout")
     def logout():
         """Faz logout e redireciona para login"""
+        auth_controller.logout(request.cookies.get("token"))
         resposta = make_response(redirect("/login"))
         resposta.delete_cookie("token")
         logger.info("Usuário fez logout")
@@ -88,27 +155,61 @@ def init_routes(app):
     @app.route("/api/projetos")
     @token_required
     def api_projetos():
-        """Lista todos os projetos disponíveis"""
-        logger.info(f"Usuário {g.user} solicitou lista de projetos")
-        resultado = projeto_controller.listar_projetos()
+        """
+        Lista todos os projetos disponíveis.
+        Com q, limit ou cursor: busca paginada
+        {"data": [...], "proximo_cursor": "...", "total": N}
+        Com ?format=columnar (também nas rotas abaixo) as listas vêm em colunas.
+        """
+        args = request.args
+        if not ("q" in args or "limit" in args or "cursor" in args):
+            logger.info("Usuário %s solicitou lista de projetos", g.user)
+            resultado = projeto_controller.listar_projetos()
+
+            if resultado["success"]:
+                return resposta_condicional(
+                    resultado["versao"], lambda: lista_no_formato(resultado["data"])
+                )
+            else:
+                logger.error(f"Erro ao listar projetos: {resultado.get('error')}")
+                return jsonify(resultado), 500
+
+        try:
+            limite = min(max(int(args.get("limit", 50)), 1), 500)
+        except ValueError:
+            return jsonify({"success": False, "error": "limit inválido"}), 400
+
+        resultado = projeto_controller.buscar_projetos(
+            args.get("q", ""), limite, args.get("cursor") or None
+        )
 
         if resultado["success"]:
-            return jsonify(resultado["data"])
+            versao = resultado.pop("versao")
+            return resposta_condicional(
+                versao,
+                lambda: dict(resultado, data=lista_no_formato(resultado["data"])),
+            )
         else:
-            logger.error(f"Erro ao listar projetos: {resultado.get('error')}")
-            return jsonify(resultado), 500
+            logger.error(f"Erro ao buscar projetos: {resultado.get('error')}")
+            status = resultado.pop("status", 500)
+            return jsonify(resultado), status
 
     @app.route("/api/celulas/<projeto>/<revisao>")
     @token_required
     def api_celulas(projeto, revisao):
         """Lista células de um projeto específico"""
         logger.info(
-            f"Usuário {g.user} solicitou células do projeto {projeto} rev {revisao}"
+            "Usuário %s solicitou células do projeto %s rev %s",
+            g.user,
+            projeto,
+            revisao,
         )
         resultado = projeto_controller.listar_celulas(projeto, revisao)
 
         if resultado["success"]:
-            return jsonify(resultado["data"])
+            return resposta_condicional(
+                resultado["versao"], lambda: lista_no_formato(resultado["data"])
+            )
         else:
             logger.error(f"Erro ao listar células: {resultado.get('error')}")
             return jsonify(resultado), 500
@@ -116,25 +217,102 @@ def init_routes(app):
     @app.route("/api/produtos/<projeto>/<revisao>/<celula>")
     @token_required
     def api_produtos(projeto, revisao, celula):
-        """Lista produtos de uma célula específica"""
+        """
+        Lista produtos de uma célula específica.
+        Com ?stream=1 ou Accept: application/x-ndjson responde em NDJSON
+        (um produto por linha, estatísticas na última linha).
+        """
         logger.info(
-            f"Usuário {g.user} solicitou produtos - Projeto: {projeto}, Célula: {celula}"
+            "Usuário %s solicitou produtos - Projeto: %s, Célula: %s",
+            g.user,
+            projeto,
+            celula,
         )
+
+        if request.args.get("stream") == "1" or "application/x-ndjson" in (
+            request.headers.get("Accept", "")
+        ):
+            return Response(
+                stream_with_context(
+                    projeto_controller.stream_produtos(projeto, revisao, celula)
+                ),
+                mimetype="application/x-ndjson",
+            )
+
         resultado = projeto_controller.listar_produtos(projeto, revisao, celula)
 
         if resultado["success"]:
-            return jsonify(resultado)
+            versao = resultado.pop("versao")
+            return resposta_condicional(
+                versao,
+                lambda: dict(resultado, data=lista_no_formato(resultado["data"])),
+            )
         else:
             logger.error(f"Erro ao listar produtos: {resultado.get('error')}")
             return jsonify(resultado), 500
 
+    @app.route("/api/projeto/<projeto>/<revisao>/arvore")
+    @token_required
+    def api_arvore(projeto, revisao):
+        """Projeto completo: células com produtos e estatísticas"""
+        logger.info(
+            "Usuário %s solicitou árvore do projeto %s rev %s", g.user, projeto, revisao
+        )
+        resultado = projeto_controller.carregar_arvore(
+            projeto, revisao, colunar=formato_colunar()
+        )
+
+        if resultado["success"]:
+            return resposta_condicional(resultado["versao"], lambda: resultado["data"])
+        else:
+            logger.error(f"Erro ao carregar árvore: {resultado.get('error')}")
+            return jsonify(resultado), 500
+
+    @app.route("/api/projeto/<projeto>/<revisao>/progresso")
+    @token_required
+    def api_progresso(projeto, revisao):
+        """
+        Server-Sent Events com as entregas do projeto: eventos "progresso"
+        (só células/produtos cujos totais mudaram) e "recarregar" (estrutura
+        mudou, o navegador busca a árvore de novo).
+        """
+        try:
+            assinatura = projeto_controller.acompanhamento.assinar(projeto, revisao)
+        except LimiteAssinaturasError as e:
+            logger.warning("Acompanhamento recusado para %s: %s", g.user, e)
+            return jsonify({"success": False, "error": str(e)}), 503
+        logger.info(
+            "Usuário %s acompanhando projeto %s rev %s", g.user, projeto, revisao
+        )
+
+        def eventos():
+            fim = time.monotonic() + Config.SSE_DURACAO_MAX
+            try:
+                yield "retry: 3000\n\n"
+                while time.monotonic() < fim:
+                    item = assinatura.proximo(Config.SSE_HEARTBEAT)
+                    if item is None:
+                        yield ": ping\n\n"  # mantém proxies e o navegador conectados
+                    else:
+                        yield formatar_sse(*item)
+            finally:
+                # Fim do prazo ou navegador desconectou (GeneratorExit)
+                projeto_controller.acompanhamento.cancelar(assinatura)
+
+        return Response(
+            eventos(),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
     # ========== ROTA DE ENVIO DE ORDEM (PRINCIPAL) ==========
 
     @app.route("/api/requisicao", methods=["POST"])
     @token_required
     def api_requisicao():
         """
-        Envia ordem de separação para o Protheus
+        Enfileira ordem de separação para o Protheus (responde 202 + job_id).
+        Com ?sync=1 envia na hora e devolve o retorno do Protheus.
 
         Payload esperado:
         {
@@ -152,89 +330,59 @@ def init_routes(app):
         try:
             dados = request.get_json()
 
-            if not dados:
-                logger.error("Requisição sem dados JSON")
-                return jsonify({"success": False, "error": "Dados não fornecidos"}), 400
+            erro = validar_payload_ordem(dados)
+            if erro:
+                return jsonify({"success": False, "error": erro}), 400
 
-            # Validações básicas
-            if "projeto" not in dados:
-                logger.error("Campo 'projeto' ausente no payload")
-                return (
-                    jsonify(
-                        {"success": False, "error": 'Campo "projeto" é obrigatório'}
-                    ),
-                    400,
-                )
+            # Log detalhado do que será enviado
+            total_celulas = len(dados["celulas"])
+            total_itens = sum(len(c["itens"]) for c in dados["celulas"])
 
-            if "celulas" not in dados or not isinstance(dados["celulas"], list):
-                logger.error("Campo 'celulas' ausente ou inválido no payload")
-                return (
-                    jsonify(
-                        {
-                            "success": False,
-                            "error": 'Campo "celulas" deve ser uma lista',
-                        }
-                    ),
-                    400,
-                )
+            logger.info(
+                "Usuário %s enviando ordem de separação - Projeto: %s, "
+                "Células: %s, Total de itens: %s",
+                g.user,
+                dados["projeto"],
+                total_celulas,
+                total_itens,
+            )
+
+            if request.args.get("sync") == "1":
+                # CHAMA O MÉTODO QUE FAZ A INTEGRAÇÃO REAL COM O PROTHEUS
+                resultado = projeto_controller.enviar_ordem_separacao(dados)
+
+                if resultado["success"]:
+                    logger.info(f"✅ Ordem enviada com sucesso para o Protheus")
+                    logger.info(f"Resposta: {resultado.get('mensagem')}")
+                    return jsonify(resultado), 200
+                else:
+                    logger.error(f"❌ Erro ao enviar ordem: {resultado.get('error')}")
+                    return jsonify(resultado), 400
 
-            if len(dados["celulas"]) == 0:
-                logger.error("Lista de células vazia")
+            if not getattr(g, "protheus_token", None):
                 return (
                     jsonify(
                         {
                             "success": False,
-                            "error": "Pelo menos uma célula deve ser informada",
+                            "error": "Sessão expirada. Faça login novamente.",
                         }
                     ),
-                    400,
+                    401,
                 )
 
-            # Valida estrutura de cada célula
-            for idx, celula in enumerate(dados["celulas"]):
-                if "celula" not in celula or "itens" not in celula:
-                    logger.error(f"Célula {idx} com estrutura inválida")
-                    return (
-                        jsonify(
-                            {
-                                "success": False,
-                                "error": f"Célula {idx} está com estrutura inválida",
-                            }
-                        ),
-                        400,
-                    )
-
-                if not isinstance(celula["itens"], list) or len(celula["itens"]) == 0:
-                    logger.error(f"Célula {celula['celula']} sem itens")
-                    return (
-                        jsonify(
-                            {
-                                "success": False,
-                                "error": f'Célula {celula["celula"]} deve ter pelo menos um item',
-                            }
-                        ),
-                        400,
-                    )
-
-            # Log detalhado do que será enviado
-            total_celulas = len(dados["celulas"])
-            total_itens = sum(len(c["itens"]) for c in dados["celulas"])
-
-            logger.info(f"Usuário {g.user} enviando ordem de separação:")
-            logger.info(f"  Projeto: {dados['projeto']}")
-            logger.info(f"  Células: {total_celulas}")
-            logger.info(f"  Total de itens: {total_itens}")
-
-            # CHAMA O MÉTODO QUE FAZ A INTEGRAÇÃO REAL COM O PROTHEUS
-            resultado = projeto_controller.enviar_ordem_separacao(dados)
+            try:
+                job_id = projeto_controller.enfileirar_ordem(
+                    dados, g.user, g.protheus_token
+                )
+            except FilaCheiaError as e:
+                logger.error(f"❌ {e}")
+                return jsonify({"success": False, "error": str(e)}), 503
 
-            if resultado["success"]:
-                logger.info(f"✅ Ordem enviada com sucesso para o Protheus")
-                logger.info(f"Resposta: {resultado.get('mensagem')}")
-                return jsonify(resultado), 200
-            else:
-                logger.error(f"❌ Erro ao enviar ordem: {resultado.get('error')}")
-                return jsonify(resultado), 400
+            logger.info(f"📥 Ordem enfileirada: job {job_id}")
+            return (
+                jsonify({"success": True, "job_id": job_id, "status": "pendente"}),
+                202,
+            )
 
         except ValueError as e:
             logger.exception("Erro de validação de dados")
@@ -252,15 +400,132 @@ def init_routes(app):
                 500,
             )
 
+    @app.route("/api/requisicao/lote", methods=["POST"])
+    @token_required
+    def api_requisicao_lote():
+        """
+        Enfileira as ordens de vários projetos de uma vez (responde 202).
+
+        Payload esperado:
+        {"ordens": [ {"projeto": "...", "celulas": [...]}, ... ]}
+
+        Resposta: um job_id por projeto, acompanhado em /api/requisicao/status.
+        400 = lote inválido (nada é enfileirado), 503 = fila cheia
+        """
+        dados = request.get_json(silent=True)
+        if not isinstance(dados, dict):
+            logger.error("Payload do lote não é um objeto JSON")
+            return jsonify({"success": False, "error": "Dados inválidos"}), 400
+        ordens = dados.get("ordens")
+
+        if not getattr(g, "protheus_token", None):
+            return (
+                jsonify(
+                    {
+                        "success": False,
+                        "error": "Sessão expirada. Faça login novamente.",
+                    }
+                ),
+                401,
+            )
+
+        total_ordens = len(ordens) if isinstance(ordens, list) else 0
+        logger.info(f"Usuário {g.user} enviando lote com {total_ordens} ordem(ns)")
+
+        try:
+            resultado = projeto_controller.enfileirar_lote(
+                ordens, g.user, g.protheus_token
+            )
+        except FilaCheiaError as e:
+            logger.error(f"❌ {e}")
+            return jsonify({"success": False, "error": str(e)}), 503
+
+        if not resultado["success"]:
+            logger.error(f"❌ Lote rejeitado: {resultado.get('error')}")
+            return jsonify(resultado), 400
+
+        logger.info(f"📥 Lote enfileirado: {resultado['total']} job(s)")
+        return jsonify(resultado), 202
+
+    @app.route("/api/requisicao/status")
+    @token_required
+    def api_requisicao_status():
+        """
+        Status de vários jobs: ?ids=id1,id2,...
+        resumo: sucesso/falha e tempos por projeto e a duração do lote
+        """
+        ids = [i for i in request.args.get("ids", "").split(",") if i]
+        if not ids:
+            return jsonify({"success": False, "error": "Informe ?ids="}), 400
+        jobs = projeto_controller.status_ordens(ids, g.user)
+        return jsonify({"success": True, "jobs": jobs, "resumo": resumir_lote(jobs)})
+
+    @app.route("/api/requisicao/<job_id>")
+    @token_required
+    def api_requisicao_job(job_id):
+        """Status (e retorno do Protheus, quando finalizado) de um job"""
+        jobs = projeto_controller.status_ordens([job_id], g.user)
+        if not jobs:
+            return jsonify({"success": False, "error": "Job não encontrado"}), 404
+        return jsonify({"success": True, **jobs[0]})
+
     # ========== ROTA DE HEALTH CHECK ==========
 
     @app.route("/health")
     def health_check():
-        """Verifica se o servidor está funcionando"""
+        """Verifica se o servidor está funcionando (detalhes em /api/admin/status)"""
+        degradado = any(c["estado"] != "fechado" for c in estado_circuitos().values())
+        return jsonify(
+            {
+                "status": "degradado" if degradado else "ok",
+                "service": "Portal Manufatura MRB",
+                "version": "2.0",
+            }
+        )
+
+    @app.route("/metrics")
+    @metricas_required
+    def metrics():
+        """Métricas no formato texto do Prometheus"""
+        return Response(
+            exportar_metricas(),
+            content_type="text/plain; version=0.0.4; charset=utf-8",
+        )
+
+    # ========== ADMINISTRAÇÃO ==========
+
+    @app.route("/api/admin/status")
+    @token_required
+    @admin_required
+    def api_admin_status():
+        """Estado interno: circuitos, pools, caches, fila, sessões e logs"""
         return jsonify(
-            {"status": "ok", "service": "Portal Manufatura MRB", "version": "2.0"}
+            {
+                "success": True,
+                "circuitos": estado_circuitos(),
+                "pool_conexoes": projeto_controller.estatisticas_pool(),
+                "cache": projeto_controller.estatisticas_cache(),
+                "replica_local": projeto_controller.estatisticas_replica(),
+                "fila_ordens": projeto_controller.fila.estatisticas(),
+                "acompanhamento": projeto_controller.acompanhamento.estatisticas(),
+                "http_client": projeto_controller.estatisticas_http(),
+                "sessoes": estatisticas_sessoes(),
+                "logs": estatisticas_logging(),
+            }
         )
 
+    @app.route("/api/admin/consultas", methods=["GET", "DELETE"])
+    @token_required
+    @admin_required
+    def api_admin_consultas():
+        """Profiler do banco: agregados por consulta, top-N e lentas recentes"""
+        perfil = get_perfil()
+        if request.method == "DELETE":
+            perfil.limpar()
+            logger.info("Usuário %s zerou o profiler de consultas", g.user)
+            return jsonify({"success": True})
+        return jsonify({"success": True, **perfil.relatorio()})
+
     # ========== TRATAMENTO DE ERROS ==========
 
     @app.errorhandler(404)
@@ -274,3 +539,85 @@ def init_routes(app):
         return jsonify({"success": False, "error": "Erro interno do servidor"}), 500
 
     logger.info("Rotas configuradas com sucesso")
+
+
+def registrar_metricas(app, projeto_controller):
+    """
+    Mede cada requisição e registra os gauges lidos no scrape de /metrics.
+    Retorna a função que gera o texto do /metrics
+    """
+
+    @app.before_request
+    def _iniciar_medicao():
+        g.metricas_inicio = time.perf_counter()
+        REQUISICOES_EM_ANDAMENTO.inc()
+
+    @app.after_request
+    def _registrar_medicao(response):
+        inicio = g.pop("metricas_inicio", None)
+        if inicio is not None:
+            REQUISICOES_EM_ANDAMENTO.dec()
+            # Regra da rota (não a URL) para não explodir a cardinalidade
+            rota = request.url_rule.rule if request.url_rule else "sem_rota"
+            REQUISICAO_SEGUNDOS.observar(
+                time.perf_counter() - inicio, rota=rota, metodo=request.method
+            )
+            REQUISICOES_TOTAL.inc(
+                rota=rota, metodo=request.method, status=str(response.status_code)
+            )
+        return response
+
+    @app.teardown_request
+    def _finalizar_medicao(erro=None):
+        # after_request não roda quando a resposta nem chega a ser montada
+        if g.pop("metricas_inicio", None) is not None:
+            REQUISICOES_EM_ANDAMENTO.dec()
+
+    def coletar():
+        yield from achatar("portal_pool", projeto_controller.estatisticas_pool())
+        for nome, dados in projeto_controller.estatisticas_cache().items():
+            yield from achatar("portal_cache", dados, cache=nome)
+        replica = projeto_controller.estatisticas_replica()
+        if replica is not None:
+            yield from achatar("portal_replica", replica)
+        yield from achatar(
+            "portal_sse", projeto_controller.acompanhamento.estatisticas()
+        )
+        for status, qtd in projeto_controller.fila.estatisticas().items():
+            yield "portal_fila_ordens", {"status": status}, qtd
+        for host, dados in projeto_controller.estatisticas_http().items():
+            yield from achatar("portal_http_cliente", dados, host=host)
+        for nome, dados in estado_circuitos().items():
+            yield "portal_circuito_aberto", {"servico": nome}, int(
+                dados["estado"] != "fechado"
+            )
+            yield from achatar("portal_circuito", dados, servico=nome)
+        sessoes = estatisticas_sessoes()
+        yield from achatar("portal_jwt_cache", sessoes["jwt_cache"])
+        yield from achatar("portal_tokens_protheus", sessoes["tokens_protheus"])
+        yield from achatar("portal_logs", estatisticas_logging())
+
+    REGISTRO.coletor(
+        coletar,
+        {
+            "portal_pool": "Pool de conexões do SQL Server",
+            "portal_cache": "Caches de leitura, por cache",
+            "portal_replica": "Réplica local (SQLite) das leituras",
+            "portal_sse": "Acompanhamento de entregas (SSE)",
+            "portal_fila_ordens": "Ordens na fila de envio, por status",
+            "portal_http_cliente": "Cliente HTTP do Protheus, por host",
+            "portal_circuito": "Circuit breaker, por serviço",
+            "portal_circuito_aberto": "1 se o circuito do serviço não está fechado",
+            "portal_jwt_cache": "Cache de JWT verificados",
+            "portal_tokens_protheus": "Tokens do Protheus guardados no servidor",
+            "portal_logs": "Fila do logging assíncrono",
+        },
+    )
+
+    if Config.PREFORK:
+        # Cada scrape cai num worker qualquer: soma os instantâneos de todos
+        processos = MetricasProcessos(
+            REGISTRO, Config.METRICAS_DIR, Config.METRICAS_INTERVALO
+        )
+        return processos.iniciar().exportar
+    return REGISTRO.exportar
@@ -0,0 +1,93 @@
+# wsgi.py
+# Entrada de produção: create_app("production") para o gunicorn (Linux) ou,
+# rodando este arquivo, para o waitress (Windows, um processo com threads)
+#
+#   gunicorn -c gunicorn.conf.py wsgi:app
+#   python wsgi.py
+
+import logging
+import os
+import threading
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app import create_app  # noqa: E402
+from config import Config  # noqa: E402
+
+logger = logging.getLogger("Servidor")
+
+AMBIENTE = os.getenv("FLASK_ENV", "production")
+
+
+class AppPorWorker:
+    """
+    App WSGI criado dentro de cada worker, depois do fork.
+
+    O master do gunicorn só importa os módulos (preload_app): o app em si
+    abre pool do SQL Server, SQLite da fila/réplica e threads de fundo, que
+    não sobrevivem ao fork. O gunicorn.conf.py chama iniciar() no
+    post_worker_init e encerrar() no worker_exit.
+    """
+
+    def __init__(self, ambiente):
+        self.ambiente = ambiente
+        self.app = None
+
+    def iniciar(self):
+        self.app = criar_app(self.ambiente)
+        return self
+
+    def encerrar(self):
+        if self.app is not None:
+            self.app.extensions["projeto_controller"].encerrar()
+
+    def __call__(self, environ, start_response):
+        return self.app(environ, start_response)
+
+
+def aquecer(app):
+    """Lista de projetos no cache antes das primeiras requisições"""
+    controller = app.extensions["projeto_controller"]
+
+    def executar():
+        resultado = controller.listar_projetos()
+        if resultado.get("success"):
+            logger.info("Aquecimento: %d projetos em cache", len(resultado["data"]))
+        else:
+            logger.warning("Aquecimento falhou: %s", resultado.get("error"))
+
+    threading.Thread(target=executar, name="aquecer-cache", daemon=True).start()
+
+
+def criar_app(ambiente):
+    app = create_app(ambiente)
+    if Config.SERVIDOR_AQUECER:
+        aquecer(app)
+    return app
+
+
+# No gunicorn (PORTAL_PREFORK) o app só nasce no worker; fora dele, já aqui
+app = AppPorWorker(AMBIENTE) if Config.PREFORK else criar_app(AMBIENTE)
+
+
+def main():
+    try:
+        from waitress import serve
+    except ImportError:
+        raise SystemExit("waitress não instalado: pip install waitress")
+
+    print(f"🚀 Servidor de produção (waitress) em {Config.SERVIDOR_BIND}")
+    print(f"   {Config.SERVIDOR_THREADS} threads, ambiente {AMBIENTE}")
+    serve(
+        app,
+        listen=Config.SERVIDOR_BIND,
+        threads=Config.SERVIDOR_THREADS,
+        channel_timeout=Config.SERVIDOR_TIMEOUT,
+        ident="portal",
+    )
+
+
+if __name__ == "__main__":
+    main()